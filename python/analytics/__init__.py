@@ -0,0 +1 @@
+"""Summary-table layer (sql/03_analysis_queries.sql) run from Python."""
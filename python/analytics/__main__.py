@@ -0,0 +1,234 @@
+"""
+Command line entry point.
+
+    cd python
+    python -m analytics duckdb --data ./output --out ./summaries
+    python -m analytics build --dsn postgresql://localhost/portfolio [--changed transactions]
+    python -m analytics refresh --dsn postgresql://localhost/portfolio [--months 2025-12]
+    python -m analytics quantiles --data ./output [--validate]
+    python -m analytics features --data ./output --state ./feature_state --out ./features
+    python -m analytics cube --data ./output --out spend_cube.parquet --view category_spend_summary
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_generation.postgres_loader import require_psycopg
+from data_generation.table_io import FORMATS, READ_CHUNK_ROWS, read_table, table_path, write_table
+
+from .build_dag import DEFAULT_WORKERS, build_summaries, duckdb_executor, postgres_executor
+from .card_features import CardFeatures, backfill, read_totals
+from .cube import DIMENSIONS, MEASURES, VIEWS, Cube, build_cube
+from .duckdb_runner import require_duckdb, register_sources, run_analysis
+from .incremental import refresh_summaries
+from .sketches import (
+    DEFAULT_K, DEFAULT_TOP_SHARE, approx_summary, compare, customer_spend, exact_summary, k_for_error,
+    postgres_customer_count, postgres_spend_chunks, spend_chunks
+)
+from .sql_script import ANALYSIS_SQL
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m analytics")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    duck = commands.add_parser("duckdb", help="build the summary tables in-process with DuckDB")
+    duck.add_argument("--data", required=True, help="directory holding the generated tables")
+    duck.add_argument("--format", choices=FORMATS, default="csv")
+    duck.add_argument("--out", help="write each summary table to this directory")
+    duck.add_argument("--out-format", choices=FORMATS, help="defaults to --format")
+    duck.add_argument("--database", default=":memory:", help="DuckDB file to keep the results in")
+    duck.add_argument("--sql", default=ANALYSIS_SQL)
+
+    build = commands.add_parser("build", help="rebuild summary tables as a parallel dependency graph")
+    target = build.add_mutually_exclusive_group(required=True)
+    target.add_argument("--dsn", help="Postgres holding the loaded tables")
+    target.add_argument("--data", help="generated tables to build from with DuckDB instead")
+    build.add_argument("--format", choices=FORMATS, default="csv", help="with --data")
+    build.add_argument("--database", default=":memory:", help="DuckDB file, with --data")
+    build.add_argument("--changed", help="comma-separated input tables; rebuild only what depends on them")
+    build.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    build.add_argument("--sql", default=ANALYSIS_SQL)
+
+    inc = commands.add_parser("refresh", help="refresh summary tables month by month from new transactions")
+    target = inc.add_mutually_exclusive_group(required=True)
+    target.add_argument("--dsn", help="Postgres holding the loaded tables")
+    target.add_argument("--data", help="generated tables to refresh from with DuckDB instead")
+    inc.add_argument("--format", choices=FORMATS, default="csv", help="with --data")
+    inc.add_argument("--database", help="DuckDB file holding the previous build, with --data")
+    inc.add_argument("--months", help="comma-separated YYYY-MM months to recompute as well")
+    inc.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    inc.add_argument("--sql", default=ANALYSIS_SQL)
+
+    quant = commands.add_parser("quantiles", help="segment thresholds and Pareto share from streaming sketches")
+    target = quant.add_mutually_exclusive_group(required=True)
+    target.add_argument("--dsn", help="Postgres holding customer_spend_summary")
+    target.add_argument("--data", help="generated tables to aggregate customer spend from")
+    quant.add_argument("--format", choices=FORMATS, default="csv", help="with --data")
+    quant.add_argument("--k", type=int, default=DEFAULT_K, help="sketch size; rank error ~ 2.3 / k")
+    quant.add_argument("--error", type=float, help="target rank error instead of --k, e.g. 0.005")
+    quant.add_argument("--top-share", type=float, default=DEFAULT_TOP_SHARE)
+    quant.add_argument("--chunk-rows", type=int, default=READ_CHUNK_ROWS)
+    mode = quant.add_mutually_exclusive_group()
+    mode.add_argument("--exact", action="store_true", help="full sort instead of sketches")
+    mode.add_argument("--validate", action="store_true", help="run both and report the approximation error")
+    quant.add_argument("--out", help="write the JSON report here")
+
+    feat = commands.add_parser("features", help="rolling 1/3/6/12-month card features for risk and fraud")
+    feat.add_argument("--data", required=True,
+                      help="directory with new transactions / payments (cards too on the first build)")
+    feat.add_argument("--format", choices=FORMATS, default="csv")
+    feat.add_argument("--state", help="feature state directory: continued from if present, saved after")
+    feat.add_argument("--history", action="store_true", help="features at every month end, not just the last")
+    feat.add_argument("--out", help="write card_features to this directory")
+    feat.add_argument("--out-format", choices=FORMATS, help="defaults to --format")
+    feat.add_argument("--chunk-rows", type=int, default=READ_CHUNK_ROWS)
+
+    cube = commands.add_parser("cube", help="build / query the additive spend cube for the dashboards")
+    source = cube.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data", help="generated tables to build the cube from (one transactions scan)")
+    source.add_argument("--cube", help="previously exported cube Parquet file to query")
+    cube.add_argument("--format", choices=FORMATS, default="csv", help="with --data")
+    cube.add_argument("--chunk-rows", type=int, default=READ_CHUNK_ROWS)
+    cube.add_argument("--out", help="export the cube cells to this Parquet file")
+    cube.add_argument("--view", action="append", choices=list(VIEWS), help="print a summary table from the cube")
+    cube.add_argument("--rollup", help=f"comma-separated dimensions to roll up to ({', '.join(DIMENSIONS)})")
+    cube.add_argument("--where", action="append", default=[], metavar="DIM=VALUE",
+                      help="keep cells with this dimension value (repeatable; VALUE may be a|b)")
+    cube.add_argument("--measures", default="txn_count,spend_usd,spend_share,fraud_rate",
+                      help=f"with --rollup: {', '.join(MEASURES)}, avg_ticket_usd, spend_share, txn_share, fraud_rate")
+
+    args = parser.parse_args(argv)
+
+    start_time = time.time()
+
+    def log(msg):
+        elapsed = round(time.time() - start_time, 2)
+        print(f"[{elapsed}s] {msg}")
+
+    if args.command == "build":
+        changed = args.changed.split(",") if args.changed else None
+        if changed and args.data and args.database == ":memory:":
+            parser.error("--changed with --data needs a --database file holding the previous build")
+        if args.dsn:
+            execute, close = postgres_executor(args.dsn, args.workers)
+        else:
+            con = require_duckdb().connect(args.database)
+            register_sources(con, args.data, args.format)
+            execute, close = duckdb_executor(con)
+        try:
+            build_summaries(execute, changed, args.sql, args.workers, log)
+        finally:
+            close()
+        return
+
+    if args.command == "refresh":
+        months = args.months.split(",") if args.months else None
+        if args.data and not args.database:
+            parser.error("refresh with --data needs a --database file holding the previous build")
+        if args.dsn:
+            con = require_psycopg().connect(args.dsn)
+            execute, close = postgres_executor(args.dsn, args.workers)
+        else:
+            con = require_duckdb().connect(args.database)
+            register_sources(con, args.data, args.format)
+            execute, close = duckdb_executor(con)
+        try:
+            refresh_summaries(con, execute, months, args.sql, args.workers, log)
+        finally:
+            close()
+            con.close()
+        return
+
+    if args.command == "features":
+        resumed = bool(args.state) and CardFeatures.exists(args.state)
+        engine = CardFeatures.load(args.state) if resumed else CardFeatures()
+        if os.path.exists(table_path(args.data, "cards", args.format)):
+            engine.set_credit_limits(read_table(args.data, "cards", args.format, columns=["card_id", "credit_limit"]))
+        if resumed:
+            log(f"Continuing from {args.state} (as of {np.datetime64(engine.month, 'M')})")
+
+        totals = read_totals(args.data, args.format, args.chunk_rows)
+        log(f"{sum(totals.rows.values()):,} new rows over {len(totals.months)} month(s)")
+        features = backfill(engine, totals) if args.history else engine.apply(totals).features()
+        log(f"{len(features):,} feature rows as of {np.datetime64(engine.month, 'M')} "
+            f"({engine.late_rows:,} rows too old for the 12-month history, {engine.undated_rows:,} undated)")
+
+        if args.state:
+            engine.save(args.state)
+            log(f"State saved: {args.state}")
+        if args.out:
+            os.makedirs(args.out, exist_ok=True)
+            write_table(features, args.out, "card_features", args.out_format or args.format)
+            log(f"Features written: {args.out}")
+        return
+
+    if args.command == "cube":
+        spend_cube = build_cube(args.data, args.format, args.chunk_rows, log) if args.data else Cube.load(args.cube)
+        if args.out:
+            spend_cube.save(args.out)
+            log(f"Cube exported: {args.out}")
+        for name in args.view or []:
+            print(f"--- {name} ---")
+            print(spend_cube.view(name).to_string(index=False))
+        if args.rollup is not None:
+            where = {}
+            for condition in args.where:
+                dim, value = condition.split("=", 1)
+                values = value.split("|")
+                if dim == "month":
+                    values = [pd.Period(v, "M") for v in values]
+                elif dim == "is_international":
+                    values = [v.lower() == "true" for v in values]
+                where[dim] = values
+            by = [dim for dim in args.rollup.split(",") if dim]
+            print(spend_cube.rollup(by, args.measures.split(","), where).to_string(index=False))
+        return
+
+    if args.command == "quantiles":
+        k = k_for_error(args.error) if args.error else args.k
+        if args.dsn:
+            con = require_psycopg().connect(args.dsn)
+            customers = postgres_customer_count(con)
+            chunks = postgres_spend_chunks(con, args.chunk_rows)
+        else:
+            ids, spend = customer_spend(args.data, args.format, args.chunk_rows)
+            customers = len(ids)
+            chunks = spend_chunks(ids, spend, args.chunk_rows)
+        log(f"{customers:,} customers with spend")
+
+        if args.exact or args.validate:
+            if args.dsn:
+                chunks = list(chunks)
+                ids = np.concatenate([c[0] for c in chunks])
+                spend = np.concatenate([c[1] for c in chunks])
+            exact = exact_summary(ids, spend, args.top_share)
+        if args.exact:
+            report = exact
+        else:
+            report = approx_summary(chunks, customers, k, args.top_share)
+            if args.validate:
+                report = {"approx": report, "exact": exact, "errors": compare(report, exact, spend)}
+        if args.dsn:
+            con.close()
+
+        print(json.dumps(report, indent=2))
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(report, f, indent=2)
+        log("Quantiles completed")
+        return
+
+    con = run_analysis(args.data, fmt=args.format, out_dir=args.out, out_format=args.out_format,
+                       sql_path=args.sql, database=args.database, log=log)
+    con.close()
+    log("Analysis completed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Dependency-aware build of the summary tables.
+
+Every `CREATE TABLE x AS ...` in the analysis script is a node that depends
+on the summary tables it reads. Nodes whose inputs are built run
+concurrently, each on its own connection, so a full refresh takes about as
+long as the longest chain rather than the sum of all tables. Given the
+changed input tables, only the nodes downstream of them are rebuilt.
+
+Each node is rebuilt as DROP + CREATE in its own transaction.
+"""
+
+import queue
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .sql_script import ANALYSIS_SQL, load_script
+
+DEFAULT_WORKERS = 4
+
+
+def build_graph(statements):
+    """
+    {table: {"query", "reads", "deps"}} for every create statement, where
+    deps are the summary tables (other nodes) it reads. Other statement
+    kinds are not part of the graph.
+    """
+    creates = [s for s in statements if s["kind"] == "create"]
+    names = {s["table"] for s in creates}
+    return {
+        s["table"]: {
+            "query": s["query"],
+            "reads": s["reads"],
+            "deps": [t for t in s["reads"] if t in names and t != s["table"]]
+        }
+        for s in creates
+    }
+
+
+def downstream(graph, changed):
+    """Nodes that read any of `changed` (input or summary tables), directly or not."""
+    changed = set(changed)
+    selected = set()
+    grew = True
+    while grew:
+        grew = False
+        for name, node in graph.items():
+            if name not in selected and (changed | selected) & set(node["reads"]):
+                selected.add(name)
+                grew = True
+    return selected
+
+
+def critical_path(graph, timings):
+    """(seconds, [nodes]) of the slowest dependency chain among the built nodes."""
+    best = {}
+
+    def finish(name):
+        if name not in best:
+            deps = [finish(d) for d in graph[name]["deps"] if d in timings]
+            seconds, chain = max(deps, default=(0.0, []))
+            best[name] = (seconds + timings[name], chain + [name])
+        return best[name]
+
+    return max((finish(name) for name in timings), default=(0.0, []))
+
+
+def run_dag(graph, execute, nodes=None, workers=DEFAULT_WORKERS, log=print):
+    """
+    Run execute(name, query) for `nodes` (default: all) in dependency order,
+    up to `workers` at a time. Dependencies outside `nodes` are taken as
+    already built. Returns {node: seconds}.
+    """
+    nodes = set(graph) if nodes is None else set(nodes)
+    waiting = {name: {d for d in graph[name]["deps"] if d in nodes} for name in nodes}
+    timings = {}
+
+    def run(name):
+        start = time.time()
+        execute(name, graph[name]["query"])
+        return time.time() - start
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        while waiting or running:
+            for name in sorted(n for n, deps in waiting.items() if not deps):
+                del waiting[name]
+                running[executor.submit(run, name)] = name
+
+            if not running:
+                raise ValueError(f"Dependency cycle among {sorted(waiting)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                timings[name] = future.result()
+                log(f"{name}: {timings[name]:.2f}s")
+                for deps in waiting.values():
+                    deps.discard(name)
+
+    return timings
+
+
+def postgres_executor(dsn, workers):
+    """(execute, close) running each node on a pooled psycopg connection."""
+    from data_generation.postgres_loader import require_psycopg
+
+    psycopg = require_psycopg()
+    pool = queue.Queue()
+    for _ in range(workers):
+        pool.put(psycopg.connect(dsn))
+
+    def execute(name, query):
+        conn = pool.get()
+        try:
+            with conn.transaction():
+                conn.execute(f"DROP TABLE IF EXISTS {name}")
+                conn.execute(f"CREATE TABLE {name} AS {query}")
+        finally:
+            pool.put(conn)
+
+    def close():
+        while not pool.empty():
+            pool.get().close()
+
+    return execute, close
+
+
+def duckdb_executor(con):
+    """(execute, close) running each node on its own cursor of a DuckDB connection."""
+    from .duckdb_runner import translate
+
+    def execute(name, query):
+        cursor = con.cursor()
+        try:
+            cursor.execute(f"CREATE OR REPLACE TABLE {name} AS {translate(query)}")
+        finally:
+            cursor.close()
+
+    return execute, lambda: None
+
+
+def build_summaries(execute, changed=None, sql_path=ANALYSIS_SQL, workers=DEFAULT_WORKERS, log=print):
+    """
+    Build the summary tables of the analysis script with `execute`; with
+    `changed`, only the ones downstream of those tables. Returns {node: seconds}.
+    """
+    graph = build_graph(load_script(sql_path))
+    nodes = None if changed is None else downstream(graph, changed)
+    log(f"Building {len(graph) if nodes is None else len(nodes)} of {len(graph)} summary tables "
+        f"with {workers} workers")
+
+    start = time.time()
+    timings = run_dag(graph, execute, nodes, workers, log)
+    seconds, chain = critical_path(graph, timings)
+    log(f"Built in {time.time() - start:.2f}s (sum of nodes {sum(timings.values()):.2f}s, "
+        f"longest chain {seconds:.2f}s: {' -> '.join(chain)})")
+    return timings
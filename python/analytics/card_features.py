@@ -0,0 +1,306 @@
+"""
+Rolling per-card features for risk and fraud models: spend, transaction
+velocity, international / online share, statement utilization, spend to
+credit limit and payment ratio over the last 1, 3, 6 and 12 months
+(section 7 has only the monthly spend to limit).
+
+State is array-backed and indexed by card_id. For every measure it holds a
+ring of the last 12 monthly totals per card and a running sum per window.
+New rows are added to their month's slot and to every window still
+covering that month. Moving to a new month subtracts the month that leaves
+each window. An update costs O(new rows + cards x months advanced), never
+a groupby over the full history, so month-end builds scale with the new
+data. The state saves to a directory (arrays + JSON) and reloads to carry
+on from there.
+
+update() is the incremental mode. backfill() replays a whole history and
+snapshots the features at every month end.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_generation.table_io import READ_CHUNK_ROWS, iter_table, table_path
+
+WINDOWS = [1, 3, 6, 12]
+HISTORY = max(WINDOWS)
+
+# Monthly totals kept per card: spend in USD and in the card's own currency
+# (which credit_limit and payment_amount use), counts, payments, and the
+# sum and count of statement utilization (payments.utilization)
+MEASURES = ["spend_usd", "spend", "txn_count", "intl_count", "online_count", "payment_amount",
+            "utilization", "statements"]
+M = {name: i for i, name in enumerate(MEASURES)}
+
+TRANSACTION_COLUMNS = ["card_id", "transaction_date", "amount", "amount_usd", "merchant_type", "is_international"]
+PAYMENT_COLUMNS = ["card_id", "payment_date", "payment_amount", "missed_streak", "utilization"]
+
+STATE_JSON = "features.json"
+STATE_ARRAYS = "features.npz"
+
+
+def _months(dates):
+    """Month ordinals (months since 1970-01) and a validity mask."""
+    months = dates.to_numpy(dtype="datetime64[M]")
+    return months.view(np.int64), ~np.isnat(months)
+
+
+def _by_month(months, cards, values, size):
+    """{month: (len(values) x size) per-card sums} from row-aligned arrays."""
+    unique, inverse = np.unique(months, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(inverse, minlength=len(unique)))])
+    result = {}
+    for i, month in enumerate(unique):
+        rows = order[bounds[i]:bounds[i + 1]]
+        result[int(month)] = np.stack([
+            np.bincount(cards[rows], weights=v[rows], minlength=size) for v in values
+        ])
+    return result
+
+
+class MonthlyTotals:
+    """
+    Per-card monthly totals of a batch of new rows, before they are applied.
+    Batches (e.g. file chunks) merge, so rows can be read in any order.
+    """
+
+    def __init__(self):
+        self.months = {}
+        self.rows = {}
+        self.undated = 0
+        # Latest missed_streak seen per card, with the month it was seen in
+        self.streak = np.zeros(0, dtype=np.int64)
+        self.streak_month = np.full(0, -1, dtype=np.int64)
+
+    def _add(self, months, cards, index, values):
+        size = cards.max(initial=-1) + 1
+        for month, totals in _by_month(months, cards, values, size).items():
+            current = self.months.get(month)
+            if current is None:
+                current = self.months[month] = np.zeros((len(MEASURES), size))
+            elif current.shape[1] < size:
+                current = self.months[month] = np.pad(current, ((0, 0), (0, size - current.shape[1])))
+            current[index, :size] += totals
+        for month, count in zip(*np.unique(months, return_counts=True)):
+            self.rows[int(month)] = self.rows.get(int(month), 0) + int(count)
+
+    def add_transactions(self, transactions):
+        months, valid = _months(transactions["transaction_date"])
+        self.undated += int((~valid).sum())
+        t = transactions[valid]
+        self._add(months[valid], t["card_id"].to_numpy(np.int64), [M[m] for m in MEASURES[:5]], [
+            t["amount_usd"].to_numpy(np.float64, na_value=0.0),
+            t["amount"].to_numpy(np.float64, na_value=0.0),
+            np.ones(len(t)),
+            t["is_international"].to_numpy(np.float64, na_value=0.0),
+            (t["merchant_type"] == "Online").to_numpy(np.float64)
+        ])
+        return self
+
+    def add_payments(self, payments):
+        months, valid = _months(payments["payment_date"])
+        self.undated += int((~valid).sum())
+        p = payments[valid]
+        months, cards = months[valid], p["card_id"].to_numpy(np.int64)
+        utilization = p["utilization"].to_numpy(np.float64, na_value=np.nan)
+        self._add(months, cards, [M["payment_amount"], M["utilization"], M["statements"]], [
+            p["payment_amount"].to_numpy(np.float64, na_value=0.0),
+            np.nan_to_num(utilization),
+            (~np.isnan(utilization)).astype(np.float64)
+        ])
+
+        # Latest streak per card: last row per card after ordering by (card, month)
+        order = np.lexsort((months, cards))
+        last = order[np.r_[cards[order][1:] != cards[order][:-1], True]]
+        size = cards.max(initial=-1) + 1
+        if len(self.streak) < size:
+            self.streak = np.pad(self.streak, (0, size - len(self.streak)))
+            self.streak_month = np.pad(self.streak_month, (0, size - len(self.streak_month)), constant_values=-1)
+        newer = months[last] >= self.streak_month[cards[last]]
+        self.streak[cards[last][newer]] = p["missed_streak"].to_numpy(np.int64, na_value=0)[last][newer]
+        self.streak_month[cards[last][newer]] = months[last][newer]
+        return self
+
+
+class CardFeatures:
+    """Sliding 1/3/6/12-month windows of MEASURES per card, as of the latest month seen."""
+
+    def __init__(self):
+        self.month = None
+        self.ring = np.zeros((len(MEASURES), HISTORY, 0))
+        self.windows = np.zeros((len(MEASURES), len(WINDOWS), 0))
+        self.credit_limit = np.full(0, np.nan)
+        self.streak = np.zeros(0, dtype=np.int64)
+        self.streak_month = np.full(0, -1, dtype=np.int64)
+        # Rows older than the 12-month history when they arrived, and rows without a date
+        self.late_rows = 0
+        self.undated_rows = 0
+
+    @property
+    def cards(self):
+        return self.ring.shape[2]
+
+    def _grow(self, size):
+        extra = size - self.cards
+        if extra <= 0:
+            return
+        self.ring = np.pad(self.ring, ((0, 0), (0, 0), (0, extra)))
+        self.windows = np.pad(self.windows, ((0, 0), (0, 0), (0, extra)))
+        self.credit_limit = np.pad(self.credit_limit, (0, extra), constant_values=np.nan)
+        self.streak = np.pad(self.streak, (0, extra))
+        self.streak_month = np.pad(self.streak_month, (0, extra), constant_values=-1)
+
+    def set_credit_limits(self, cards):
+        """credit_limit per card_id, in the card's currency like amount and payment_amount."""
+        card_ids = cards["card_id"].to_numpy(np.int64)
+        self._grow(card_ids.max(initial=-1) + 1)
+        self.credit_limit[card_ids] = cards["credit_limit"].to_numpy(np.float64, na_value=np.nan)
+        return self
+
+    def _advance(self, month):
+        if self.month is None or month - self.month >= HISTORY:
+            self.ring[:] = 0
+            self.windows[:] = 0
+            self.month = month
+            return
+        while self.month < month:
+            self.month += 1
+            # The month that leaves window w is month - w; the 12-month one frees its slot
+            for wi, w in enumerate(WINDOWS):
+                self.windows[:, wi] -= self.ring[:, (self.month - w) % HISTORY]
+            self.ring[:, self.month % HISTORY] = 0
+        np.maximum(self.windows, 0, out=self.windows)
+
+    def _add(self, month, totals):
+        age = self.month - month
+        if age >= HISTORY:
+            return False
+        size = totals.shape[1]
+        self._grow(size)
+        self.ring[:, month % HISTORY, :size] += totals
+        for wi, w in enumerate(WINDOWS):
+            if age < w:
+                self.windows[:, wi, :size] += totals
+        return True
+
+    def apply(self, totals, on_month=None):
+        """
+        Fold a MonthlyTotals batch in, month by month. Months after the current
+        one advance the windows; earlier ones still inside the 12-month history
+        are added where they belong. on_month(self) runs at each new month.
+        """
+        for month in sorted(totals.months):
+            if self.month is None or month > self.month:
+                self._advance(month)
+                if not self._add(month, totals.months[month]):
+                    self.late_rows += totals.rows[month]
+                if on_month is not None:
+                    on_month(self)
+            elif not self._add(month, totals.months[month]):
+                self.late_rows += totals.rows[month]
+
+        self.undated_rows += totals.undated
+        size = len(totals.streak)
+        self._grow(size)
+        newer = totals.streak_month >= self.streak_month[:size]
+        self.streak[:size][newer] = totals.streak[newer]
+        self.streak_month[:size][newer] = totals.streak_month[newer]
+        return self
+
+    def update(self, transactions=None, payments=None, on_month=None):
+        """Incremental mode: add new transaction / payment rows (any order)."""
+        totals = MonthlyTotals()
+        if transactions is not None:
+            totals.add_transactions(transactions)
+        if payments is not None:
+            totals.add_payments(payments)
+        return self.apply(totals, on_month)
+
+    def features(self):
+        """One row per card with activity in the last 12 months, as of the current month."""
+        active = np.flatnonzero(self.windows[:, WINDOWS.index(HISTORY)].any(axis=0))
+        w = self.windows[:, :, active]
+        limit = self.credit_limit[active]
+        cols = {
+            "card_id": active.astype(np.int32),
+            "as_of_month": pd.Period(np.datetime64(self.month, "M"), "M") if self.month is not None else None
+        }
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for wi, months in enumerate(WINDOWS):
+                txns = w[M["txn_count"], wi]
+                spend = w[M["spend"], wi]
+                statements = w[M["statements"], wi]
+                cols[f"spend_usd_{months}m"] = w[M["spend_usd"], wi]
+                cols[f"txn_count_{months}m"] = txns.astype(np.int32)
+                cols[f"intl_share_{months}m"] = np.where(txns > 0, w[M["intl_count"], wi] / txns, np.nan)
+                cols[f"online_share_{months}m"] = np.where(txns > 0, w[M["online_count"], wi] / txns, np.nan)
+                # Mean statement balance over limit, and spend over the limit available in the window
+                cols[f"utilization_{months}m"] = np.where(statements > 0, w[M["utilization"], wi] / statements, np.nan)
+                cols[f"spend_to_limit_{months}m"] = spend / (months * limit)
+                cols[f"payment_ratio_{months}m"] = np.where(spend > 0, w[M["payment_amount"], wi] / spend, np.nan)
+
+            # Velocity: last month's transactions against the 12-month monthly average
+            monthly = w[M["txn_count"], WINDOWS.index(HISTORY)] / HISTORY
+            cols["velocity_1m_vs_12m"] = np.where(monthly > 0, w[M["txn_count"], 0] / monthly, np.nan)
+
+        cols["missed_streak"] = self.streak[active].astype(np.int16)
+        df = pd.DataFrame(cols)
+        floats = df.select_dtypes("float64").columns
+        df[floats] = df[floats].astype(np.float32)
+        return df
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, STATE_JSON)):
+            os.remove(os.path.join(path, STATE_JSON))
+        np.savez_compressed(os.path.join(path, STATE_ARRAYS), ring=self.ring, windows=self.windows,
+                            credit_limit=self.credit_limit, streak=self.streak, streak_month=self.streak_month)
+
+        # JSON goes last: it is what marks the state as complete
+        meta = {"month": self.month, "measures": MEASURES, "windows": WINDOWS,
+                "late_rows": self.late_rows, "undated_rows": self.undated_rows}
+        with open(os.path.join(path, STATE_JSON), "w") as f:
+            json.dump(meta, f, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, STATE_JSON)) as f:
+            meta = json.load(f)
+        if meta["measures"] != MEASURES or meta["windows"] != WINDOWS:
+            raise ValueError(f"Feature state in {path} was built with other measures or windows; rebuild it")
+
+        engine = cls()
+        engine.month = meta["month"]
+        engine.late_rows, engine.undated_rows = meta["late_rows"], meta["undated_rows"]
+        with np.load(os.path.join(path, STATE_ARRAYS)) as arrays:
+            for name in ["ring", "windows", "credit_limit", "streak", "streak_month"]:
+                setattr(engine, name, arrays[name])
+        return engine
+
+    @classmethod
+    def exists(cls, path):
+        return os.path.exists(os.path.join(path, STATE_JSON))
+
+
+def backfill(engine, totals):
+    """Replay `totals` through `engine`, returning the features at every month end."""
+    snapshots = []
+    engine.apply(totals, on_month=lambda e: snapshots.append(e.features()))
+    return pd.concat(snapshots, ignore_index=True) if snapshots else engine.features()
+
+
+def read_totals(directory, fmt="csv", chunk_rows=READ_CHUNK_ROWS):
+    """MonthlyTotals of the transactions and payments files in `directory`, read in chunks."""
+    totals = MonthlyTotals()
+    for name, columns, add in [("transactions", TRANSACTION_COLUMNS, totals.add_transactions),
+                               ("payments", PAYMENT_COLUMNS, totals.add_payments)]:
+        if os.path.exists(table_path(directory, name, fmt)):
+            for chunk in iter_table(directory, name, fmt, chunk_rows, columns=columns):
+                add(chunk)
+    return totals
@@ -0,0 +1,270 @@
+"""
+Additive spend cube for the dashboards.
+
+One chunked scan of transactions (with fraud_flags and the card -> customer
+segment link) aggregates into a cube over DIMENSIONS with additive MEASURES.
+Every roll-up, filter and percent share the dashboards need is then a
+groupby over a few thousand cube cells instead of a scan of the raw
+transactions. VIEWS rebuild the transaction summaries of
+sql/03_analysis_queries.sql (category / channel / weekend shares, monthly
+spend, fraud) under their SQL names.
+
+Cells are keyed by one mixed-radix integer built from the dimension codes
+(the schema's fixed category lists, the month ordinal), so each chunk is
+reduced with np.unique + bincount and chunk results merge by key.
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_generation.schema import categories
+from data_generation.table_io import READ_CHUNK_ROWS, iter_table
+
+DIMENSIONS = ["month", "customer_segment", "merchant_category", "merchant_type", "day_type",
+              "merchant_country", "is_international"]
+
+# Additive measures. spend_usd / amount_count skip missing amounts, as SUM and
+# AVG do; fraud_* count transactions that have a fraud flag.
+MEASURES = ["txn_count", "amount_count", "spend_usd", "fraud_count", "fraud_spend_usd"]
+
+# Undated transactions are Weekday, as in the SQL CASE on EXTRACT(DOW ...)
+DAY_TYPES = ["Weekday", "Weekend"]
+
+TRANSACTION_COLUMNS = ["transaction_id", "card_id", "transaction_date", "merchant_category",
+                       "merchant_type", "merchant_country", "amount_usd", "is_international"]
+
+# Summary tables served from the cube, with the SQL column names and order.
+# Columns map output name -> cube measure or derived value (see Cube.rollup).
+VIEWS = {
+    "category_spend_summary": {
+        "by": ["merchant_category"],
+        "columns": {"trxn_count": "txn_count", "total_spend_usd": "spend_usd", "percent_share": "spend_share"},
+        "order": ("total_spend_usd", False)
+    },
+    "channel_spend_summary": {
+        "by": ["merchant_type"],
+        "columns": {"trxn_count": "txn_count", "total_spend_usd": "spend_usd", "percent_share": "spend_share"},
+        "order": ("total_spend_usd", False)
+    },
+    "weekend_spend_summary": {
+        "by": ["day_type"],
+        "columns": {"trxn_count": "txn_count", "total_spend_usd": "spend_usd", "percent_share": "spend_share"},
+        "order": ("total_spend_usd", False)
+    },
+    "monthly_spend_summary": {
+        "by": ["month"],
+        "columns": {"total_spend": "spend_usd", "txn_count": "txn_count"},
+        "order": ("month", True)
+    },
+    "fraud_summary": {
+        "by": [],
+        "columns": {"fraud_txn": "fraud_count", "fraud_amount": "fraud_spend_usd", "total_txn": "txn_count",
+                    "fraud_rate_percent": "fraud_rate"},
+        "order": None
+    },
+    "fraud_by_segment": {
+        "by": ["customer_segment"],
+        "columns": {"total_txns": "txn_count", "fraud_txns": "fraud_count", "fraud_rate_percent": "fraud_rate"},
+        "order": ("fraud_rate_percent", False)
+    }
+}
+
+
+def _dimension_labels():
+    cats = categories()
+    return {
+        "customer_segment": cats["customer_segment"],
+        "merchant_category": cats["merchant_category"],
+        "merchant_type": cats["merchant_type"],
+        "day_type": DAY_TYPES,
+        "merchant_country": cats["merchant_country"],
+        "is_international": [False, True]
+    }
+
+
+def _codes(values):
+    """Category codes shifted by one, so a missing value is 0."""
+    return values.cat.codes.to_numpy(np.int64) + 1
+
+
+def _lookup_table(keys, values, size):
+    table = np.full(size, -1, dtype=np.int64)
+    table[keys] = values
+    return table
+
+
+def segment_by_card(directory, fmt="csv"):
+    """customer_segment code per card_id (-1 when unknown)."""
+    customers = pd.concat(iter_table(directory, "customers", fmt, columns=["customer_id", "customer_segment"]))
+    cards = pd.concat(iter_table(directory, "cards", fmt, columns=["card_id", "customer_id"]))
+    customer_ids = customers["customer_id"].to_numpy(np.int64)
+    by_customer = _lookup_table(customer_ids, customers["customer_segment"].cat.codes.to_numpy(),
+                                max(customer_ids.max(initial=0), cards["customer_id"].max()) + 1)
+    card_ids = cards["card_id"].to_numpy(np.int64)
+    return _lookup_table(card_ids, by_customer[cards["customer_id"].to_numpy(np.int64)], card_ids.max(initial=0) + 1)
+
+
+def fraud_mask(directory, fmt="csv"):
+    """Boolean array indexed by transaction_id: has a fraud flag."""
+    flagged = np.zeros(0, dtype=bool)
+    for chunk in iter_table(directory, "fraud_flags", fmt, columns=["transaction_id"]):
+        ids = chunk["transaction_id"].dropna().to_numpy(np.int64)
+        if ids.max(initial=-1) >= len(flagged):
+            flagged = np.pad(flagged, (0, ids.max() + 1 - len(flagged)))
+        flagged[ids] = True
+    return flagged
+
+
+def cube_chunk(transactions, segments, flagged):
+    """(keys, measures) of one transactions chunk: measures is (MEASURES x cells)."""
+    labels = _dimension_labels()
+    dates = transactions["transaction_date"].to_numpy(dtype="datetime64[D]")
+    undated = np.isnat(dates)
+    # Month ordinal + 1 (0 = undated); 1970-01-01 was a Thursday (weekday 3)
+    month = np.where(undated, 0, dates.astype("datetime64[M]").view(np.int64) + 1)
+    weekend = np.where(undated, False, (dates.view(np.int64) + 3) % 7 >= 5)
+
+    card_ids = transactions["card_id"].to_numpy(np.int64)
+    known = card_ids < len(segments)
+    segment = np.where(known, segments[np.where(known, card_ids, 0)], -1) + 1
+
+    codes = {
+        "customer_segment": segment,
+        "merchant_category": _codes(transactions["merchant_category"]),
+        "merchant_type": _codes(transactions["merchant_type"]),
+        "day_type": weekend.astype(np.int64) + 1,
+        "merchant_country": _codes(transactions["merchant_country"]),
+        "is_international": transactions["is_international"].to_numpy(np.int64, na_value=-1) + 1
+    }
+    key = month
+    for dim in DIMENSIONS[1:]:
+        key = key * (len(labels[dim]) + 1) + codes[dim]
+
+    txn_ids = transactions["transaction_id"].to_numpy(np.int64)
+    in_range = txn_ids < len(flagged)
+    is_fraud = np.where(in_range, flagged[np.where(in_range, txn_ids, 0)], False)
+    amount = transactions["amount_usd"].to_numpy(np.float64, na_value=np.nan)
+    has_amount = ~np.isnan(amount)
+    amount = np.where(has_amount, amount, 0.0)
+
+    keys, cells = np.unique(key, return_inverse=True)
+    measures = np.stack([
+        np.bincount(cells, minlength=len(keys)),
+        np.bincount(cells, weights=has_amount, minlength=len(keys)),
+        np.bincount(cells, weights=amount, minlength=len(keys)),
+        np.bincount(cells, weights=is_fraud, minlength=len(keys)),
+        np.bincount(cells, weights=np.where(is_fraud, amount, 0.0), minlength=len(keys))
+    ])
+    return keys, measures
+
+
+def _merge(parts):
+    keys = np.concatenate([k for k, _ in parts])
+    measures = np.concatenate([m for _, m in parts], axis=1)
+    keys, cells = np.unique(keys, return_inverse=True)
+    return keys, np.stack([np.bincount(cells, weights=row, minlength=len(keys)) for row in measures])
+
+
+def _decode(keys, measures):
+    """Cube DataFrame: categorical dimension columns plus the measures."""
+    labels = _dimension_labels()
+    columns = {}
+    for dim in reversed(DIMENSIONS[1:]):
+        radix = len(labels[dim]) + 1
+        codes = keys % radix - 1
+        keys = keys // radix
+        if dim == "is_international":
+            columns[dim] = pd.array(np.where(codes < 0, None, codes == 1), dtype="boolean")
+        else:
+            columns[dim] = pd.Categorical.from_codes(codes, categories=labels[dim])
+    months = np.where(keys > 0, keys - 1, 0).astype("datetime64[M]")
+    columns["month"] = pd.PeriodIndex(np.where(keys > 0, months, np.datetime64("NaT")), freq="M")
+
+    cube = pd.DataFrame({dim: columns[dim] for dim in DIMENSIONS})
+    for name, values in zip(MEASURES, measures):
+        cube[name] = values.astype(np.float64 if name.endswith("usd") else np.int64)
+    return cube
+
+
+def build_cube(directory, fmt="csv", chunk_rows=READ_CHUNK_ROWS, log=print):
+    """Scan transactions in `directory` once into a Cube."""
+    segments = segment_by_card(directory, fmt)
+    flagged = fraud_mask(directory, fmt)
+    parts = []
+    rows = 0
+    for chunk in iter_table(directory, "transactions", fmt, chunk_rows, columns=TRANSACTION_COLUMNS):
+        parts.append(cube_chunk(chunk, segments, flagged))
+        rows += len(chunk)
+        # Keep the pending partial cubes small
+        if len(parts) >= 8:
+            parts = [_merge(parts)]
+    cube = Cube(_decode(*_merge(parts)))
+    log(f"Cube: {rows:,} transactions -> {len(cube.cells):,} cells")
+    return cube
+
+
+class Cube:
+    """Roll-ups, filters and shares over the cube cells."""
+
+    def __init__(self, cells):
+        self.cells = cells
+
+    def rollup(self, by=(), measures=MEASURES, where=None):
+        """
+        Sum `measures` over the dimensions in `by`, after keeping cells that
+        match `where` ({dimension: value or list of values}). Besides the cube
+        measures, `measures` may name derived values: avg_ticket_usd,
+        spend_share / txn_share (percent of the filtered total) and
+        fraud_rate (percent of transactions).
+        """
+        cells = self.cells
+        for dim, value in (where or {}).items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            cells = cells[cells[dim].isin(values)]
+
+        by = list(by)
+        if by:
+            result = cells.groupby(by, observed=True, dropna=False, sort=True)[MEASURES].sum().reset_index()
+        else:
+            result = cells[MEASURES].sum().to_frame().T.astype(cells[MEASURES].dtypes)
+
+        derived = {
+            "avg_ticket_usd": lambda r: r["spend_usd"] / r["amount_count"].replace(0, np.nan),
+            "spend_share": lambda r: (r["spend_usd"] * 100.0 / r["spend_usd"].sum()).round(2),
+            "txn_share": lambda r: (r["txn_count"] * 100.0 / r["txn_count"].sum()).round(2),
+            "fraud_rate": lambda r: (r["fraud_count"] * 100.0 / r["txn_count"].replace(0, np.nan)).round(3)
+        }
+        for name in measures:
+            if name in derived:
+                result[name] = derived[name](result)
+        return result[by + list(measures)]
+
+    def view(self, name):
+        """A summary table of VIEWS, with the SQL column names."""
+        spec = VIEWS[name]
+        result = self.rollup(spec["by"], list(dict.fromkeys(spec["columns"].values())))
+        # Dollar sums to the cent, as the SUMs of NUMERIC(12,2) amount_usd in the SQL
+        columns = {out: result[src].round(2) if src.endswith("usd") else result[src]
+                   for out, src in spec["columns"].items()}
+        result = pd.concat([result[spec["by"]], pd.DataFrame(columns)], axis=1)
+        if spec["order"]:
+            column, ascending = spec["order"]
+            result = result.sort_values(column, ascending=ascending, ignore_index=True)
+        return result
+
+    def save(self, path):
+        """Write the cells as Parquet (dictionary-encoded dimensions, zstd)."""
+        cells = self.cells.copy()
+        cells["month"] = cells["month"].astype("string").astype("category")
+        cells.to_parquet(path, compression="zstd", index=False)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        cells = pd.read_parquet(path)
+        cells["month"] = pd.PeriodIndex(cells["month"].astype("string"), freq="M")
+        labels = _dimension_labels()
+        for dim in DIMENSIONS[1:-1]:
+            cells[dim] = pd.Categorical(cells[dim], categories=labels[dim])
+        cells["is_international"] = cells["is_international"].astype("boolean")
+        return cls(cells)
@@ -0,0 +1,134 @@
+"""
+In-process DuckDB backend for sql/03_analysis_queries.sql.
+
+The generated files (csv / parquet / feather) are exposed as views typed
+like sql/01_schema.sql, so money columns are DECIMAL just as in Postgres,
+and the summary statements run unchanged apart from TRANSLATIONS.
+DATE_TRUNC, EXTRACT(DOW ...), FILTER and percentile_cont ... WITHIN GROUP
+are native in DuckDB with Postgres semantics and need no shim.
+
+duckdb is only needed here and is imported on first use.
+"""
+
+import os
+import re
+import time
+
+from data_generation.postgres_loader import SCHEMA_SQL, TABLE_FILES, parse_schema
+from data_generation.table_io import FORMATS, table_path
+
+from .sql_script import ANALYSIS_SQL, load_script
+
+# Postgres -> DuckDB rewrites. A bare NUMERIC is DECIMAL(18,3) in DuckDB,
+# which would round e.g. 0.0065::numeric to 0.007.
+TRANSLATIONS = [
+    (re.compile(r"::\s*numeric\b(?!\s*\()", re.I), "::DECIMAL(38,10)"),
+    (re.compile(r"\bNUMERIC\b(?!\s*\()", re.I), "DECIMAL(38,10)")
+]
+
+
+def require_duckdb():
+    try:
+        import duckdb
+    except ImportError as exc:
+        raise ImportError("the DuckDB backend needs duckdb: pip install duckdb") from exc
+    return duckdb
+
+
+def translate(sql):
+    for pattern, replacement in TRANSLATIONS:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+def _quote(path):
+    return "'" + path.replace("'", "''") + "'"
+
+
+def _source(con, name, path, fmt):
+    """FROM-clause expression reading one generated file."""
+    if fmt == "csv":
+        return f"read_csv({_quote(path)}, header = true, auto_detect = true)"
+    if fmt == "parquet":
+        return f"read_parquet({_quote(path)})"
+    # feather: registered as a memory-mapped Arrow table
+    import pyarrow as pa
+    con.register(f"{name}_arrow", pa.ipc.open_file(pa.memory_map(path)).read_all())
+    return f"{name}_arrow"
+
+
+def register_sources(con, data_dir, fmt="csv", schema_path=SCHEMA_SQL):
+    """One table or view per schema table over its generated file, cast to the schema types."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    with open(schema_path) as f:
+        schema = parse_schema(f.read())
+
+    for table, columns in schema.items():
+        path = table_path(data_dir, TABLE_FILES.get(table, table), fmt)
+        source = _source(con, table, path, fmt)
+        present = {row[0] for row in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()}
+        casts = ", ".join(
+            f"CAST({c['name']} AS {translate(c['type'])}) AS {c['name']}"
+            for c in columns if c["name"] in present
+        )
+        # CSV is parsed once into a table; columnar files stay lazy views
+        kind = "TABLE" if fmt == "csv" else "VIEW"
+        con.execute(f"CREATE OR REPLACE {kind} {table} AS SELECT {casts} FROM {source}")
+    return list(schema)
+
+
+def export_table(con, table, out_dir, fmt="csv"):
+    path = table_path(out_dir, table, fmt)
+    if fmt == "csv":
+        con.execute(f"COPY {table} TO {_quote(path)} (FORMAT csv, HEADER true)")
+    elif fmt == "parquet":
+        con.execute(f"COPY {table} TO {_quote(path)} (FORMAT parquet, COMPRESSION zstd)")
+    else:
+        import pyarrow.feather as feather
+        feather.write_feather(con.execute(f"SELECT * FROM {table}").fetch_arrow_table(), path)
+    return path
+
+
+def run_statement(con, stmt):
+    """Run one parsed statement; creates replace their table, selects return a DataFrame."""
+    if stmt["kind"] in ("drop", "transaction"):
+        return None
+    if stmt["kind"] == "create":
+        con.execute(f"CREATE OR REPLACE TABLE {stmt['table']} AS {translate(stmt['query'])}")
+        return None
+    if stmt["kind"] == "select":
+        return con.execute(translate(stmt["sql"])).df()
+    con.execute(translate(stmt["sql"]))
+    return None
+
+
+def run_analysis(data_dir, fmt="csv", out_dir=None, out_format=None, sql_path=ANALYSIS_SQL,
+                 schema_path=SCHEMA_SQL, database=":memory:", log=print):
+    """
+    Build every summary table of the analysis script in DuckDB over the files
+    in data_dir; with out_dir, also write each summary table there.
+
+    Returns the open DuckDB connection so callers can query the results.
+    """
+    duckdb = require_duckdb()
+    con = duckdb.connect(database)
+    register_sources(con, data_dir, fmt, schema_path)
+
+    created = []
+    for stmt in load_script(sql_path):
+        start = time.time()
+        result = run_statement(con, stmt)
+        if stmt["kind"] == "create":
+            created.append(stmt["table"])
+            log(f"{stmt['table']}: {time.time() - start:.2f}s")
+        elif result is not None:
+            log(f"Query result:\n{result.to_string(index=False)}")
+
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+        for table in created:
+            export_table(con, table, out_dir, out_format or fmt)
+        log(f"Wrote {len(created)} summary tables to {out_dir}")
+
+    return con
@@ -0,0 +1,314 @@
+"""
+Incremental, month-partitioned refresh of the transaction summaries.
+
+Additive summaries are kept as per-month partitions keyed by
+DATE_TRUNC('month', transaction_date). A refresh finds the months touched
+by transactions above the watermark (the highest transaction_id already
+processed), recomputes only those partitions, and re-derives the final
+table from the small partition table (SUM/COUNT add up, AVG is SUM/COUNT,
+shares are taken over the summed totals). Refresh cost follows the new
+data, not the full history.
+
+Tables without a watermark row get a full initial build. Summaries that
+cannot be merged per month (Pareto ranking, percentile thresholds,
+everything reading those) are flagged for a full recompute, which
+refresh_summaries runs through the build_dag scheduler. The mode assumes transactions only
+grow: for changed cards or customers, run a full build.
+
+Runs on a psycopg or DuckDB connection; the SQL is valid in both.
+"""
+
+import time
+
+from .build_dag import DEFAULT_WORKERS, build_graph, downstream, run_dag
+from .sql_script import ANALYSIS_SQL, load_script
+
+WATERMARK_TABLE = "summary_watermark"
+
+# {where} filters transactions to the refreshed months. Tables with a
+# "final" query keep their month partitions in "<table>_by_month". These
+# restate the summaries of sql/03_analysis_queries.sql per month;
+# tests/test_incremental.py checks that a refresh still equals the script's
+# own full rebuild, so change both together.
+INCREMENTAL_TABLES = {
+    "monthly_spend_summary": {
+        "date_column": "transaction_date",
+        "partition": """
+            SELECT
+                DATE_TRUNC('month', transaction_date) AS month,
+                SUM(amount_usd) AS total_spend,
+                COUNT(transaction_id) AS txn_count,
+                COUNT(DISTINCT card_id) AS active_cards
+            FROM transactions
+            WHERE {where}
+            GROUP BY DATE_TRUNC('month', transaction_date)
+        """
+    },
+    "customer_monthly_spend_to_limit": {
+        "date_column": "t.transaction_date",
+        "partition": """
+            SELECT
+                c.customer_id,
+                DATE_TRUNC('month', t.transaction_date) AS month,
+                SUM(t.amount_usd) AS monthly_spend_usd,
+                cl.total_credit_limit_usd,
+                ROUND(
+                    SUM(t.amount_usd) / NULLIF(cl.total_credit_limit_usd, 0),
+                    4
+                ) AS monthly_spend_to_limit
+            FROM transactions t
+            JOIN cards ca ON ca.card_id = t.card_id
+            JOIN customers c ON c.customer_id = ca.customer_id
+            JOIN (
+                SELECT customer_id, SUM(credit_limit_usd) AS total_credit_limit_usd
+                FROM cards
+                GROUP BY customer_id
+            ) cl ON cl.customer_id = c.customer_id
+            WHERE {where}
+            GROUP BY c.customer_id, DATE_TRUNC('month', t.transaction_date), cl.total_credit_limit_usd
+        """
+    },
+    "customer_spend_summary": {
+        "date_column": "t.transaction_date",
+        "partition": """
+            SELECT
+                c.customer_id,
+                c.customer_segment,
+                DATE_TRUNC('month', t.transaction_date) AS month,
+                SUM(t.amount_usd) AS spend_usd,
+                COUNT(t.transaction_id) AS txn_count,
+                COUNT(t.amount_usd) AS amount_count
+            FROM customers c
+            JOIN cards cd ON c.customer_id = cd.customer_id
+            JOIN transactions t ON cd.card_id = t.card_id
+            WHERE {where}
+            GROUP BY c.customer_id, c.customer_segment, DATE_TRUNC('month', t.transaction_date)
+        """,
+        "final": """
+            SELECT
+                customer_id,
+                customer_segment,
+                SUM(spend_usd) AS total_spend_usd,
+                SUM(txn_count)::BIGINT AS total_transactions,
+                SUM(spend_usd) / NULLIF(SUM(amount_count), 0) AS avg_ticket_size
+            FROM {partitions}
+            GROUP BY customer_id, customer_segment
+        """
+    },
+    "category_spend_summary": {
+        "date_column": "transaction_date",
+        "partition": """
+            SELECT
+                DATE_TRUNC('month', transaction_date) AS month,
+                merchant_category,
+                COUNT(*) AS trxn_count,
+                SUM(amount_usd) AS total_spend_usd
+            FROM transactions
+            WHERE {where}
+            GROUP BY DATE_TRUNC('month', transaction_date), merchant_category
+        """,
+        "final": """
+            SELECT
+                merchant_category,
+                SUM(trxn_count)::BIGINT AS trxn_count,
+                SUM(total_spend_usd) AS total_spend_usd,
+                ROUND(SUM(total_spend_usd) * 100.0 / SUM(SUM(total_spend_usd)) OVER (), 2) AS percent_share
+            FROM {partitions}
+            GROUP BY merchant_category
+            ORDER BY total_spend_usd DESC
+        """
+    },
+    "channel_spend_summary": {
+        "date_column": "transaction_date",
+        "partition": """
+            SELECT
+                DATE_TRUNC('month', transaction_date) AS month,
+                merchant_type,
+                COUNT(*) AS trxn_count,
+                SUM(amount_usd) AS total_spend_usd
+            FROM transactions
+            WHERE {where}
+            GROUP BY DATE_TRUNC('month', transaction_date), merchant_type
+        """,
+        "final": """
+            SELECT
+                merchant_type,
+                SUM(trxn_count)::BIGINT AS trxn_count,
+                SUM(total_spend_usd) AS total_spend_usd,
+                ROUND(SUM(total_spend_usd) * 100.0 / SUM(SUM(total_spend_usd)) OVER (), 2) AS percent_share
+            FROM {partitions}
+            GROUP BY merchant_type
+            ORDER BY total_spend_usd DESC
+        """
+    },
+    "weekend_spend_summary": {
+        "date_column": "transaction_date",
+        "partition": """
+            SELECT
+                DATE_TRUNC('month', transaction_date) AS month,
+                CASE
+                    WHEN EXTRACT(DOW FROM transaction_date) IN (0, 6) THEN 'Weekend'
+                    ELSE 'Weekday'
+                END AS day_type,
+                COUNT(*) AS trxn_count,
+                SUM(amount_usd) AS total_spend_usd
+            FROM transactions
+            WHERE {where}
+            GROUP BY 1, 2
+        """,
+        "final": """
+            SELECT
+                day_type,
+                SUM(trxn_count)::BIGINT AS trxn_count,
+                SUM(total_spend_usd) AS total_spend_usd,
+                ROUND(SUM(total_spend_usd) * 100.0 / SUM(SUM(total_spend_usd)) OVER (), 2) AS percent_share
+            FROM {partitions}
+            GROUP BY day_type
+            ORDER BY total_spend_usd DESC
+        """
+    }
+}
+
+
+def _begin(con):
+    # psycopg opens a transaction implicitly; DuckDB needs an explicit one
+    if hasattr(con, "begin"):
+        con.begin()
+
+
+def _month_literal(month):
+    return "NULL" if month is None else f"TIMESTAMP '{month:%Y-%m-%d}'"
+
+
+def month_filter(column, months):
+    """SQL predicate matching rows of `column` in `months` (None = undated rows)."""
+    dated = [m for m in months if m is not None]
+    parts = []
+    if dated:
+        parts.append(f"DATE_TRUNC('month', {column}) IN ({', '.join(map(_month_literal, dated))})")
+    if len(dated) < len(months):
+        parts.append(f"{column} IS NULL")
+    return "(" + " OR ".join(parts) + ")" if parts else "FALSE"
+
+
+def partition_table(table):
+    spec = INCREMENTAL_TABLES[table]
+    return f"{table}_by_month" if "final" in spec else table
+
+
+def _ensure_watermark(con):
+    con.execute(
+        f"CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} ("
+        "table_name VARCHAR(100) PRIMARY KEY, "
+        "last_transaction_id BIGINT, "
+        "months_refreshed INT, "
+        "refreshed_at TIMESTAMP)"
+    )
+
+
+def _watermarks(con):
+    return dict(con.execute(f"SELECT table_name, last_transaction_id FROM {WATERMARK_TABLE}").fetchall())
+
+
+def full_recompute(graph):
+    """Summaries fed by transactions that cannot be merged per month."""
+    return downstream(graph, ["transactions"]) - set(INCREMENTAL_TABLES)
+
+
+def changed_months(con, after_id, up_to_id):
+    """Months (None for undated rows) of transactions with after_id < id <= up_to_id."""
+    rows = con.execute(
+        "SELECT DISTINCT DATE_TRUNC('month', transaction_date) FROM transactions "
+        f"WHERE transaction_id > {int(after_id)} AND transaction_id <= {int(up_to_id)}"
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def refresh_table(con, table, months=None):
+    """
+    Recompute `table` for `months` (all months when None) and re-derive its
+    final form. Runs in one transaction.
+    """
+    spec = INCREMENTAL_TABLES[table]
+    partitions = partition_table(table)
+
+    _begin(con)
+    if months is None:
+        con.execute(f"DROP TABLE IF EXISTS {partitions}")
+        con.execute(f"CREATE TABLE {partitions} AS {spec['partition'].format(where='TRUE')}")
+    else:
+        con.execute(f"DELETE FROM {partitions} WHERE {month_filter('month', months)}")
+        where = month_filter(spec["date_column"], months)
+        con.execute(f"INSERT INTO {partitions} {spec['partition'].format(where=where)}")
+
+    if "final" in spec:
+        con.execute(f"DROP TABLE IF EXISTS {table}")
+        con.execute(f"CREATE TABLE {table} AS {spec['final'].format(partitions=partitions)}")
+    con.commit()
+
+
+def refresh(con, tables=None, months=None, log=print):
+    """
+    Bring the incremental summaries up to date.
+
+    `months` (e.g. ["2025-12"]) forces those partitions to be recomputed as
+    well. Returns the tables that were refreshed.
+    """
+    import pandas as pd
+
+    tables = list(INCREMENTAL_TABLES) if tables is None else tables
+    forced = [pd.Timestamp(m + "-01" if len(m) == 7 else m).to_pydatetime() for m in months or []]
+
+    _begin(con)
+    _ensure_watermark(con)
+    con.commit()
+
+    marks = _watermarks(con)
+    high = con.execute("SELECT COALESCE(MAX(transaction_id), 0) FROM transactions").fetchone()[0]
+
+    refreshed = []
+    for table in tables:
+        start = time.time()
+        if table not in marks:
+            refresh_table(con, table, None)
+            n_months = None
+        else:
+            todo = changed_months(con, marks[table], high)
+            seen = {None if m is None else f"{m:%Y-%m}" for m in todo}
+            todo += [m for m in forced if f"{m:%Y-%m}" not in seen]
+            if not todo:
+                log(f"{table}: up to date")
+                continue
+            refresh_table(con, table, todo)
+            n_months = len(todo)
+
+        _begin(con)
+        con.execute(f"DELETE FROM {WATERMARK_TABLE} WHERE table_name = '{table}'")
+        con.execute(
+            f"INSERT INTO {WATERMARK_TABLE} VALUES "
+            f"('{table}', {int(high)}, {'NULL' if n_months is None else n_months}, CURRENT_TIMESTAMP)"
+        )
+        con.commit()
+
+        refreshed.append(table)
+        scope = "full build" if n_months is None else f"{n_months} month(s)"
+        log(f"{table}: {scope} in {time.time() - start:.2f}s")
+
+    return refreshed
+
+
+def refresh_summaries(con, execute, months=None, sql_path=ANALYSIS_SQL, workers=DEFAULT_WORKERS, log=print):
+    """
+    Incrementally refresh the additive summaries on `con`, then rebuild the
+    non-additive ones downstream of transactions with `execute` (see
+    build_dag). Returns the refreshed tables.
+    """
+    refreshed = refresh(con, months=months, log=log)
+    if not refreshed:
+        return refreshed
+
+    graph = build_graph(load_script(sql_path))
+    nodes = full_recompute(graph)
+    log(f"Full recompute of {len(nodes)} non-additive summaries: {', '.join(sorted(nodes))}")
+    run_dag(graph, execute, nodes, workers, log)
+    return refreshed
@@ -0,0 +1,326 @@
+"""
+Approximate spend quantiles and top-K for the Pareto (section 6) and
+customer segmentation (section 10) summaries.
+
+Both sections sort every customer by total_spend_usd: window functions for
+the Pareto ranking, percentile_cont(0.80 / 0.50) for the segment
+thresholds. Here customer totals are streamed in chunks into
+
+- QuantileSketch, a KLL sketch: a stack of compactors where level h holds
+  items of weight 2^h and a full level is sorted and every other item
+  promoted. Size is O(k log(n/k)), the rank error about
+  rank_error(k) (1.3% at the default k=200), independent of n.
+- TopK, the exact k largest totals with their customer IDs, kept with a
+  partial selection per chunk rather than a full sort.
+
+Both merge: sketches of disjoint customer ranges (generator shards,
+Postgres chunks) combine into the sketch of the whole portfolio, with the
+same error bound. The cumulative revenue curve is read off the weighted
+sketch items; the top-20% revenue share comes from TopK and is exact.
+
+exact_summary computes the same report with a full sort (percentile_cont's
+linear interpolation), for validation.
+"""
+
+import math
+
+import numpy as np
+
+from data_generation.table_io import READ_CHUNK_ROWS, iter_table
+
+DEFAULT_K = 200
+DEFAULT_TOP_SHARE = 0.20
+
+# Segment thresholds of section 10
+SEGMENT_QUANTILES = {"p80": 0.80, "p50": 0.50}
+
+# Customer shares (top x%) at which the revenue curve is reported
+CURVE_POINTS = [0.01, 0.05, 0.10, 0.20, 0.50, 1.00]
+
+# Level capacity decays by this factor per level below the top (KLL's c)
+COMPACTION_RATIO = 2 / 3
+MIN_CAPACITY = 2
+
+
+def rank_error(k):
+    """Normalized rank error of a single quantile at ~99% confidence for a KLL sketch of size k."""
+    return 2.296 / k ** 0.9723
+
+
+def k_for_error(error):
+    """Smallest k whose rank_error is at most `error`."""
+    return max(math.ceil((2.296 / error) ** (1 / 0.9723)), MIN_CAPACITY)
+
+
+class QuantileSketch:
+    """Mergeable KLL quantile sketch over float values; count, sum, min and max are exact."""
+
+    def __init__(self, k=DEFAULT_K, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.rng = np.random.default_rng(seed)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(math.ceil(self.k * COMPACTION_RATIO ** depth), MIN_CAPACITY)
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item stays behind; the rest are paired and one of each pair promoted
+                odd = len(items) % 2
+                promoted = items[odd:][self.rng.integers(2)::2]
+                self.levels[level] = items[:odd]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _weighted(self):
+        """Retained items ascending, with their weights."""
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        return items[order], weights[order]
+
+    def quantiles(self, qs):
+        """Approximate values at each rank fraction in `qs` (0 -> min, 1 -> max)."""
+        if not self.count:
+            return [None for _ in qs]
+        items, weights = self._weighted()
+        ranks = np.cumsum(weights) / weights.sum()
+        result = []
+        for q in qs:
+            if q <= 0:
+                result.append(self.min)
+            elif q >= 1:
+                result.append(self.max)
+            else:
+                result.append(float(items[min(np.searchsorted(ranks, q), len(items) - 1)]))
+        return result
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+    def revenue_curve(self, points=CURVE_POINTS):
+        """Approximate share of the total held by the top fraction p of values, for each p."""
+        if not self.count:
+            return [None for _ in points]
+        items, weights = self._weighted()
+        items, weights = items[::-1], weights[::-1]
+        share_of_count = np.concatenate([[0.0], np.cumsum(weights) / weights.sum()])
+        share_of_total = np.concatenate([[0.0], np.cumsum(items * weights) / (items * weights).sum()])
+        return [float(np.interp(p, share_of_count, share_of_total)) for p in points]
+
+    def size(self):
+        return sum(len(items) for items in self.levels)
+
+    def to_dict(self):
+        """JSON-ready state, so sketches of separate runs can be stored and merged later."""
+        return {"k": self.k, "count": self.count, "total": self.total, "min": self.min, "max": self.max,
+                "levels": [items.tolist() for items in self.levels]}
+
+    @classmethod
+    def from_dict(cls, state, seed=0):
+        sketch = cls(state["k"], seed)
+        sketch.levels = [np.asarray(items, dtype=np.float64) for items in state["levels"]]
+        sketch.count, sketch.total = state["count"], state["total"]
+        sketch.min, sketch.max = state["min"], state["max"]
+        return sketch
+
+
+class TopK:
+    """The k largest values seen so far with their IDs; exact and mergeable."""
+
+    def __init__(self, k):
+        self.k = k
+        self.values = np.empty(0)
+        self.ids = np.empty(0, dtype=np.int64)
+
+    def update(self, values, ids):
+        if not self.k:
+            return self
+        values = np.asarray(values, dtype=np.float64)
+        keep = ~np.isnan(values)
+        values = np.concatenate([self.values, values[keep]])
+        ids = np.concatenate([self.ids, np.asarray(ids, dtype=np.int64)[keep]])
+        if len(values) > self.k:
+            top = np.argpartition(values, len(values) - self.k)[len(values) - self.k:]
+            values, ids = values[top], ids[top]
+        self.values, self.ids = values, ids
+        return self
+
+    def merge(self, other):
+        return self.update(other.values, other.ids)
+
+    def sum(self):
+        return float(self.values.sum())
+
+    def largest(self, n=None):
+        """(ids, values) in descending order of value."""
+        order = np.argsort(-self.values, kind="stable")[:n]
+        return self.ids[order], self.values[order]
+
+
+def top_count(customers, top_share=DEFAULT_TOP_SHARE):
+    """Customers in the top share, as in section 6.1: the last rank with rank / customers <= top_share."""
+    return int(math.floor(customers * top_share + 1e-9))
+
+
+def _round(value, digits=2):
+    return None if value is None else round(value, digits)
+
+
+def _report(mode, customers, total, thresholds, top, curve, top_share, top_customers):
+    return {
+        "mode": mode,
+        "customers": customers,
+        "total_spend_usd": _round(total),
+        "thresholds": {name: _round(value, 4) for name, value in thresholds.items()},
+        "top_share": {
+            "customer_percent": _round(top / customers * 100 if customers else None),
+            "revenue_percent": _round(top_share * 100 if top_share is not None else None)
+        },
+        "revenue_curve": [
+            {"customer_percent": _round(p * 100), "revenue_percent": _round(share * 100 if share is not None else None)}
+            for p, share in zip(CURVE_POINTS, curve)
+        ],
+        "top_customers": top_customers
+    }
+
+
+def approx_summary(chunks, customers, k=DEFAULT_K, top_share=DEFAULT_TOP_SHARE, seed=0):
+    """
+    Thresholds, top-share revenue and revenue curve from (customer_ids, spend)
+    chunks over `customers` customers, one sketch per chunk merged at the end.
+    """
+    sketch = QuantileSketch(k, seed)
+    top = TopK(top_count(customers, top_share))
+    for ids, spend in chunks:
+        sketch.merge(QuantileSketch(k, seed).update(spend))
+        top.update(spend, ids)
+
+    thresholds = dict(zip(SEGMENT_QUANTILES, sketch.quantiles(SEGMENT_QUANTILES.values())))
+    ids, values = top.largest(10)
+    report = _report("approx", sketch.count, sketch.total, thresholds, top.k,
+                     sketch.revenue_curve(), top.sum() / sketch.total if sketch.total else None,
+                     [{"customer_id": int(i), "total_spend_usd": _round(float(v))} for i, v in zip(ids, values)])
+    report["k"] = k
+    report["rank_error"] = round(rank_error(k), 4)
+    report["sketch_items"] = sketch.size()
+    return report
+
+
+def exact_summary(ids, spend, top_share=DEFAULT_TOP_SHARE):
+    """The same report from a full sort; thresholds use percentile_cont's linear interpolation."""
+    keep = ~np.isnan(spend)
+    ids, spend = np.asarray(ids)[keep], np.asarray(spend, dtype=np.float64)[keep]
+    customers = len(spend)
+    order = np.argsort(-spend, kind="stable")
+    cumulative = np.cumsum(spend[order])
+    total = float(cumulative[-1]) if customers else 0.0
+
+    thresholds = {name: float(np.quantile(spend, q)) if customers else None
+                  for name, q in SEGMENT_QUANTILES.items()}
+    top = top_count(customers, top_share)
+    curve = [float(cumulative[max(math.ceil(p * customers), 1) - 1] / total) if total else None
+             for p in CURVE_POINTS]
+    return _report("exact", customers, total, thresholds, top, curve,
+                   float(cumulative[top - 1] / total) if top and total else None,
+                   [{"customer_id": int(ids[i]), "total_spend_usd": _round(float(spend[i]))} for i in order[:10]])
+
+
+def compare(approx, exact, spend):
+    """Rank error of each approximate threshold and curve error, against the exact report."""
+    spend = np.sort(np.asarray(spend, dtype=np.float64)[~np.isnan(spend)])
+    errors = {}
+    for name, q in SEGMENT_QUANTILES.items():
+        value = approx["thresholds"][name]
+        errors[f"{name}_rank_error"] = round(float(abs(np.searchsorted(spend, value) / len(spend) - q)), 4)
+    errors["revenue_curve_max_error_pct"] = round(max(
+        abs(a["revenue_percent"] - e["revenue_percent"])
+        for a, e in zip(approx["revenue_curve"], exact["revenue_curve"])
+    ), 2)
+    errors["top_share_matches"] = approx["top_share"] == exact["top_share"]
+    return errors
+
+
+def customer_spend(directory, fmt="csv", chunk_rows=READ_CHUNK_ROWS):
+    """
+    (customer_ids, total_spend_usd) of customers with transactions, as in
+    customer_spend_summary: one chunked pass over transactions into a dense
+    per-customer array via the card -> customer map. Transactions on cards
+    missing from `cards` are dropped, as the summary's inner join drops them.
+    """
+    cards = np.zeros(0, dtype=np.int64)
+    for chunk in iter_table(directory, "cards", fmt, chunk_rows, columns=["card_id", "customer_id"]):
+        card_ids = chunk["card_id"].to_numpy(np.int64)
+        if card_ids.max() >= len(cards):
+            cards = np.concatenate([cards, np.full(card_ids.max() + 1 - len(cards), -1)])
+        cards[card_ids] = chunk["customer_id"].to_numpy(np.int64)
+
+    customers = cards.max() + 1 if len(cards) else 0
+    spend = np.zeros(customers)
+    counted = np.zeros(customers, dtype=np.int64)
+    for chunk in iter_table(directory, "transactions", fmt, chunk_rows, columns=["card_id", "amount_usd"]):
+        card_ids = chunk["card_id"].to_numpy(np.int64)
+        known = (card_ids >= 0) & (card_ids < len(cards))
+        owner = np.where(known, cards[np.where(known, card_ids, 0)], -1)
+        amount = chunk["amount_usd"].to_numpy(np.float64, na_value=np.nan)
+        valid = (owner >= 0) & ~np.isnan(amount)
+        spend += np.bincount(owner[valid], weights=amount[valid], minlength=customers)
+        counted += np.bincount(owner[valid], minlength=customers)
+
+    ids = np.flatnonzero(counted)
+    return ids, spend[ids]
+
+
+def spend_chunks(ids, spend, chunk_rows=READ_CHUNK_ROWS):
+    for lo in range(0, len(ids), chunk_rows):
+        yield ids[lo:lo + chunk_rows], spend[lo:lo + chunk_rows]
+
+
+def postgres_spend_chunks(con, chunk_rows=READ_CHUNK_ROWS):
+    """(customer_ids, spend) chunks of customer_spend_summary through a server-side cursor, unsorted."""
+    with con.cursor(name="customer_spend") as cur:
+        cur.execute("SELECT customer_id, total_spend_usd::float8 FROM customer_spend_summary "
+                    "WHERE total_spend_usd IS NOT NULL")
+        while rows := cur.fetchmany(chunk_rows):
+            ids, spend = zip(*rows)
+            yield np.array(ids, dtype=np.int64), np.array(spend, dtype=np.float64)
+
+
+def postgres_customer_count(con):
+    return con.execute("SELECT COUNT(*) FROM customer_spend_summary WHERE total_spend_usd IS NOT NULL").fetchone()[0]
@@ -0,0 +1,90 @@
+"""
+Splits sql/03_analysis_queries.sql into statements and classifies them.
+
+Each `CREATE TABLE x AS ...` is a summary node; the tables it reads come
+from its FROM / JOIN clauses (CTE names excluded).
+"""
+
+import os
+import re
+
+ANALYSIS_SQL = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "sql", "03_analysis_queries.sql"
+)
+
+_CREATE_AS = re.compile(r"^CREATE\s+TABLE\s+(\w+)\s+AS\s+(.*)$", re.S | re.I)
+_DROP = re.compile(r"^DROP\s+TABLE\b", re.I)
+_TRANSACTION = re.compile(r"^(BEGIN|COMMIT|ROLLBACK)\b", re.I)
+_SELECT = re.compile(r"^(SELECT|WITH)\b", re.I)
+_READS = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)", re.I)
+# Functions whose argument syntax contains FROM, e.g. EXTRACT(DOW FROM col)
+_FROM_FUNCTIONS = re.compile(r"\b(?:EXTRACT|SUBSTRING|TRIM|OVERLAY)\s*\([^()]*\)", re.I)
+_CTE = re.compile(r"(?:\bWITH|,)\s*(\w+)\s+AS\s*\(", re.I)
+
+
+def split_statements(sql):
+    """Statements separated by top-level semicolons, comments removed."""
+    statements = []
+    current = []
+    i = 0
+    n = len(sql)
+    while i < n:
+        ch = sql[i]
+        if ch == "'":
+            end = sql.index("'", i + 1)
+            while end + 1 < n and sql[end + 1] == "'":
+                end = sql.index("'", end + 2)
+            current.append(sql[i:end + 1])
+            i = end + 1
+        elif sql.startswith("--", i):
+            i = sql.find("\n", i)
+            i = n if i == -1 else i
+        elif sql.startswith("/*", i):
+            i = sql.index("*/", i) + 2
+        elif ch == ";":
+            statements.append("".join(current).strip())
+            current = []
+            i += 1
+        else:
+            current.append(ch)
+            i += 1
+    statements.append("".join(current).strip())
+    return [s for s in statements if s]
+
+
+def tables_read(query):
+    """Table names a query reads, without its own CTEs."""
+    ctes = {name.lower() for name in _CTE.findall(query)}
+    query = _FROM_FUNCTIONS.sub("", query)
+    return sorted({t for t in _READS.findall(query) if t.lower() not in ctes})
+
+
+def parse_script(sql):
+    """
+    Classified statements, in script order. Each is a dict with `kind`
+    (create / select / drop / transaction / other) and `sql`; creates also
+    carry `table`, `query` and `reads`.
+    """
+    parsed = []
+    for stmt in split_statements(sql):
+        create = _CREATE_AS.match(stmt)
+        if create:
+            table, query = create.groups()
+            parsed.append({
+                "kind": "create", "sql": stmt, "table": table, "query": query,
+                "reads": tables_read(query)
+            })
+        elif _DROP.match(stmt):
+            parsed.append({"kind": "drop", "sql": stmt})
+        elif _TRANSACTION.match(stmt):
+            parsed.append({"kind": "transaction", "sql": stmt})
+        elif _SELECT.match(stmt):
+            parsed.append({"kind": "select", "sql": stmt, "reads": tables_read(stmt)})
+        else:
+            parsed.append({"kind": "other", "sql": stmt})
+    return parsed
+
+
+def load_script(path=ANALYSIS_SQL):
+    with open(path) as f:
+        return parse_script(f.read())
@@ -0,0 +1,535 @@
+"""
+Scaling benchmark: generation pipeline and analysis SQL per portfolio size.
+
+Each --customers scale runs in a fresh process through generate, realism,
+sanitize, save / load of every table and the summary tables of
+sql/03_analysis_queries.sql (in-process DuckDB, or Postgres with --dsn).
+Wall time, peak RSS and rows/second are recorded per stage and per sub-step
+(generator phases, realism steps, table, summary table) and written to a
+versioned JSON file with the git commit and library versions. --compare
+reports the change against an earlier result file and flags every stage
+that got slower or bigger than --threshold; the exit status is 1 if any did.
+
+Peak RSS is sampled from a background thread in the benchmark process, so
+it is only meaningful with --workers 1 (the default). Generator phases run
+inside the shards and have no RSS of their own; see the "generate" stage.
+
+Usage:
+    python bench_scaling.py --customers 1000 10000 100000 1000000
+    python bench_scaling.py --customers 1000 10000 --repeat 3 --format parquet --compare results/<earlier>.json
+    python bench_scaling.py --report results/<old>.json results/<new>.json
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_generation.base_data import DEFAULT_SEED, generate_base_data
+from data_generation.pipeline import OUTPUT_TABLES
+from data_generation.profiling import PhaseTimer
+from data_generation.realism import REALISM_STEPS, adjust_realism
+from data_generation.sanitization import run_audit
+from data_generation.table_io import DEFAULT_COMPRESSION, FORMATS, read_table, write_table
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+RESULT_VERSION = 1
+
+DEFAULT_SCALES = [1_000, 10_000, 100_000]
+DEFAULT_THRESHOLD = 0.10
+# Changes below these are noise, whatever their relative size
+MIN_SECONDS = 0.05
+MIN_RSS_MB = 32
+
+# Rows a generator phase works through (the table it produces)
+GENERATE_ROWS = {
+    "customers": "customers",
+    "cards": "cards",
+    "transactions": "transactions",
+    "payments": "payments",
+    "merchants": "transactions"
+}
+
+
+def current_rss():
+    """Resident set size of this process in bytes (None where it cannot be read)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+class RssSampler:
+    """Samples RSS every `interval` seconds into every open window."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._windows = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is None:
+            return
+        with self._lock:
+            for window in self._windows:
+                window["peak"] = max(window["peak"], rss)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    @contextmanager
+    def window(self):
+        """Dict whose "peak" is the highest RSS seen while the block ran (None if unknown)."""
+        window = {"peak": current_rss() or 0}
+        with self._lock:
+            self._windows.append(window)
+        try:
+            yield window
+        finally:
+            self._sample()
+            with self._lock:
+                self._windows = [w for w in self._windows if w is not window]
+            if not window["peak"]:
+                window["peak"] = None
+
+
+def stage_record(seconds, rows=None, peak_rss=None):
+    return {
+        "seconds": round(seconds, 4),
+        "rows": rows,
+        "rows_per_sec": round(rows / seconds, 1) if rows and seconds > 0 else None,
+        "peak_rss_mb": round(peak_rss / 1024 ** 2, 1) if peak_rss else None
+    }
+
+
+class Recorder:
+    """Collects stage records for one scale."""
+
+    def __init__(self, sampler):
+        self.sampler = sampler
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Time the block; `rows` may be set later through the yielded dict."""
+        info = {"rows": rows}
+        with self.sampler.window() as window:
+            start = time.perf_counter()
+            yield info
+            seconds = time.perf_counter() - start
+        self.stages[name] = stage_record(seconds, info["rows"], window["peak"])
+
+    def add(self, name, seconds, rows=None):
+        self.stages[name] = stage_record(seconds, rows)
+
+
+class SampledPhaseTimer(PhaseTimer):
+    """PhaseTimer that also records each phase's peak RSS."""
+
+    def __init__(self, sampler):
+        super().__init__(enabled=False)
+        self.sampler = sampler
+        self.peaks = {}
+
+    @contextmanager
+    def phase(self, name):
+        with self.sampler.window() as window, super().phase(name):
+            yield
+        self.peaks[name] = max(self.peaks.get(name) or 0, window["peak"] or 0) or None
+
+
+# =============================
+# ONE SCALE
+# =============================
+
+def _quiet(*args):
+    pass
+
+
+def run_sql_duckdb(recorder, data_dir, fmt):
+    from analytics.build_dag import duckdb_executor
+    from analytics.duckdb_runner import register_sources, require_duckdb
+    from analytics.sql_script import load_script
+
+    duckdb = require_duckdb()
+    con = duckdb.connect()
+    try:
+        with recorder.stage("sql.register"):
+            register_sources(con, data_dir, fmt)
+        execute, close = duckdb_executor(con)
+        summaries = [s for s in load_script() if s["kind"] == "create"]
+        with recorder.stage("sql"):
+            for stmt in summaries:
+                with recorder.stage(f"sql.{stmt['table']}"):
+                    execute(stmt["table"], stmt["query"])
+        close()
+    finally:
+        con.close()
+
+
+def run_sql_postgres(recorder, data_dir, fmt, dsn):
+    from analytics.build_dag import postgres_executor
+    from analytics.sql_script import load_script
+    from data_generation.postgres_loader import load_tables
+
+    with recorder.stage("sql.load") as info:
+        stats = load_tables(dsn, data_dir, fmt, replace=True, log=_quiet)
+        info["rows"] = sum(s["rows"] for s in stats.values())
+
+    # One connection: summaries are timed one at a time, not as the parallel build
+    execute, close = postgres_executor(dsn, 1)
+    try:
+        summaries = [s for s in load_script() if s["kind"] == "create"]
+        with recorder.stage("sql"):
+            for stmt in summaries:
+                with recorder.stage(f"sql.{stmt['table']}"):
+                    execute(stmt["table"], stmt["query"])
+    finally:
+        close()
+
+
+def run_scale(num_customers, config):
+    """Every stage at one scale; returns {stage: record}."""
+    if config["work_dir"]:
+        os.makedirs(config["work_dir"], exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix=f"bench_{num_customers}_", dir=config["work_dir"])
+    try:
+        with RssSampler() as sampler:
+            recorder = Recorder(sampler)
+
+            timer = PhaseTimer(enabled=False)
+            with recorder.stage("generate") as info:
+                tables = generate_base_data(num_customers, seed=config["seed"], shards=config["shards"],
+                                            workers=config["workers"], timer=timer)
+                info["rows"] = sum(len(tables[name]) for name in OUTPUT_TABLES)
+            for phase, seconds in timer.timings.items():
+                recorder.add(f"generate.{phase}", seconds, len(tables[GENERATE_ROWS.get(phase, phase)]))
+            recorder.add("generate.merge", recorder.stages["generate"]["seconds"] - sum(timer.timings.values()))
+
+            # Steps are sized by their input tables (dormancy drops transactions)
+            input_rows = {name: len(df) for name, df in tables.items()}
+            steps = SampledPhaseTimer(sampler)
+            with recorder.stage("realism", rows=len(tables["transactions"])):
+                tables = adjust_realism(tables, seed=config["seed"], log=_quiet, timer=steps)
+            for step in REALISM_STEPS:
+                name = step["name"]
+                if name in steps.timings:
+                    rows = max(input_rows.get(t, len(tables[t])) for t in step["reads"])
+                    record = stage_record(steps.timings[name], rows, steps.peaks.get(name))
+                    recorder.stages[f"realism.{name}"] = record
+
+            with recorder.stage("sanitize", rows=len(tables["transactions"])):
+                run_audit(tables, audit_log=_quiet)
+
+            out_dir = os.path.join(work_dir, "tables")
+            os.makedirs(out_dir)
+            total_rows = sum(len(tables[name]) for name in OUTPUT_TABLES)
+            with recorder.stage("save", rows=total_rows):
+                for name in OUTPUT_TABLES:
+                    with recorder.stage(f"save.{name}", rows=len(tables[name])):
+                        write_table(tables[name], out_dir, name, config["format"], config["compression"])
+            del tables
+
+            with recorder.stage("load", rows=total_rows):
+                for name in OUTPUT_TABLES:
+                    with recorder.stage(f"load.{name}") as info:
+                        info["rows"] = len(read_table(out_dir, name, config["format"]))
+
+            if config["sql"] == "duckdb":
+                run_sql_duckdb(recorder, out_dir, config["format"])
+            elif config["sql"] == "postgres":
+                run_sql_postgres(recorder, out_dir, config["format"], config["dsn"])
+
+        return recorder.stages
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _scale_worker(num_customers, config, results):
+    try:
+        results.put(("ok", run_scale(num_customers, config)))
+    except BaseException as exc:
+        results.put(("error", f"{type(exc).__name__}: {exc}"))
+        raise
+
+
+def run_scale_isolated(num_customers, config):
+    """run_scale in a fresh process, so each scale starts from a clean heap."""
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    proc = ctx.Process(target=_scale_worker, args=(num_customers, config, results))
+    proc.start()
+    status, payload = results.get()
+    proc.join()
+    if status != "ok":
+        raise RuntimeError(f"{num_customers:,} customers failed: {payload}")
+    return payload
+
+
+def best_of(runs):
+    """Per stage: the fastest run's time and the highest peak RSS over `runs`."""
+    best = {}
+    for stage in runs[0]:
+        records = [run[stage] for run in runs if stage in run]
+        fastest = min(records, key=lambda r: r["seconds"])
+        peaks = [r["peak_rss_mb"] for r in records if r["peak_rss_mb"]]
+        best[stage] = dict(fastest, peak_rss_mb=max(peaks) if peaks else None)
+    return best
+
+
+# =============================
+# RESULT FILES
+# =============================
+
+def git_revision():
+    """(short commit, dirty) of the working tree, or (None, None) outside git."""
+    repo = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=repo, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain"], cwd=repo, capture_output=True,
+                               text=True, check=True).stdout.strip() != ""
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def environment():
+    env = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+    for module in ["pyarrow", "duckdb", "psycopg"]:
+        try:
+            env[module] = __import__(module).__version__
+        except ImportError:
+            env[module] = None
+    return env
+
+
+def save_result(result, out_dir, label=None):
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    name = label or f"{stamp}_{result['git_commit'] or 'nogit'}{'_dirty' if result['git_dirty'] else ''}"
+    path = os.path.join(out_dir, f"{name}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    return path
+
+
+def load_result(path):
+    with open(path) as f:
+        result = json.load(f)
+    if result.get("result_version") != RESULT_VERSION:
+        raise ValueError(f"{path} has result_version {result.get('result_version')}, "
+                         f"this script reads {RESULT_VERSION}")
+    return result
+
+
+# =============================
+# COMPARISON
+# =============================
+
+def scaling_exponent(scales, seconds):
+    """Least-squares slope of log(seconds) on log(customers) (1 = linear), or None."""
+    points = [(math.log(n), math.log(s)) for n, s in zip(scales, seconds) if s and s >= MIN_SECONDS]
+    if len(points) < 2:
+        return None
+    xs, ys = zip(*points)
+    x_mean, y_mean = sum(xs) / len(xs), sum(ys) / len(ys)
+    var = sum((x - x_mean) ** 2 for x in xs)
+    if var == 0:
+        return None
+    return sum((x - x_mean) * (y - y_mean) for x, y in zip(xs, ys)) / var
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    (rows, regressions): one row per (scale, stage) present in both results.
+    A stage regresses when its time or peak RSS grows by more than
+    `threshold` and by more than MIN_SECONDS / MIN_RSS_MB.
+    """
+    rows = []
+    scales = sorted(set(baseline["scales"]) & set(current["scales"]), key=int)
+    for scale in scales:
+        old_stages, new_stages = baseline["scales"][scale], current["scales"][scale]
+        for stage in [s for s in new_stages if s in old_stages]:
+            old, new = old_stages[stage], new_stages[stage]
+            time_ratio = new["seconds"] / old["seconds"] if old["seconds"] > 0 else None
+            slower = (time_ratio is not None and time_ratio > 1 + threshold
+                      and new["seconds"] - old["seconds"] > MIN_SECONDS)
+            rss_ratio = None
+            bigger = False
+            if old["peak_rss_mb"] and new["peak_rss_mb"]:
+                rss_ratio = new["peak_rss_mb"] / old["peak_rss_mb"]
+                bigger = rss_ratio > 1 + threshold and new["peak_rss_mb"] - old["peak_rss_mb"] > MIN_RSS_MB
+            rows.append({
+                "customers": int(scale),
+                "stage": stage,
+                "old_seconds": old["seconds"],
+                "new_seconds": new["seconds"],
+                "time_change": time_ratio - 1 if time_ratio is not None else None,
+                "old_rss_mb": old["peak_rss_mb"],
+                "new_rss_mb": new["peak_rss_mb"],
+                "rss_change": rss_ratio - 1 if rss_ratio is not None else None,
+                "regression": ", ".join(flag for flag, hit in [("time", slower), ("rss", bigger)] if hit)
+            })
+    return rows, [row for row in rows if row["regression"]]
+
+
+def _percent(change):
+    return "" if change is None or pd.isna(change) else f"{change:+.1%}"
+
+
+def print_report(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """Print the comparison and the scaling exponents; returns the regressed rows."""
+    rows, regressions = compare(baseline, current, threshold)
+    print(f"Baseline: {baseline['git_commit']} ({baseline['created']})  "
+          f"Current: {current['git_commit']} ({current['created']})  threshold {threshold:.0%}")
+    differs = {k: (baseline["config"].get(k), v) for k, v in current["config"].items()
+               if k != "repeat" and baseline["config"].get(k) != v}
+    if differs:
+        print(f"Warning: the runs differ in config (baseline, current): {differs}")
+
+    table = pd.DataFrame(rows)
+    if table.empty:
+        print("No common scales and stages to compare")
+        return regressions
+    for col in ["time_change", "rss_change"]:
+        table[col] = table[col].map(_percent)
+    print(table.to_string(index=False))
+
+    # How each stage's time grows with the portfolio, before and after
+    scales = sorted({row["customers"] for row in rows})
+    curve = []
+    for stage in dict.fromkeys(row["stage"] for row in rows):
+        old = [baseline["scales"][str(n)][stage]["seconds"] for n in scales]
+        new = [current["scales"][str(n)][stage]["seconds"] for n in scales]
+        curve.append({"stage": stage, "old_exponent": scaling_exponent(scales, old),
+                      "new_exponent": scaling_exponent(scales, new)})
+    print("\n--- SCALING EXPONENT (seconds ~ customers ** k) ---")
+    print(pd.DataFrame(curve).dropna(how="all", subset=["old_exponent", "new_exponent"])
+          .round(2).to_string(index=False))
+
+    print(f"\n{len(regressions)} regression(s) past {threshold:.0%}")
+    for row in regressions:
+        print(f"  {row['customers']:>10,}  {row['stage']}: {row['regression']} "
+              f"({_percent(row['time_change'])} time, {_percent(row['rss_change'])} RSS)")
+    return regressions
+
+
+def print_summary(result):
+    for scale, stages in result["scales"].items():
+        print(f"--- {int(scale):,} CUSTOMERS ---")
+        table = pd.DataFrame.from_dict(stages, orient="index")
+        table["rows"] = table["rows"].astype("Int64")
+        print(table.to_string())
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--customers", type=int, nargs="+", default=DEFAULT_SCALES)
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="runs per scale; each stage keeps its fastest time")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="generation processes (peak RSS only covers the benchmark process)")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--compression", default=DEFAULT_COMPRESSION)
+    parser.add_argument("--sql", choices=["duckdb", "postgres", "none"], default="duckdb",
+                        help="where the summary tables are timed (postgres needs --dsn, "
+                             "whose portfolio tables are dropped and reloaded)")
+    parser.add_argument("--dsn", help="Postgres connection string for --sql postgres")
+    parser.add_argument("--work-dir", default=None, help="scratch directory for the saved tables")
+    parser.add_argument("--out", default=RESULTS_DIR, help="directory for the result JSON")
+    parser.add_argument("--label", help="result file name (default: UTC time + git commit)")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier result file to compare against")
+    parser.add_argument("--report", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="only compare two existing result files")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative growth in time or peak RSS reported as a regression")
+    args = parser.parse_args()
+
+    if args.report:
+        regressions = print_report(load_result(args.report[0]), load_result(args.report[1]), args.threshold)
+        sys.exit(1 if regressions else 0)
+    if args.sql == "postgres" and not args.dsn:
+        parser.error("--sql postgres needs --dsn")
+
+    config = {
+        "seed": args.seed,
+        "shards": args.shards,
+        "workers": args.workers,
+        "format": args.format,
+        "compression": args.compression,
+        "sql": args.sql,
+        "dsn": args.dsn,
+        "work_dir": args.work_dir
+    }
+    commit, dirty = git_revision()
+    result = {
+        "result_version": RESULT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "git_dirty": dirty,
+        "environment": environment(),
+        "config": dict({k: v for k, v in config.items() if k not in ("dsn", "work_dir")}, repeat=args.repeat),
+        "scales": {}
+    }
+
+    for n in args.customers:
+        start = time.perf_counter()
+        runs = [run_scale_isolated(n, config) for _ in range(max(1, args.repeat))]
+        result["scales"][str(n)] = best_of(runs)
+        print(f"{n:,} customers benchmarked in {time.perf_counter() - start:.1f}s")
+
+    path = save_result(result, args.out, args.label)
+    print_summary(result)
+    print(f"Results written to {path}")
+
+    if args.compare:
+        print()
+        regressions = print_report(load_result(args.compare), result, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Transactions/second: original per-transaction loop vs vectorized engines.
+
+The legacy loop is a copy of the nested card/month/transaction loop that
+used to live in 01_generate_base_data.py: transactions, fraud draws, the
+revolving balance and payments, and reward redemptions. Only the per-card
+customers_df lookup is left out, as the cards here carry their customer
+attributes. The vectorized side runs the same work through
+simulate_transactions and simulate_payments.
+
+The legacy loop is timed on at most --legacy-cards cards per scale (a full
+1M-customer legacy run would take days); transactions/second is what gets
+compared, and that rate does not depend on portfolio size for the legacy
+loop.
+
+Usage:
+    python bench_transaction_engine.py --customers 10000 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_generation.base_data import (
+    END_DATE, START_DATE, card_types, cities, country_currency, credit_limits, segment_weights, segments
+)
+from data_generation.payment_engine import simulate_payments
+from data_generation.transaction_engine import merchant_categories, simulate_transactions
+
+date_range = pd.date_range(START_DATE, END_DATE, freq="MS")
+
+
+def make_cards(n, rng):
+    countries = rng.choice(list(cities), size=n)
+    card_segments = rng.choice(segments, size=n, p=segment_weights)
+    limits = [credit_limits[rng.choice(card_types[s])] for s in card_segments]
+    return pd.DataFrame({
+        "card_id": np.arange(1, n + 1),
+        "customer_segment": card_segments,
+        "age": rng.integers(21, 65, size=n),
+        "country": countries,
+        "city": [cities[c][0] for c in countries],
+        "credit_limit": [rng.integers(low, high) for low, high in limits]
+    })
+
+
+# =============================
+# LEGACY LOOP (reference)
+# =============================
+
+def legacy_loop(cards):
+    """(transactions, payments, frauds, redemptions) DataFrames, as the old script built them."""
+    transactions = []
+    payments = []
+    frauds = []
+    redemptions = []
+
+    txn_id = 1
+    payment_id = 1
+    fraud_id = 1
+    redeem_id = 1
+
+    for _, cust in cards.iterrows():
+
+        balance = 0
+        missed_streak = 0
+
+        for month in date_range:
+
+            if cust["customer_segment"] == "Low Value":
+                txn_count = np.random.randint(8, 15)
+            elif cust["customer_segment"] == "Mass Market":
+                txn_count = np.random.randint(15, 30)
+            else:
+                txn_count = np.random.randint(25, 45)
+
+            monthly_spend = 0
+
+            for _ in range(txn_count):
+
+                if cust["age"] < 35:
+                    merchant_type = np.random.choice(["Online", "Offline"], p=[0.65, 0.35])
+                else:
+                    merchant_type = np.random.choice(["Online", "Offline"], p=[0.40, 0.60])
+
+                intl_prob = 0.05
+                if cust["customer_segment"] == "Emerging Affluent":
+                    intl_prob = 0.15
+
+                is_intl = np.random.rand() < intl_prob
+
+                if is_intl:
+                    merchant_country = random.choice(list(cities.keys()))
+                    merchant_city = random.choice(cities[merchant_country])
+                else:
+                    merchant_country = cust["country"]
+                    merchant_city = cust["city"]
+
+                currency = country_currency[merchant_country]
+
+                if cust["customer_segment"] == "Low Value":
+                    txn_type = np.random.choice(["Purchase", "Cash Advance"], p=[0.85, 0.15])
+                else:
+                    txn_type = np.random.choice(["Purchase", "Cash Advance"], p=[0.95, 0.05])
+
+                if txn_type == "Cash Advance":
+                    amount = np.random.uniform(100, 500)
+                else:
+                    amount = np.random.uniform(10, 300)
+
+                if np.random.rand() < 0.005:
+                    amount *= random.randint(5, 10)
+
+                monthly_spend += amount
+
+                fraud_prob = 0.002
+                if is_intl and merchant_type == "Online":
+                    fraud_prob += 0.005
+                if cust["customer_segment"] == "Low Value":
+                    fraud_prob += 0.003
+
+                fraud_flag = np.random.rand() < fraud_prob
+
+                transactions.append({
+                    "transaction_id": txn_id,
+                    "card_id": cust["card_id"],
+                    "transaction_date": month + timedelta(days=random.randint(0, 27)),
+                    "merchant_category": random.choice(merchant_categories),
+                    "merchant_type": merchant_type,
+                    "currency": currency,
+                    "amount": round(amount, 2),
+                    "transaction_type": txn_type,
+                    "merchant_city": merchant_city,
+                    "merchant_country": merchant_country,
+                    "location": merchant_city,
+                    "is_international": is_intl
+                })
+
+                if fraud_flag:
+                    frauds.append({
+                        "fraud_id": fraud_id,
+                        "transaction_id": txn_id,
+                        "fraud_flag": 1,
+                        "fraud_type": "Card Not Present" if merchant_type == "Online" else "Skimming"
+                    })
+                    fraud_id += 1
+
+                txn_id += 1
+
+            balance += monthly_spend
+            utilization = balance / cust["credit_limit"]
+
+            if utilization > 0.8 and np.random.rand() < 0.25:
+                payment_amount = balance * np.random.uniform(0.05, 0.2)
+                missed_streak += 1
+            else:
+                payment_amount = balance * np.random.uniform(0.3, 0.8)
+                missed_streak = 0
+
+            balance = max(balance - payment_amount, 0)
+
+            payments.append({
+                "payment_id": payment_id,
+                "card_id": cust["card_id"],
+                "payment_date": month + timedelta(days=25),
+                "payment_amount": round(payment_amount, 2),
+                "payment_method": random.choice(["Auto Debit", "Manual", "Bank Transfer"]),
+                "missed_streak": missed_streak
+            })
+            payment_id += 1
+
+            if random.random() < 0.1:
+                points = np.random.randint(500, 5000)
+                redemptions.append({
+                    "redemption_id": redeem_id,
+                    "card_id": cust["card_id"],
+                    "redemption_date": month + timedelta(days=20),
+                    "redemption_type": random.choice(["Flights", "Cashback", "Gift Cards"]),
+                    "points_used": points,
+                    "redemption_value": round(points * 0.01, 2)
+                })
+                redeem_id += 1
+
+    return (pd.DataFrame(transactions), pd.DataFrame(payments), pd.DataFrame(frauds),
+            pd.DataFrame(redemptions))
+
+
+def vectorized(cards, rng, first_txn_id=1):
+    """(transactions, payments, frauds, redemptions) for `cards` from the vectorized engines."""
+    transactions, frauds, monthly_spend = simulate_transactions(
+        cards["card_id"].to_numpy(),
+        cards["customer_segment"].to_numpy(),
+        cards["age"].to_numpy(),
+        cards["country"].to_numpy(),
+        cards["city"].to_numpy(),
+        date_range, cities, country_currency, rng,
+        first_txn_id=first_txn_id
+    )
+    payments, redemptions, _, _ = simulate_payments(
+        cards["card_id"].to_numpy(), cards["credit_limit"].to_numpy(), monthly_spend, date_range, rng
+    )
+    return transactions, payments, frauds, redemptions
+
+
+def run_vectorized(cards, rng, batch_cards):
+    total = 0
+    for lo in range(0, len(cards), batch_cards):
+        transactions, _, _, _ = vectorized(cards.iloc[lo:lo + batch_cards], rng, first_txn_id=total + 1)
+        total += len(transactions)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--customers", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--legacy-cards", type=int, default=500,
+                        help="cards timed through the legacy loop per scale")
+    parser.add_argument("--batch-cards", type=int, default=5_000,
+                        help="cards per vectorized block (bounds memory at 1M customers)")
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    np.random.seed(42)
+    random.seed(42)
+    rng = np.random.default_rng(42)
+
+    print(f"{'customers':>10} {'legacy txn/s':>14} {'vector txn/s':>14} {'speedup':>9} {'vector txns':>13} {'vector s':>9}")
+
+    for n in args.customers:
+        cards = make_cards(n, rng)
+
+        legacy_rate = float("nan")
+        if not args.skip_legacy:
+            sample = cards.iloc[:min(n, args.legacy_cards)]
+            t0 = time.perf_counter()
+            legacy_rows = len(legacy_loop(sample)[0])
+            legacy_rate = legacy_rows / (time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        rows = run_vectorized(cards, rng, args.batch_cards)
+        elapsed = time.perf_counter() - t0
+        rate = rows / elapsed
+
+        print(f"{n:>10,} {legacy_rate:>14,.0f} {rate:>14,.0f} {rate / legacy_rate:>8.1f}x {rows:>13,} {elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
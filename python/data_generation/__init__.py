@@ -0,0 +1 @@
+"""Synthetic credit card portfolio generator."""
@@ -0,0 +1,203 @@
+"""
+Command line entry point.
+
+    cd python
+    python -m data_generation run --customers 10000 --out ./output
+    python -m data_generation generate --customers 1000000 --out ./base --stream --max-memory-mb 4096
+    python -m data_generation append --out ./output --months 1
+    python -m data_generation load --dsn postgresql://localhost/portfolio --dir ./output
+    python -m data_generation profile --dir ./output --out profile_report.json
+    python -m data_generation events --customers 10000 --rate 100000 --sink tcp://localhost:9000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from .base_data import DEFAULT_SEED, generate_base_data
+from .event_stream import DEFAULT_BURST, DEFAULT_RATE, ENCODINGS, event_frame, stream_events
+from .pipeline import run_pipeline
+from .postgres_loader import DEFAULT_WORKERS, SCHEMA_SQL, load_tables
+from .profiler import DEFAULT_WORKERS as PROFILE_WORKERS, profile_tables, write_report
+from .profiling import PhaseTimer
+from .run_state import save_state
+from .stage_cache import DEFAULT_CACHE_MB, StageCache
+from .table_io import DEFAULT_COMPRESSION, FORMATS, READ_CHUNK_ROWS, read_table, write_table
+from .writers import DEFAULT_CHUNK_ROWS, append_run, stream_base_data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m data_generation")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="generate -> adjust realism -> audit, in one process")
+    run.add_argument("--customers", type=int, default=10000)
+    run.add_argument("--out", required=True, help="directory for the final tables")
+    run.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    run.add_argument("--shards", type=int, default=1)
+    run.add_argument("--workers", type=int, default=1)
+    run.add_argument("--format", choices=FORMATS, default="csv")
+    run.add_argument("--compression", default=DEFAULT_COMPRESSION)
+    run.add_argument("--checkpoint", action="store_true",
+                     help="write each stage's tables under <out>/_checkpoints/")
+    run.add_argument("--resume", action="store_true",
+                     help="continue from the last completed checkpoint in --out")
+    run.add_argument("--cache", help="stage cache directory; reruns reuse unchanged stages and realism steps")
+    run.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_MB,
+                     help="least recently used cache entries are evicted above this size")
+
+    generate = commands.add_parser("generate", help="base tables only (no realism), optionally streamed to disk")
+    generate.add_argument("--customers", type=int, default=10000)
+    generate.add_argument("--out", required=True, help="directory for the base tables")
+    generate.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    generate.add_argument("--shards", type=int, default=1)
+    generate.add_argument("--workers", type=int, default=1)
+    generate.add_argument("--format", choices=FORMATS, default="csv")
+    generate.add_argument("--compression", default=DEFAULT_COMPRESSION)
+    generate.add_argument("--stream", action="store_true",
+                          help="write tables in chunks while shards are generated (bounded memory)")
+    generate.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                          help="rows buffered per table before a chunk is appended (--stream)")
+    generate.add_argument("--max-memory-mb", type=int, default=None,
+                          help="memory ceiling; raises --shards as needed and caps write buffers (--stream)")
+
+    append = commands.add_parser("append", help="extend a run or generate output by N months from its saved state")
+    append.add_argument("--out", required=True, help="directory of the run to extend (holds _state/)")
+    append.add_argument("--months", type=int, required=True)
+    append.add_argument("--workers", type=int, default=1)
+    append.add_argument("--format", choices=FORMATS, default="csv")
+    append.add_argument("--compression", default=DEFAULT_COMPRESSION)
+
+    load = commands.add_parser("load", help="bulk-load generated tables into Postgres")
+    load.add_argument("--dsn", required=True, help="libpq connection string or URI")
+    load.add_argument("--dir", required=True, help="directory holding the generated tables")
+    load.add_argument("--format", choices=FORMATS, default="csv")
+    load.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                      help="parallel connections / tables loading at once")
+    load.add_argument("--schema", default=SCHEMA_SQL, help="CREATE TABLE script to load into")
+    load.add_argument("--replace", action="store_true",
+                      help="drop existing tables of the same name first (CASCADE: dependent views go too)")
+
+    profile = commands.add_parser("profile", help="one-pass data-quality checks over generated tables")
+    profile.add_argument("--dir", required=True, help="directory holding the generated tables")
+    profile.add_argument("--format", choices=FORMATS, default="csv")
+    profile.add_argument("--workers", type=int, default=PROFILE_WORKERS,
+                         help="tables (or parquet/feather parts) profiled in parallel")
+    profile.add_argument("--chunk-rows", type=int, default=READ_CHUNK_ROWS,
+                         help="rows read per chunk; bounds memory on tables larger than RAM")
+    profile.add_argument("--schema", default=SCHEMA_SQL, help="CREATE TABLE script naming tables and keys")
+    profile.add_argument("--out", default="profile_report.json", help="JSON report path")
+
+    events = commands.add_parser("events", help="stream transactions as paced events for load tests")
+    events.add_argument("--customers", type=int, default=1000)
+    events.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    events.add_argument("--shards", type=int, default=1)
+    events.add_argument("--from-dir", help="replay the transactions generated in this directory instead")
+    events.add_argument("--format", choices=FORMATS, default="csv", help="with --from-dir")
+    events.add_argument("--sink", default="-", help="'-' for stdout, a file path or tcp://host:port")
+    events.add_argument("--encoding", choices=ENCODINGS, default="jsonl")
+    events.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help="events/sec outside peaks; 0 sends as fast as the sink accepts")
+    events.add_argument("--burst", type=int, default=DEFAULT_BURST,
+                        help="events per write, the most ever sent ahead of schedule")
+    events.add_argument("--limit", type=int, help="stop after this many events")
+
+    args = parser.parse_args(argv)
+
+    start_time = time.time()
+    # Events may go to stdout, so progress goes to stderr there
+    log_file = sys.stderr if args.command == "events" else sys.stdout
+
+    def log(msg):
+        elapsed = round(time.time() - start_time, 2)
+        print(f"[{elapsed}s] {msg}", file=log_file)
+
+    if args.command == "generate":
+        timer = PhaseTimer()
+        os.makedirs(args.out, exist_ok=True)
+        if args.stream:
+            _, state, _ = stream_base_data(
+                args.customers, args.out, seed=args.seed, shards=args.shards, workers=args.workers,
+                fmt=args.format, compression=args.compression, chunk_rows=args.chunk_rows,
+                max_memory_mb=args.max_memory_mb, timer=timer, log=log
+            )
+        else:
+            if args.max_memory_mb:
+                parser.error("--max-memory-mb needs --stream")
+            state = {}
+            tables = generate_base_data(args.customers, seed=args.seed, shards=args.shards,
+                                        workers=args.workers, timer=timer, state=state)
+            with timer.phase("save"):
+                for name, df in tables.items():
+                    write_table(df, args.out, name, args.format, args.compression)
+        save_state(args.out, state)
+        log(f"Base tables saved: {args.out}")
+        timer.report()
+        return
+
+    if args.command == "append":
+        if args.months < 1:
+            parser.error("--months must be at least 1")
+        timer = PhaseTimer()
+        append_path, rows, state = append_run(args.out, args.months, workers=args.workers, fmt=args.format,
+                                              compression=args.compression, timer=timer, log=log)
+        for name, n in rows.items():
+            log(f"{name}: {n} new rows")
+        log(f"New rows saved to {append_path}; state now runs to {state['end_date']}")
+        timer.report()
+        return
+
+    if args.command == "load":
+        load_tables(args.dsn, args.dir, fmt=args.format, schema_path=args.schema,
+                    workers=args.workers, replace=args.replace, log=log)
+        log(f"Load completed: {args.dir}")
+        return
+
+    if args.command == "profile":
+        report = profile_tables(args.dir, args.format, schema_path=args.schema, workers=args.workers,
+                                chunk_rows=args.chunk_rows, log=log)
+        write_report(report, args.out)
+        failed = report["checks"]["failed"]
+        log(f"Checks failed: {', '.join(failed)}" if failed else "All checks passed")
+        log(f"Report written: {args.out} ({report['seconds']}s)")
+        return
+
+    if args.command == "events":
+        if args.from_dir:
+            tables = {name: read_table(args.from_dir, name, args.format)
+                      for name in ["transactions", "fraud_flags"]}
+        else:
+            tables = generate_base_data(args.customers, seed=args.seed, shards=args.shards)
+        stream = event_frame(tables["transactions"], tables["fraud_flags"])
+        if args.limit:
+            stream = stream.iloc[:args.limit]
+        log(f"Streaming {len(stream):,} events to {args.sink} at {args.rate:,.0f}/s base rate")
+        stats = asyncio.run(stream_events(stream, args.sink, args.rate, args.burst, args.encoding))
+        log(f"Sent {stats['events']:,} events in {stats['seconds']:.2f}s "
+            f"({stats['events_per_sec']:,.0f}/s); lag mean {stats['lag_mean'] * 1000:.1f} ms, "
+            f"p99 {stats['lag_p99'] * 1000:.1f} ms, max {stats['lag_max'] * 1000:.1f} ms")
+        return
+
+    timer = PhaseTimer()
+    run_pipeline(
+        args.customers,
+        args.out,
+        seed=args.seed,
+        shards=args.shards,
+        workers=args.workers,
+        fmt=args.format,
+        compression=args.compression,
+        checkpoint=args.checkpoint,
+        resume=args.resume,
+        log=log,
+        timer=timer,
+        cache=StageCache(args.cache, args.cache_mb * 1024 ** 2) if args.cache else None
+    )
+    log(f"Pipeline completed: {args.out}")
+    timer.report()
+
+
+if __name__ == "__main__":
+    main()
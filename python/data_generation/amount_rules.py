@@ -0,0 +1,137 @@
+"""
+Fused amount multipliers.
+
+Each rule scales `amount` by a factor that depends on one low-cardinality
+column (month, weekday, channel, ...). Rather than one masked pass over the
+table per rule, the rules are evaluated once over every combination of the
+columns they use, and each row then picks up its combined factor with a
+single table lookup. New rules only grow that small table.
+
+A rule is a dict:
+
+- {"column": c, "in": [values], "factor": f}  multiplies rows where c is in values
+- {"column": c, "per_unit": r}                 multiplies every row by 1 + c * r
+
+`factor` may also name a runtime parameter (e.g. a factor drawn per run).
+
+A missing value (code -1) matches no "in" rule, so categorical and boolean
+rules leave its amount unchanged, while a "per_unit" rule on it gives NaN,
+as the masked passes these rules replace did.
+
+numba is only needed for the "numba" backend and is imported on first use.
+"""
+
+import numpy as np
+
+BACKENDS = ["auto", "numpy", "numba"]
+
+# Largest combined lookup table the rules may need
+MAX_TABLE_SIZE = 1 << 20
+
+_numba_kernel = None
+
+
+def _kernel():
+    """Compile (once) the loop that packs the key, looks it up and multiplies."""
+    global _numba_kernel
+    if _numba_kernel is None:
+        import numba
+
+        @numba.njit(nogil=True, cache=True)
+        def kernel(amount, codes, sizes, table):
+            for i in range(amount.shape[0]):
+                key = 0
+                for d in range(codes.shape[0]):
+                    c = codes[d, i]
+                    # Missing values use the last slot of their dim
+                    if c < 0:
+                        c = sizes[d] - 1
+                    key = key * sizes[d] + c
+                amount[i] *= table[key]
+
+        _numba_kernel = kernel
+    return _numba_kernel
+
+
+def _resolve_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    if backend != "auto":
+        return backend
+    try:
+        import numba  # noqa: F401
+    except ImportError:
+        return "numpy"
+    return "numba"
+
+
+def rule_factor(rule, values, params=None):
+    """Factor a single rule applies to each entry of `values`."""
+    if "per_unit" in rule:
+        return 1 + values * rule["per_unit"]
+    factor = rule["factor"]
+    if isinstance(factor, str):
+        factor = (params or {})[factor]
+    return np.where(np.isin(values, rule["in"]), factor, 1.0)
+
+
+def _with_missing(values):
+    """`values` plus a trailing missing value (NaN for numbers, None otherwise)."""
+    values = np.asarray(values)
+    if values.dtype.kind in "iuf":
+        return np.append(values.astype(np.float64), np.nan)
+    return np.append(values.astype(object), None)
+
+
+def factor_table(rules, dims, params=None):
+    """
+    Combined factor for every combination of dim codes.
+
+    `dims` is a list of (codes, columns) pairs; columns maps each rule column
+    served by that dim to its value per code. Every dim gets one extra last
+    slot for missing codes. Returns (table, sizes) with the table flattened
+    in C order over `sizes`.
+    """
+    sizes = [len(next(iter(columns.values()))) + 1 for _, columns in dims]
+    n_keys = int(np.prod(sizes))
+    if n_keys > MAX_TABLE_SIZE:
+        raise ValueError(
+            f"Amount rules combine {sizes} values ({n_keys} keys); "
+            f"at most {MAX_TABLE_SIZE} are supported"
+        )
+
+    index = np.indices(sizes).reshape(len(sizes), -1)
+    grid = {}
+    for axis, (_, columns) in enumerate(dims):
+        for name, values in columns.items():
+            grid[name] = _with_missing(values)[index[axis]]
+
+    table = np.ones(n_keys)
+    for rule in rules:
+        table *= rule_factor(rule, grid[rule["column"]], params)
+    return table, sizes
+
+
+def apply_multipliers(amount, rules, dims, params=None, backend="auto"):
+    """
+    Multiply `amount` (float64, in place) by every rule's factor in one pass.
+
+    A missing code (-1) counts as a missing value of its column (see the
+    module docstring); a missing amount stays NaN.
+    """
+    if not rules:
+        return amount
+    table, sizes = factor_table(rules, dims, params)
+
+    if _resolve_backend(backend) == "numba":
+        codes = np.stack([np.asarray(c, dtype=np.int64) for c, _ in dims])
+        _kernel()(amount, codes, np.asarray(sizes, dtype=np.int64), table)
+        return amount
+
+    key = np.zeros(len(amount), dtype=np.int64)
+    for (codes, _), size in zip(dims, sizes):
+        key *= size
+        key += np.where(codes < 0, size - 1, codes)
+
+    amount *= table[key]
+    return amount
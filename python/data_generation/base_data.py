@@ -0,0 +1,371 @@
+"""
+Base portfolio generation: customers, cards, transactions, fraud, payments,
+redemptions and the merchants dimension.
+
+Customers are split into contiguous ID ranges (shards). Each shard draws from
+its own numpy Generator spawned from one SeedSequence, so the merged output
+depends only on (seed, shard count) and never on how many worker processes
+ran the shards.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+
+from .payment_engine import simulate_payments
+from .currency import add_usd_columns
+from .merchants import MERCHANTS_PER_COUNTRY, draw_merchants, merchant_table, merchants_per_country
+from .profiling import PhaseTimer
+from .reference_data import (
+    card_types, cities, country_currency, currency_conversion, income_bands, occupations, reward_programs, segments
+)
+from .run_state import make_state
+from .schema import apply_schema
+from .transaction_engine import simulate_transactions
+
+# =============================
+# CONFIG
+# =============================
+
+START_DATE = datetime(2024, 1, 1)
+END_DATE = datetime(2025, 12, 31)
+DEFAULT_SEED = 42
+
+# =============================
+# CUSTOMER LOGIC
+# =============================
+
+# Geography, currencies and the category lists are in reference_data
+
+segment_weights = [0.25, 0.55, 0.20]
+
+credit_score_ranges = {
+    "Low Value": (550, 650),
+    "Mass Market": (650, 750),
+    "Emerging Affluent": (720, 850)
+}
+
+age_range = (21, 65)
+MAX_JOIN_DAYS_BEFORE_START = 1500
+MISSING_OCCUPATION_FRAC = 0.005
+
+# =============================
+# CARDS LOGIC
+# =============================
+
+credit_limits = {
+    "Basic": (1000, 3000),
+    "Gold": (3000, 8000),
+    "Platinum": (8000, 20000)
+}
+
+annual_fees = {
+    "Basic": 0,
+    "Gold": 100,
+    "Platinum": 300
+}
+
+MAX_ISSUE_DAYS_AFTER_JOIN = 60
+
+TABLES = ["customers", "cards", "transactions", "payments", "fraud_flags", "reward_redemptions"]
+
+# Tables that grow when the horizon is extended (customers and cards do not)
+APPEND_TABLES = ["transactions", "payments", "fraud_flags", "reward_redemptions"]
+
+# Per table: (own ID column, [(foreign ID column, table it points at)])
+ID_COLUMNS = {
+    "transactions": ("transaction_id", []),
+    "payments": ("payment_id", []),
+    "fraud_flags": ("fraud_id", [("transaction_id", "transactions")]),
+    "reward_redemptions": ("redemption_id", [])
+}
+
+
+def currency_table():
+    return pd.DataFrame({
+        "currency_code": list(currency_conversion),
+        "conversion_to_usd": list(currency_conversion.values())
+    })
+
+
+def _choose_within(groups, options, rng):
+    """Uniform pick from options[group] for every element of groups."""
+    out = np.empty(len(groups), dtype=object)
+    for key, choices in options.items():
+        in_group = groups == key
+        out[in_group] = np.array(choices, dtype=object)[
+            rng.integers(0, len(choices), size=in_group.sum())
+        ]
+    return out
+
+
+def generate_customers(customer_ids, rng, start_date=START_DATE):
+    n = len(customer_ids)
+
+    segment = rng.choice(np.array(segments, dtype=object), size=n, p=segment_weights)
+    country = rng.choice(np.array(list(cities), dtype=object), size=n)
+    score_bounds = np.array([credit_score_ranges[s] for s in segments])
+    seg_code = pd.Categorical(segment, categories=segments).codes
+
+    customers_df = pd.DataFrame({
+        "customer_id": customer_ids,
+        "age": rng.integers(age_range[0], age_range[1], size=n),
+        "income_band": _choose_within(segment, income_bands, rng),
+        "occupation": rng.choice(np.array(occupations, dtype=object), size=n),
+        "city": _choose_within(country, cities, rng),
+        "country": country,
+        "customer_segment": segment,
+        "join_date": pd.Timestamp(start_date) - pd.to_timedelta(
+            rng.integers(0, MAX_JOIN_DAYS_BEFORE_START + 1, size=n), unit="D"
+        ),
+        "credit_score": rng.integers(score_bounds[seg_code, 0], score_bounds[seg_code, 1])
+    })
+
+    # Controlled missing values (<1%)
+    missing = rng.choice(n, size=round(n * MISSING_OCCUPATION_FRAC), replace=False)
+    customers_df.loc[missing, "occupation"] = None
+
+    return customers_df
+
+
+def generate_cards(customers_df, rng):
+    # One card per customer, so customer columns line up with cards by position
+    card_type = _choose_within(customers_df["customer_segment"].to_numpy(), card_types, rng)
+    limit_bounds = np.array([credit_limits[t] for t in card_type])
+    n_cards = len(customers_df)
+
+    return pd.DataFrame({
+        "card_id": customers_df["customer_id"].to_numpy(),
+        "customer_id": customers_df["customer_id"].to_numpy(),
+        "card_type": card_type,
+        "credit_limit": rng.integers(limit_bounds[:, 0], limit_bounds[:, 1]),
+        "card_issue_date": customers_df["join_date"].to_numpy() + pd.to_timedelta(
+            rng.integers(0, MAX_ISSUE_DAYS_AFTER_JOIN + 1, size=n_cards), unit="D"
+        ),
+        "annual_fee": [annual_fees[t] for t in card_type],
+        "reward_program_type": rng.choice(np.array(reward_programs, dtype=object), size=n_cards)
+    })
+
+
+def generate_shard(first_customer_id, num_customers, seed_seq, start_date=START_DATE, end_date=END_DATE,
+                   resume=None, merchants=MERCHANTS_PER_COUNTRY):
+    """
+    Generate every table for customers [first_customer_id, first_customer_id + num_customers).
+
+    customer_id and card_id are global; transaction, payment, fraud and
+    redemption IDs start at 1 and are rebased when shards are merged.
+    Returns (tables, phase timings, shard state).
+
+    The shard state (closing balance and missed_streak per card, RNG state,
+    last month) is what `resume` takes to carry on past it: customers and
+    cards are rebuilt from seed_seq, the RNG continues where it stopped and
+    only the months after the state's last month are simulated.
+
+    `merchants` is the merchants per country of the whole run (see
+    merchants.merchants_per_country), the same for every shard.
+    """
+    rng = np.random.default_rng(seed_seq)
+    timer = PhaseTimer()
+    date_range = pd.date_range(start_date, end_date, freq="MS")
+    if resume is not None:
+        date_range = date_range[date_range > pd.Timestamp(resume["last_month"])]
+
+    with timer.phase("customers"):
+        customer_ids = np.arange(first_customer_id, first_customer_id + num_customers)
+        customers_df = generate_customers(customer_ids, rng, start_date)
+
+    with timer.phase("cards"):
+        cards_df = generate_cards(customers_df, rng)
+
+    opening_balance = opening_streak = None
+    if resume is not None:
+        rng.bit_generator.state = resume["rng"]
+        opening_balance, opening_streak = resume["balance"], resume["streak"]
+
+    # Positional index into customers_df for every card (one hash join, no per-card scans)
+    cust_pos = pd.Index(customers_df["customer_id"]).get_indexer(cards_df["customer_id"])
+    card_ids = cards_df["card_id"].to_numpy()
+
+    with timer.phase("transactions"):
+        transactions_df, fraud_df, monthly_spend = simulate_transactions(
+            card_ids,
+            customers_df["customer_segment"].to_numpy()[cust_pos],
+            customers_df["age"].to_numpy()[cust_pos],
+            customers_df["country"].to_numpy()[cust_pos],
+            customers_df["city"].to_numpy()[cust_pos],
+            date_range,
+            cities,
+            country_currency,
+            rng
+        )
+
+    with timer.phase("payments"):
+        payments_df, redemptions_df, closing_balance, closing_streak = simulate_payments(
+            card_ids,
+            cards_df["credit_limit"].to_numpy(dtype=np.float64),
+            monthly_spend,
+            date_range,
+            rng,
+            opening_balance=opening_balance,
+            opening_streak=opening_streak
+        )
+
+    with timer.phase("merchants"):
+        # Drawn after payments, so the merchant dimension leaves every other column's draws as they were
+        transactions_df.insert(2, "merchant_id", draw_merchants(
+            transactions_df["merchant_city"].cat.codes, transactions_df["merchant_category"].cat.codes, rng,
+            merchants
+        ))
+
+    tables = {
+        "customers": customers_df,
+        "cards": cards_df,
+        "transactions": transactions_df,
+        "payments": payments_df,
+        "fraud_flags": fraud_df,
+        "reward_redemptions": redemptions_df
+    }
+    add_usd_columns(tables)
+    for df in tables.values():
+        apply_schema(df)
+
+    state = {
+        "last_month": str(date_range[-1].date()),
+        "balance": closing_balance,
+        "streak": closing_streak,
+        "rng": rng.bit_generator.state
+    }
+    return tables, timer.timings, state
+
+
+def shard_ranges(num_customers, shards):
+    """Split customer IDs 1..num_customers into `shards` contiguous (start, count) ranges."""
+    bounds = np.linspace(0, num_customers, shards + 1).round().astype(int)
+    return [(int(lo) + 1, int(hi - lo)) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def rebase_ids(shard_tables, offsets):
+    """Shift shard-local IDs by the running per-table offsets, then advance them."""
+    for table, (id_col, foreign_keys) in ID_COLUMNS.items():
+        df = shard_tables[table]
+        for fk_col, parent in foreign_keys:
+            df[fk_col] += offsets[parent]
+    for table, (id_col, _) in ID_COLUMNS.items():
+        df = shard_tables[table]
+        df[id_col] += offsets[table]
+        offsets[table] += len(df)
+    return shard_tables
+
+
+def _run_shard(task):
+    return generate_shard(*task)
+
+
+def iter_shards(num_customers, seed=DEFAULT_SEED, shards=1, workers=1,
+                start_date=START_DATE, end_date=END_DATE, offsets=None, resume=None):
+    """
+    Yield (tables, timings, shard state) per shard in shard order with globally unique IDs.
+
+    Shards run in a process pool when workers > 1; results are consumed in
+    submission order so IDs and row order never depend on the worker count.
+
+    `offsets` ({table: rows so far}) is where IDs continue from and is left at
+    the new high-water marks; `resume` is one saved state per shard to carry on from.
+    """
+    seed_seqs = np.random.SeedSequence(seed).spawn(shards)
+    resume = resume or [None] * shards
+    tasks = [
+        (first_id, count, seed_seq, start_date, end_date, shard_resume, merchants_per_country(num_customers))
+        for (first_id, count), seed_seq, shard_resume
+        in zip(shard_ranges(num_customers, shards), seed_seqs, resume)
+    ]
+    if offsets is None:
+        offsets = {table: 0 for table in ID_COLUMNS}
+
+    if workers <= 1:
+        results = map(_run_shard, tasks)
+        for tables, timings, state in results:
+            yield rebase_ids(tables, offsets), timings, state
+        return
+
+    # Keep at most `workers` shards in flight so finished shards do not pile up
+    # in memory while the consumer is still writing earlier ones
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        task_iter = iter(tasks)
+        for task in islice(task_iter, workers):
+            pending.append(pool.submit(_run_shard, task))
+        while pending:
+            tables, timings, state = pending.popleft().result()
+            for task in islice(task_iter, 1):
+                pending.append(pool.submit(_run_shard, task))
+            yield rebase_ids(tables, offsets), timings, state
+
+
+def generate_base_data(num_customers, seed=DEFAULT_SEED, shards=1, workers=1,
+                       start_date=START_DATE, end_date=END_DATE, timer=None, state=None):
+    """
+    Generate and merge all shards. Returns a dict of the eight tables.
+
+    Pass a dict as `state` to receive the end-of-run state (see run_state).
+    """
+    parts = {table: [] for table in TABLES}
+    offsets = {table: 0 for table in ID_COLUMNS}
+    shard_states = []
+
+    for tables, timings, shard_state in iter_shards(num_customers, seed, shards, workers,
+                                                   start_date, end_date, offsets):
+        if timer is not None:
+            timer.add(timings)
+        for table in TABLES:
+            parts[table].append(tables[table])
+        shard_states.append(shard_state)
+
+    if state is not None:
+        state.update(make_state(num_customers, seed, shards, start_date, end_date, offsets, shard_states))
+
+    merged = {table: pd.concat(frames, ignore_index=True) for table, frames in parts.items()}
+    merged["currency_conversions"] = currency_table()
+    merged["merchants"] = merchant_table(merchants_per_country(num_customers))
+    return merged
+
+
+def append_months(state, months):
+    """(first, last) month start of the `months` calendar months after a saved run."""
+    if months < 1:
+        raise ValueError(f"months must be at least 1, got {months}")
+    last = pd.Timestamp(state["shard_states"][0]["last_month"])
+    return last + pd.DateOffset(months=1), last + pd.DateOffset(months=months)
+
+
+def append_base_data(state, months, workers=1, timer=None):
+    """
+    Extend a saved run by `months` calendar months.
+
+    Returns (tables, new state) where tables holds only the new rows of
+    APPEND_TABLES, with IDs continuing after the saved high-water marks.
+    """
+    first_month, last_month = append_months(state, months)
+    end_date = last_month + pd.offsets.MonthEnd(0)
+    offsets = dict(state["next_ids"])
+    parts = {table: [] for table in APPEND_TABLES}
+    shard_states = []
+
+    for tables, timings, shard_state in iter_shards(
+        state["customers"], state["seed"], state["shards"], workers,
+        pd.Timestamp(state["start_date"]), end_date, offsets, state["shard_states"]
+    ):
+        if timer is not None:
+            timer.add(timings)
+        for table in APPEND_TABLES:
+            parts[table].append(tables[table])
+        shard_states.append(shard_state)
+
+    new_state = make_state(state["customers"], state["seed"], state["shards"], state["start_date"],
+                           end_date, offsets, shard_states)
+    merged = {table: pd.concat(frames, ignore_index=True) for table, frames in parts.items()}
+    return merged, new_state
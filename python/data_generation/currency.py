@@ -0,0 +1,83 @@
+"""
+USD normalisation.
+
+Adds amount_usd (transactions), credit_limit_usd / annual_fee_usd (cards,
+in the customer's home currency) and redemption_value_usd (redemptions, in
+the card's home currency) with array lookups keyed on currency_conversion
+and country_currency, so the SQL layer reads them instead of converting.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .reference_data import country_currency, currency_conversion
+from .schema import categorical, categories
+
+# Per table: {usd column: source column}; each USD column sits right after its source
+USD_COLUMNS = {
+    "transactions": {"amount_usd": "amount"},
+    "cards": {"credit_limit_usd": "credit_limit", "annual_fee_usd": "annual_fee"},
+    "reward_redemptions": {"redemption_value_usd": "redemption_value"}
+}
+
+
+def _rate_lookup(codes, table):
+    # Unknown (-1) codes map to NaN
+    return np.append(table, np.nan)[np.where(codes < 0, len(table), codes)]
+
+
+@lru_cache(maxsize=None)
+def rate_tables():
+    """conversion_to_usd per schema category of currency and of country."""
+    cats = categories()
+    by_currency = np.array([currency_conversion[c] for c in cats["currency"]])
+    by_country = np.array([currency_conversion[country_currency[c]] for c in cats["country"]])
+    return by_currency, by_country
+
+
+def currency_rates(currencies):
+    """conversion_to_usd for every entry of a currency column."""
+    return _rate_lookup(categorical(currencies, "currency").codes, rate_tables()[0])
+
+
+def country_rates(countries):
+    """conversion_to_usd of each country's home currency."""
+    return _rate_lookup(categorical(countries, "country").codes, rate_tables()[1])
+
+
+def _set_usd(df, name, rates):
+    for usd_col, source in USD_COLUMNS[name].items():
+        values = np.round(df[source].to_numpy(dtype=np.float64) * rates, 2)
+        if usd_col in df.columns:
+            df[usd_col] = values
+        else:
+            df.insert(df.columns.get_loc(source) + 1, usd_col, values)
+
+
+def add_usd_columns(tables):
+    """Add (or refresh) the USD columns in place; tables missing from `tables` are skipped."""
+    if "transactions" in tables:
+        transactions = tables["transactions"]
+        _set_usd(transactions, "transactions", currency_rates(transactions["currency"]))
+
+    if "cards" not in tables or "customers" not in tables:
+        return tables
+
+    customers = tables["customers"]
+    cards = tables["cards"]
+    home_rate = country_rates(customers["country"])
+    card_rate = _rate_lookup(
+        pd.Index(customers["customer_id"]).get_indexer(cards["customer_id"]), home_rate
+    )
+    _set_usd(cards, "cards", card_rate)
+
+    if "reward_redemptions" in tables:
+        redemptions = tables["reward_redemptions"]
+        redemption_rate = _rate_lookup(
+            pd.Index(cards["card_id"]).get_indexer(redemptions["card_id"]), card_rate
+        )
+        _set_usd(redemptions, "reward_redemptions", redemption_rate)
+
+    return tables
@@ -0,0 +1,154 @@
+"""
+Per-card delinquency state machine for the payments table.
+
+Every card moves through DELINQUENCY_STATUSES (Current, 30DPD, 60DPD,
+90DPD, Charge-off) one statement month at a time. The next status is drawn
+from a row of ROLL_MATRICES: the "missed" matrix for months in which the
+generator recorded a missed payment (missed_streak > 0), the "paid" matrix
+otherwise. The chance of rolling forward to a worse status is adjusted by
+odds multipliers for the card's customer segment and the month's
+utilization band. Charge-off is absorbing.
+
+All cards advance together. A month step is one gather of the cumulative
+matrix rows for each card's (paid/missed, segment, band, status) and one
+comparison against a uniform per card, i.e. O(cards x statuses) array work.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .schema import DELINQUENCY_STATUSES
+
+# Monthly transitions, ROLL_MATRICES[kind][from][to]
+ROLL_MATRICES = {
+    "paid": [
+        # Current  30DPD  60DPD  90DPD  Charge-off
+        [0.995, 0.005, 0.00, 0.00, 0.00],
+        [0.80, 0.12, 0.08, 0.00, 0.00],
+        [0.50, 0.20, 0.15, 0.15, 0.00],
+        [0.35, 0.10, 0.10, 0.30, 0.15],
+        [0.00, 0.00, 0.00, 0.00, 1.00]
+    ],
+    "missed": [
+        [0.85, 0.15, 0.00, 0.00, 0.00],
+        [0.20, 0.35, 0.45, 0.00, 0.00],
+        [0.05, 0.10, 0.40, 0.45, 0.00],
+        [0.05, 0.05, 0.05, 0.45, 0.40],
+        [0.00, 0.00, 0.00, 0.00, 1.00]
+    ]
+}
+ROLL_KINDS = ["paid", "missed"]
+
+# Odds multipliers on rolling forward, per customer segment and utilization band
+SEGMENT_ROLL_MULTIPLIERS = {
+    "Low Value": 1.5,
+    "Mass Market": 1.0,
+    "Emerging Affluent": 0.6
+}
+# Band edges on statement utilization: [0, 0.5), [0.5, 1.0), over the limit
+UTILIZATION_BANDS = [0.5, 1.0]
+BAND_ROLL_MULTIPLIERS = [0.5, 1.0, 1.5]
+
+
+def adjust_roll_odds(matrix, multipliers):
+    """
+    Copies of `matrix` (one per multiplier, shaped like `multipliers` + S x S)
+    where each row's roll-forward probability p becomes the one with odds
+    p / (1 - p) times the multiplier; the rest of the row is rescaled to
+    keep it summing to 1.
+    """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    n = len(DELINQUENCY_STATUSES)
+    if matrix.shape != (n, n) or (matrix < 0).any() or not np.allclose(matrix.sum(axis=1), 1):
+        raise ValueError(f"Roll matrix must be {n}x{n} with non-negative rows summing to 1")
+
+    forward_mask = np.triu(np.ones((n, n), dtype=bool), k=1)
+    forward = np.where(forward_mask, matrix, 0).sum(axis=1)
+    multipliers = np.asarray(multipliers, dtype=np.float64)[..., None]
+
+    odds = forward / np.maximum(1 - forward, 1e-12)
+    new_forward = np.where(forward >= 1, 1.0, multipliers * odds / (1 + multipliers * odds))
+
+    # Forward entries scale by new / old forward mass, the rest by new / old remainder
+    with np.errstate(divide="ignore", invalid="ignore"):
+        forward_scale = np.where(forward > 0, new_forward / forward, 0)
+        rest_scale = np.where(forward < 1, (1 - new_forward) / (1 - forward), 0)
+    return np.where(forward_mask, matrix * forward_scale[..., None], matrix * rest_scale[..., None])
+
+
+def transition_matrices(matrices, segments, segment_multipliers, band_multipliers):
+    """
+    (kinds, len(segments) + 1, bands, S, S) transition matrices for the
+    ROLL_KINDS. The extra last segment (multiplier 1) is for cards whose
+    segment is unknown.
+    """
+    multipliers = np.outer([segment_multipliers.get(s, 1.0) for s in segments] + [1.0], band_multipliers)
+    return np.stack([adjust_roll_odds(matrices[kind], multipliers) for kind in ROLL_KINDS])
+
+
+def utilization_bands(utilization, edges=UTILIZATION_BANDS):
+    """Band index per utilization value (missing values fall in the lowest band)."""
+    return np.searchsorted(np.asarray(edges, dtype=np.float32), np.nan_to_num(utilization), side="right")
+
+
+def run_statuses(groups, bands, missed, observed, matrices, rng, opening=None):
+    """
+    Statuses (cards x months, int8 codes) for the payments grid.
+
+    groups is the segment index per card, bands / missed / observed are
+    (cards x months); months a card has no payment leave its status as is.
+    `opening` is the status before the first month (default Current).
+    """
+    n_cards, n_months = missed.shape
+    _, n_groups, n_bands, n, _ = matrices.shape
+    # One cumulative row per (kind, segment, band, status)
+    cumulative = np.cumsum(matrices, axis=-1).reshape(-1, n)
+
+    status = np.zeros(n_cards, dtype=np.int8) if opening is None else np.asarray(opening, dtype=np.int8)
+    statuses = np.empty((n_cards, n_months), dtype=np.int8)
+    groups = np.asarray(groups, dtype=np.int64)
+
+    for m in range(n_months):
+        row = ((missed[:, m] * n_groups + groups) * n_bands + bands[:, m]) * n + status
+        u = rng.random(n_cards)
+        drawn = (u[:, None] >= cumulative[row, :-1]).sum(axis=1)
+        status = np.where(observed[:, m], drawn, status).astype(np.int8)
+        statuses[:, m] = status
+    return statuses
+
+
+def roll_rates(statuses, observed):
+    """
+    Month-over-month transition counts and rates between consecutive
+    observed months of the same card, as a from_status x to_status table.
+    """
+    n = len(DELINQUENCY_STATUSES)
+    pairs = observed[:, 1:] & observed[:, :-1]
+    codes = statuses[:, :-1][pairs].astype(np.int64) * n + statuses[:, 1:][pairs]
+    counts = np.bincount(codes, minlength=n * n).reshape(n, n)
+
+    summary = pd.DataFrame({
+        "from_status": pd.Categorical.from_codes(np.repeat(np.arange(n), n), categories=DELINQUENCY_STATUSES),
+        "to_status": pd.Categorical.from_codes(np.tile(np.arange(n), n), categories=DELINQUENCY_STATUSES),
+        "card_months": counts.ravel()
+    })
+    totals = np.repeat(counts.sum(axis=1), n)
+    summary["roll_rate_percent"] = np.round(np.divide(
+        summary["card_months"] * 100.0, totals, out=np.zeros(n * n), where=totals > 0
+    ), 2)
+    return summary[summary["card_months"] > 0].reset_index(drop=True)
+
+
+def payment_grid(card_ids, payment_dates):
+    """
+    (card position, month position, observed, card_ids) of every payment
+    row; card positions index the sorted distinct card_ids, rows with a
+    missing card or date are not observed.
+    """
+    card_pos, cards = pd.factorize(card_ids, sort=True)
+    months = payment_dates.to_numpy(dtype="datetime64[M]")
+    observed = ~np.isnat(months) & (card_pos >= 0)
+    month_ord = months.view(np.int64)
+    first = month_ord[observed].min() if observed.any() else 0
+    month_pos = np.where(observed, month_ord - first, 0)
+    return card_pos, month_pos, observed, cards
@@ -0,0 +1,166 @@
+"""
+Replayable transaction event stream for load-testing downstream consumers.
+
+Transactions, each carrying its fraud flag, are emitted in transaction_date
+order as JSON lines or length-prefixed JSON records (4-byte big-endian
+length, then the record) to stdout, a file or a TCP socket. The same seed,
+or the same generated files, always give the same stream.
+
+Pacing follows a schedule fixed up front: event i is due at the sum of
+1 / (rate * peak) over the events before it, where peak is the product of the
+calendar rules in the realism stage's AMOUNT_RULES (Nov/Dec, Feb/Jun,
+weekends), so the feed bursts where spend does. Events are encoded and
+written in batches of at most `burst`, the most that is ever sent ahead of
+schedule. A bounded queue between encoder and sink gives backpressure: a
+slow consumer shows up as lag, not as unbounded buffering.
+"""
+
+import asyncio
+import struct
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from .amount_rules import rule_factor
+from .realism import AMOUNT_RULES
+from .table_io import csv_frame
+
+ENCODINGS = ["jsonl", "length-prefixed"]
+DEFAULT_RATE = 100_000
+DEFAULT_BURST = 1_000
+
+# Encoded batches waiting for the sink before the encoder blocks
+QUEUE_BATCHES = 8
+
+# Calendar rules from the realism stage that shape the event rate
+PEAK_RULES = [rule for rule in AMOUNT_RULES if rule["column"] in ("month", "weekday")]
+
+
+def event_frame(transactions, fraud_flags):
+    """
+    Transactions with is_fraud / fraud_type from fraud_flags, in
+    transaction_date order (ties in transaction_id order). Undated rows are
+    dropped. Money columns are rounded to cents as in CSV output.
+    """
+    events = transactions[transactions["transaction_date"].notna()]
+    events = events.sort_values(["transaction_date", "transaction_id"], kind="stable", ignore_index=True)
+
+    fraud = fraud_flags.drop_duplicates("transaction_id")
+    pos = pd.Index(fraud["transaction_id"]).get_indexer(events["transaction_id"])
+    fraud_type = fraud["fraud_type"].astype("category")
+    codes = np.where(pos >= 0, fraud_type.cat.codes.to_numpy()[pos], -1)
+
+    events = csv_frame(events)
+    events["is_fraud"] = pos >= 0
+    events["fraud_type"] = pd.Categorical.from_codes(codes, categories=fraud_type.cat.categories)
+    return events
+
+
+def peak_factors(dates):
+    """Rate multiplier per event from PEAK_RULES (1.0 on an ordinary weekday)."""
+    dates = pd.DatetimeIndex(dates)
+    values = {"month": dates.month.to_numpy(), "weekday": dates.weekday.to_numpy()}
+    factor = np.ones(len(dates))
+    for rule in PEAK_RULES:
+        factor *= rule_factor(rule, values[rule["column"]])
+    return factor
+
+
+def schedule(events, rate):
+    """Seconds from stream start at which each event is due; None when unpaced."""
+    if not rate:
+        return None
+    gaps = 1.0 / (rate * peak_factors(events["transaction_date"]))
+    return np.concatenate([[0.0], np.cumsum(gaps)[:-1]])
+
+
+def encode(batch, encoding="jsonl"):
+    text = batch.to_json(orient="records", lines=True, date_format="iso", date_unit="s")
+    if encoding == "jsonl":
+        return text.encode()
+    records = [line.encode() for line in text.rstrip("\n").split("\n")]
+    return b"".join(struct.pack(">I", len(r)) + r for r in records)
+
+
+async def open_sink(target):
+    """(write, close) coroutines for "-" (stdout), tcp://host:port or a file path."""
+    if target.startswith("tcp://"):
+        host, port = target[len("tcp://"):].rsplit(":", 1)
+        _, writer = await asyncio.open_connection(host, int(port))
+
+        async def write(data):
+            writer.write(data)
+            await writer.drain()
+
+        async def close():
+            writer.close()
+            await writer.wait_closed()
+
+        return write, close
+
+    f = sys.stdout.buffer if target == "-" else open(target, "wb")
+
+    async def write(data):
+        await asyncio.to_thread(f.write, data)
+
+    async def close():
+        await asyncio.to_thread(f.flush)
+        if f is not sys.stdout.buffer:
+            f.close()
+
+    return write, close
+
+
+async def stream_events(events, sink="-", rate=DEFAULT_RATE, burst=DEFAULT_BURST, encoding="jsonl"):
+    """
+    Emit `events` (see event_frame) to `sink` at `rate` events/sec, shaped by
+    PEAK_RULES; rate=None or 0 sends as fast as the sink accepts.
+
+    Returns {"events", "seconds", "events_per_sec", "lag_mean", "lag_p99",
+    "lag_max"}, lag being how far each batch was written behind its last
+    event's due time.
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unsupported encoding: {encoding}")
+    due = schedule(events, rate)
+    write, close = await open_sink(sink)
+    queue = asyncio.Queue(maxsize=QUEUE_BATCHES)
+    lags = []
+    start = time.perf_counter()
+
+    async def produce():
+        for lo in range(0, len(events), burst):
+            hi = min(lo + burst, len(events))
+            # Encode first, so the wait for the due time absorbs the encoding cost
+            data = encode(events.iloc[lo:hi], encoding)
+            if due is not None:
+                delay = start + due[lo] - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            await queue.put((hi, data))
+        await queue.put(None)
+
+    async def consume():
+        while (item := await queue.get()) is not None:
+            hi, data = item
+            await write(data)
+            if due is not None:
+                lags.append(max(time.perf_counter() - start - due[hi - 1], 0.0))
+
+    try:
+        await asyncio.gather(produce(), consume())
+    finally:
+        await close()
+
+    seconds = time.perf_counter() - start
+    lags = np.array(lags or [0.0])
+    return {
+        "events": len(events),
+        "seconds": seconds,
+        "events_per_sec": len(events) / max(seconds, 1e-9),
+        "lag_mean": float(lags.mean()),
+        "lag_p99": float(np.percentile(lags, 99)),
+        "lag_max": float(lags.max())
+    }
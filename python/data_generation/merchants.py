@@ -0,0 +1,108 @@
+"""
+Merchant dimension with Zipf-distributed popularity.
+
+Every (merchant city, merchant category) pair has its own block of
+merchants: a country's merchants are split evenly over its cities and the
+merchant categories. The count per country scales with the portfolio
+(merchants_per_country) up to a fixed cap, so small runs do not carry the
+full 720K-row dimension and very large ones do not hold a dimension that
+grows with them. Within a block, merchant_ids run in
+popularity order, and the merchant of rank r is picked with weight
+1 / r ** ZIPF_EXPONENT, so a few merchants take a large share of the
+transactions and a long tail sees a handful each.
+
+The table is fixed by these constants and the total customer count (no
+RNG), so every shard and every later stage agrees on it. Draws go through one GroupedAliasSampler: each
+transaction costs a uniform and two lookups, however many merchants there are.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .reference_data import cities
+from .sampler import AliasSampler, GroupedAliasSampler
+from .transaction_engine import merchant_categories
+
+# Merchants per country per customer, between a floor that keeps every
+# (city, category) block populated and a cap. The cap is a deliberate memory
+# trade-off: the whole dimension is built and held as one frame, and at
+# 120,000 per country (reached at 10,000 customers) that is 720K rows, about
+# 8 MB. Larger portfolios share the same merchants, each seeing more
+# transactions, instead of growing the table with the customer count.
+MERCHANTS_PER_CUSTOMER = 12
+MIN_MERCHANTS_PER_COUNTRY = 600
+MERCHANTS_PER_COUNTRY = 120_000
+ZIPF_EXPONENT = 1.05
+
+
+def merchants_per_country(num_customers):
+    """Merchants per country for a portfolio of num_customers (the whole run, not a shard)."""
+    return int(min(max(num_customers * MERCHANTS_PER_CUSTOMER, MIN_MERCHANTS_PER_COUNTRY), MERCHANTS_PER_COUNTRY))
+
+
+@lru_cache(maxsize=None)
+def merchant_layout(per_country=MERCHANTS_PER_COUNTRY):
+    """
+    (group sizes, first merchant_id per group) with group = city code *
+    number of categories + category code, in the schema's city order.
+    """
+    sizes = np.array([
+        per_country // (len(cities[country]) * len(merchant_categories))
+        for country in cities
+        for _ in cities[country]
+        for _ in merchant_categories
+    ], dtype=np.int64)
+    first_ids = np.concatenate([[1], 1 + np.cumsum(sizes)[:-1]])
+    return sizes, first_ids
+
+
+@lru_cache(maxsize=None)
+def merchant_sampler(per_country=MERCHANTS_PER_COUNTRY):
+    """GroupedAliasSampler over the Zipf popularity of each group's merchants."""
+    sizes, _ = merchant_layout(per_country)
+    tables = {size: AliasSampler(1.0 / np.arange(1, size + 1) ** ZIPF_EXPONENT) for size in set(sizes.tolist())}
+    return GroupedAliasSampler([tables[size] for size in sizes.tolist()])
+
+
+def _groups(city_codes, category_codes):
+    return np.asarray(city_codes, dtype=np.int64) * len(merchant_categories) + np.asarray(category_codes)
+
+
+def draw_merchants(city_codes, category_codes, rng, per_country=MERCHANTS_PER_COUNTRY):
+    """merchant_id for every (merchant city code, merchant category code) pair, by popularity."""
+    groups = _groups(city_codes, category_codes)
+    _, first_ids = merchant_layout(per_country)
+    return first_ids[groups] + merchant_sampler(per_country).sample(groups, rng)
+
+
+def recategorize_merchants(merchant_ids, city_codes, category_codes, per_country=MERCHANTS_PER_COUNTRY):
+    """
+    Move merchants to the same popularity rank in another category of their
+    city (ranks outside the new block are clipped), so merchant_id keeps
+    agreeing with a reassigned merchant_category without new draws.
+    """
+    sizes, first_ids = merchant_layout(per_country)
+    old_group = np.searchsorted(first_ids, merchant_ids, side="right") - 1
+    rank = np.asarray(merchant_ids, dtype=np.int64) - first_ids[old_group]
+    groups = _groups(city_codes, category_codes)
+    return first_ids[groups] + np.minimum(rank, sizes[groups] - 1)
+
+
+def merchant_table(per_country=MERCHANTS_PER_COUNTRY):
+    """The merchants dimension: one row per merchant_id."""
+    sizes, first_ids = merchant_layout(per_country)
+    countries = list(cities)
+    city_country = np.array([countries.index(country) for country in cities for _ in cities[country]])
+    groups = np.repeat(np.arange(len(sizes)), sizes)
+    city = groups // len(merchant_categories)
+
+    return pd.DataFrame({
+        "merchant_id": np.arange(1, len(groups) + 1, dtype=np.int32),
+        "merchant_category": pd.Categorical.from_codes(groups % len(merchant_categories),
+                                                       categories=merchant_categories),
+        "merchant_city": pd.Categorical.from_codes(city, categories=[c for k in cities for c in cities[k]]),
+        "merchant_country": pd.Categorical.from_codes(city_country[city], categories=countries),
+        "popularity_rank": (np.arange(len(groups)) - first_ids[groups] + 2).astype(np.int32)
+    })
@@ -0,0 +1,235 @@
+"""
+In-process pipeline: generate -> adjust realism -> audit.
+
+Stages hand DataFrames to each other in memory. With checkpointing on, each
+stage's output tables are also written under <out>/_checkpoints/<stage>/ and
+sealed with a manifest, so a failed run can resume from the last completed
+stage instead of starting over.
+
+With a StageCache, the generate stage is cached under a hash of its config
+and code, and the realism stage step by step (see realism.REALISM_STEPS),
+so a rerun only recomputes what a changed parameter or function affects.
+
+The generator state is saved to <out>/_state/ (see run_state), with ID
+high-water marks raised past the realism output, so the run can be
+extended later with `python -m data_generation append`.
+"""
+
+import json
+import os
+import shutil
+
+from functools import partial
+
+from . import base_data, currency, merchants, payment_engine, reference_data, sampler, schema, transaction_engine
+from .base_data import DEFAULT_SEED, ID_COLUMNS, TABLES, generate_base_data
+from .profiling import PhaseTimer
+from .realism import adjust_realism
+from .run_state import load_state, save_state, state_path
+from .sanitization import run_audit
+from .stage_cache import CachedTable, code_fingerprint, fingerprint, resolve
+from .table_io import DEFAULT_COMPRESSION, read_table, table_path, write_table
+
+STAGES = ["generate", "realism"]
+CHECKPOINT_DIR = "_checkpoints"
+MANIFEST = "manifest.json"
+
+# Cache version of each final table in out_dir; a table whose version is
+# unchanged is not rewritten
+VERSIONS_FILE = "_versions.json"
+
+OUTPUT_TABLES = TABLES + ["currency_conversions", "merchants"]
+
+# Config keys that change stage outputs (worker count does not)
+CHECKPOINT_KEYS = ["customers", "seed", "shards", "format"]
+
+# Config and code that the generate stage's output depends on
+GENERATE_KEYS = ["customers", "seed", "shards"]
+GENERATE_CODE = [base_data, reference_data, transaction_engine, payment_engine, merchants, sampler, currency, schema]
+
+
+def _generate(config, state):
+    return generate_base_data(
+        config["customers"],
+        seed=config["seed"],
+        shards=config["shards"],
+        workers=config["workers"],
+        state=state
+    )
+
+
+def _stage_generate(tables, config, log, cache=None, keys=None, state=None):
+    """
+    (tables, version key per table); with a cache hit the tables are loaded
+    on first use. The end-of-run generator state goes into `state`.
+    """
+    state = {} if state is None else state
+    if cache is None:
+        return _generate(config, state), None
+
+    key = fingerprint("generate", code_fingerprint(*GENERATE_CODE), {k: config[k] for k in GENERATE_KEYS})
+    extras = cache.lookup(key)
+    # Entries stored before the state was kept are regenerated
+    if extras is None or "state" not in extras:
+        tables = _generate(config, state)
+        cache.store(key, tables, extras={"state": state})
+    else:
+        log("Stage 'generate' cached")
+        state.update(extras["state"])
+        tables = {name: CachedTable(partial(cache.load, key, name)) for name in OUTPUT_TABLES}
+    return tables, {name: fingerprint(key, name) for name in OUTPUT_TABLES}
+
+
+def _stage_realism(tables, config, log, cache=None, keys=None, state=None):
+    versions = {} if cache is not None else None
+    tables = adjust_realism(tables, seed=config["seed"], log=log, cache=cache, input_keys=keys, versions=versions)
+    return tables, versions
+
+
+STAGE_FUNCS = {
+    "generate": _stage_generate,
+    "realism": _stage_realism
+}
+
+
+def raise_id_marks(state, tables):
+    """
+    Raise the ID high-water marks in `state` past the IDs in `tables`, so rows
+    appended later never collide with IDs the realism stage assigned.
+    """
+    for table, (id_col, _) in ID_COLUMNS.items():
+        ids = tables[table][id_col]
+        if len(ids):
+            state["next_ids"][table] = max(state["next_ids"][table], int(ids.max()))
+    return state
+
+
+def load_versions(out_dir):
+    path = os.path.join(out_dir, VERSIONS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_final_tables(out_dir, tables, keys, fmt, compression, log, names=OUTPUT_TABLES):
+    """
+    Write the final tables, skipping those already in out_dir at the same
+    cache version. CachedTable placeholders are only loaded to be written.
+    """
+    saved = load_versions(out_dir)
+    versions = {}
+    for name in names:
+        version = fingerprint(keys[name], fmt, compression) if keys and keys.get(name) else None
+        if version and saved.get(name) == version and os.path.exists(table_path(out_dir, name, fmt)):
+            log(f"{name}: unchanged, not rewritten")
+        else:
+            write_table(resolve(tables, [name])[name], out_dir, name, fmt, compression)
+        if version:
+            versions[name] = version
+
+    with open(os.path.join(out_dir, VERSIONS_FILE), "w") as f:
+        json.dump(versions, f, indent=2)
+
+
+def checkpoint_path(out_dir, stage):
+    return os.path.join(out_dir, CHECKPOINT_DIR, stage)
+
+
+def save_checkpoint(out_dir, stage, tables, config):
+    path = checkpoint_path(out_dir, stage)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+
+    for name in OUTPUT_TABLES:
+        write_table(tables[name], path, name, config["format"], config["compression"])
+
+    # Manifest goes last: a checkpoint without one is incomplete and ignored
+    manifest = {"stage": stage, "config": {k: config[k] for k in CHECKPOINT_KEYS}}
+    with open(os.path.join(path, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def load_last_checkpoint(out_dir, config):
+    """Return (stage, tables) for the latest sealed checkpoint, or (None, None)."""
+    expected = {k: config[k] for k in CHECKPOINT_KEYS}
+
+    for stage in reversed(STAGES):
+        manifest_path = os.path.join(checkpoint_path(out_dir, stage), MANIFEST)
+        if not os.path.exists(manifest_path):
+            continue
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest["config"] != expected:
+            raise ValueError(
+                f"Checkpoint '{stage}' in {out_dir} was written with {manifest['config']}, "
+                f"not {expected}; rerun without --resume or use another --out"
+            )
+        path = checkpoint_path(out_dir, stage)
+        tables = {name: read_table(path, name, config["format"]) for name in OUTPUT_TABLES}
+        return stage, tables
+
+    return None, None
+
+
+def run_pipeline(num_customers, out_dir, seed=DEFAULT_SEED, shards=1, workers=1,
+                 fmt="csv", compression=DEFAULT_COMPRESSION, checkpoint=False,
+                 resume=False, log=print, timer=None, cache=None):
+    """
+    Run every stage and write the final tables to out_dir.
+
+    `cache` is an optional StageCache to reuse stage and step outputs from.
+    Returns (tables, audit) where audit is the sanitization summary.
+    """
+    config = {
+        "customers": num_customers,
+        "seed": seed,
+        "shards": shards,
+        "workers": workers,
+        "format": fmt,
+        "compression": compression
+    }
+    timer = timer or PhaseTimer()
+    os.makedirs(out_dir, exist_ok=True)
+
+    tables = keys = None
+    state = {}
+    remaining = STAGES
+    if resume:
+        done, tables = load_last_checkpoint(out_dir, config)
+        if done is not None:
+            remaining = STAGES[STAGES.index(done) + 1:]
+            log(f"Resuming after checkpoint '{done}'")
+            # Saved when the interrupted run finished its generate stage
+            if os.path.exists(state_path(out_dir)):
+                state = load_state(out_dir)
+
+    for stage in remaining:
+        log(f"Stage '{stage}' started")
+        with timer.phase(stage):
+            tables, keys = STAGE_FUNCS[stage](tables, config, log, cache, keys, state)
+        log(f"Stage '{stage}' finished in {timer.timings[stage]:.2f}s")
+
+        if stage == "generate":
+            save_state(out_dir, state)
+
+        if checkpoint:
+            with timer.phase("checkpoint"):
+                save_checkpoint(out_dir, stage, resolve(tables, OUTPUT_TABLES), config)
+
+    if cache is not None:
+        log(f"Stage cache: {cache.hits} hit(s), {cache.misses} miss(es)")
+
+    log("Saving final tables")
+    with timer.phase("save"):
+        save_final_tables(out_dir, tables, keys, fmt, compression, log)
+        if state:
+            save_state(out_dir, raise_id_marks(state, tables))
+        else:
+            log(f"No generator state to save (resumed from a checkpoint without {state_path(out_dir)})")
+
+    with timer.phase("sanitize"):
+        audit = run_audit(tables)
+
+    return tables, audit
@@ -0,0 +1,232 @@
+"""
+Bulk Postgres loader for the generated tables.
+
+Tables from sql/01_schema.sql are created without their constraints, every
+table is streamed in with COPY ... FROM STDIN (all tables in parallel over a
+small connection pool), and primary keys, checks, foreign keys and FK indexes
+are added once the data is in. Nothing is validated row by row during COPY.
+
+psycopg (3) is only needed here and is imported on first use.
+
+    cd python
+    python -m data_generation load --dsn postgresql://localhost/portfolio --dir ./output
+"""
+
+import itertools
+import os
+import queue
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .table_io import csv_frame, iter_table, table_path
+
+SCHEMA_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "sql", "01_schema.sql")
+
+# SQL table name -> generated table name, where they differ
+TABLE_FILES = {"currency_conversion": "currency_conversions"}
+
+DEFAULT_WORKERS = 4
+COPY_BLOCK_BYTES = 1 << 20
+COPY_BATCH_ROWS = 200_000
+
+_CREATE_TABLE = re.compile(r"CREATE TABLE\s+(\w+)\s*\((.*?)\)\s*;", re.S | re.I)
+_COLUMN = re.compile(r"^(\w+)\s+(\w+(?:\s*\([\d,\s]+\))?)\s*(.*?),?$")
+_REFERENCES = re.compile(r"REFERENCES\s+(\w+)\s*\((\w+)\)", re.I)
+_CHECK = re.compile(r"CHECK\s*(\(.*\))", re.I)
+
+
+def require_psycopg():
+    try:
+        import psycopg
+    except ImportError as exc:
+        raise ImportError("the Postgres loader needs psycopg: pip install 'psycopg[binary]'") from exc
+    return psycopg
+
+
+def parse_schema(sql):
+    """
+    {table: [column, ...]} from the CREATE TABLE statements in `sql`.
+
+    Each column is a dict with name, type, not_null, primary_key, check
+    (expression or None) and references ((table, column) or None).
+    """
+    sql = re.sub(r"--[^\n]*", "", sql)
+    schema = {}
+    for table, body in _CREATE_TABLE.findall(sql):
+        columns = []
+        for line in body.splitlines():
+            match = _COLUMN.match(line.strip())
+            if not match:
+                continue
+            name, col_type, rest = match.groups()
+            check = _CHECK.search(rest)
+            references = _REFERENCES.search(rest)
+            columns.append({
+                "name": name,
+                "type": col_type,
+                "not_null": "NOT NULL" in rest.upper(),
+                "primary_key": "PRIMARY KEY" in rest.upper(),
+                "check": check.group(1) if check else None,
+                "references": references.groups() if references else None
+            })
+        schema[table] = columns
+    return schema
+
+
+def create_statement(table, columns):
+    """CREATE TABLE with types and NOT NULL only; keys and checks come after the load."""
+    cols = ",\n    ".join(
+        f"{c['name']} {c['type']}" + (" NOT NULL" if c["not_null"] else "") for c in columns
+    )
+    return f"CREATE TABLE {table} (\n    {cols}\n)"
+
+
+def key_statements(table, columns):
+    """Primary key and CHECK constraints (need no other table)."""
+    stmts = [f"ALTER TABLE {table} ADD PRIMARY KEY ({c['name']})" for c in columns if c["primary_key"]]
+    stmts += [f"ALTER TABLE {table} ADD CHECK {c['check']}" for c in columns if c["check"]]
+    return stmts
+
+
+def foreign_key_statements(table, columns):
+    """Foreign keys plus an index on each referencing column."""
+    stmts = []
+    for c in columns:
+        if c["references"]:
+            ref_table, ref_col = c["references"]
+            stmts.append(
+                f"ALTER TABLE {table} ADD FOREIGN KEY ({c['name']}) REFERENCES {ref_table} ({ref_col})"
+            )
+            stmts.append(f"CREATE INDEX ON {table} ({c['name']})")
+    return stmts
+
+
+def copy_table(conn, table, directory, fmt="csv"):
+    """Stream one generated table into `table` with COPY; returns the row count."""
+    path = table_path(directory, TABLE_FILES.get(table, table), fmt)
+    rows = 0
+
+    with conn.cursor() as cur:
+        if fmt == "csv":
+            with open(path, newline="") as f:
+                header = f.readline().strip()
+                f.seek(0)
+                with cur.copy(f"COPY {table} ({header}) FROM STDIN WITH (FORMAT csv, HEADER true)") as copy:
+                    while True:
+                        block = f.read(COPY_BLOCK_BYTES)
+                        if not block:
+                            break
+                        copy.write(block)
+            rows = cur.rowcount
+        else:
+            frames = iter_table(directory, TABLE_FILES.get(table, table), fmt, COPY_BATCH_ROWS)
+            first = next(frames, None)
+            if first is not None:
+                columns = ", ".join(first.columns)
+                with cur.copy(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)") as copy:
+                    for df in itertools.chain([first], frames):
+                        copy.write(csv_frame(df).to_csv(index=False, header=False))
+                        rows += len(df)
+
+    conn.commit()
+    return rows
+
+
+def _run_pooled(pool, tasks, workers):
+    """Run fn(conn) for every (key, fn) in tasks, each borrowing a pooled connection."""
+    def run(fn):
+        conn = pool.get()
+        try:
+            return fn(conn)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            pool.put(conn)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {key: executor.submit(run, fn) for key, fn in tasks}
+        return {key: future.result() for key, future in futures.items()}
+
+
+def _execute_all(stmts):
+    def run(conn):
+        for stmt in stmts:
+            conn.execute(stmt)
+        conn.commit()
+    return run
+
+
+def existing_tables(conn, tables):
+    """Those of `tables` that already exist in the connection's current schema."""
+    rows = conn.execute(
+        "SELECT table_name FROM information_schema.tables "
+        "WHERE table_schema = current_schema() AND table_name = ANY(%s)", (list(tables),)
+    ).fetchall()
+    return sorted(name for name, in rows)
+
+
+def load_tables(dsn, directory, fmt="csv", schema_path=SCHEMA_SQL, workers=DEFAULT_WORKERS,
+                replace=False, log=print):
+    """
+    Create the schema, COPY every table in from `directory` and build constraints.
+
+    If any table already exists, a ValueError is raised and nothing is
+    changed, unless replace=True: then those tables are dropped first, with
+    CASCADE, so views and foreign keys that depend on them go too.
+    Returns {table: {"rows", "seconds", "rows_per_sec"}}.
+    """
+    psycopg = require_psycopg()
+
+    with open(schema_path) as f:
+        schema = parse_schema(f.read())
+    tables = list(schema)
+    workers = max(1, min(workers, len(tables)))
+
+    pool = queue.Queue()
+    for _ in range(workers):
+        pool.put(psycopg.connect(dsn))
+
+    try:
+        def create_all(conn):
+            existing = existing_tables(conn, tables)
+            if existing and not replace:
+                raise ValueError(f"Tables already exist: {', '.join(existing)}; "
+                                 f"pass replace=True (--replace) to drop and reload them")
+            for table in existing:
+                log(f"Dropping {table} (CASCADE)")
+                conn.execute(f"DROP TABLE IF EXISTS {table} CASCADE")
+            for table in tables:
+                conn.execute(create_statement(table, schema[table]))
+            conn.commit()
+
+        _run_pooled(pool, [("create", create_all)], 1)
+
+        # No constraints yet, so every table loads independently
+        def timed_copy(table):
+            def run(conn):
+                start = time.time()
+                rows = copy_table(conn, table, directory, fmt)
+                seconds = time.time() - start
+                log(f"{table}: {rows:,} rows in {seconds:.2f}s ({rows / max(seconds, 1e-9):,.0f} rows/s)")
+                return {"rows": rows, "seconds": seconds, "rows_per_sec": rows / max(seconds, 1e-9)}
+            return run
+
+        log(f"Loading {len(tables)} tables with {workers} connections")
+        stats = _run_pooled(pool, [(t, timed_copy(t)) for t in tables], workers)
+
+        start = time.time()
+        _run_pooled(pool, [(t, _execute_all(key_statements(t, schema[t]))) for t in tables], workers)
+        log(f"Primary keys and checks built in {time.time() - start:.2f}s")
+
+        start = time.time()
+        _run_pooled(pool, [
+            (t, _execute_all(foreign_key_statements(t, schema[t]) + [f"ANALYZE {t}"])) for t in tables
+        ], workers)
+        log(f"Foreign keys, indexes and ANALYZE done in {time.time() - start:.2f}s")
+    finally:
+        while not pool.empty():
+            pool.get().close()
+
+    return stats
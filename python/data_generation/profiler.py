@@ -0,0 +1,508 @@
+"""
+Single-pass, chunked data-quality profile of the generated tables.
+
+Covers the checks of sql/02_sanity_checks.sql and the audit in
+sanitization.py, but reads every table once, in chunks, and computes all of
+them together. Tables (and the row groups of large parquet / feather
+files) are profiled in parallel processes. Each worker returns mergeable
+accumulators:
+
+- row, null, min / max / sum counts per column
+- the primary key set (a bitmap, one bit per integer ID; a Counter for text
+  keys) for uniqueness, and rows per foreign key found in the parent's set
+- spend per card and per month for the audit's segment and trend sections
+
+Memory is bounded by the chunk size and one bit per ID, not by table size.
+Tables are profiled in dependency order (parents first, see sql/01_schema.sql
+for the keys) so each foreign key is checked against the finished parent
+key set while the child is read. The report is a plain dict that serialises
+to JSON.
+"""
+
+import json
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .postgres_loader import SCHEMA_SQL, TABLE_FILES, parse_schema
+from .table_io import READ_CHUNK_ROWS, iter_table, table_path
+
+DEFAULT_WORKERS = 4
+
+# Values that must be > 0 (primary keys are checked too)
+POSITIVE_COLUMNS = ["amount", "payment_amount", "redemption_value"]
+
+# Audit inputs: spend per card and per month, and the card -> customer ->
+# segment links that put card spend into segments
+SPEND = {"table": "transactions", "id": "transaction_id", "card": "card_id",
+         "date": "transaction_date", "amount": "amount"}
+LINKS = {"cards": ("card_id", "customer_id"), "customers": ("customer_id", "customer_segment")}
+
+
+# Set bits per byte value, for counting the keys in a bitmap
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class KeySet:
+    """
+    Distinct keys seen, plus the rows they came from: a bitmap (one bit per
+    ID) for non-negative integers, a Counter otherwise. Duplicates are rows
+    minus distinct keys, so repeats need no per-key count, and parts merge
+    with an in-place OR.
+    """
+
+    def __init__(self):
+        self.bits = np.zeros(0, dtype=np.uint8)
+        self.rows = 0
+        self.other = Counter()
+
+    def _grow(self, size):
+        nbytes = (size + 7) // 8
+        if nbytes > len(self.bits):
+            self.bits = np.concatenate([self.bits, np.zeros(nbytes - len(self.bits), dtype=np.uint8)])
+
+    def _set(self, keys):
+        if not len(keys):
+            return
+        low, high = int(keys.min()), int(keys.max())
+        self._grow(high + 1)
+        first = low // 8
+        if high - 8 * first < 8 * len(keys):
+            # IDs in a chunk are mostly a compact range: pack a mask over it
+            mask = np.zeros(high - 8 * first + 1, dtype=bool)
+            mask[keys - 8 * first] = True
+            packed = np.packbits(mask, bitorder="little")
+            np.bitwise_or(self.bits[first:first + len(packed)], packed, out=self.bits[first:first + len(packed)])
+        else:
+            np.bitwise_or.at(self.bits, keys >> 3, (1 << (keys & 7)).astype(np.uint8))
+
+    def update(self, values):
+        values = values.dropna()
+        if pd.api.types.is_integer_dtype(values.dtype):
+            keys = values.to_numpy(dtype=np.int64)
+            negative = keys < 0
+            if negative.any():
+                self.other.update(keys[negative].tolist())
+                keys = keys[~negative]
+            self.rows += len(keys)
+            self._set(keys)
+        else:
+            self.other.update(values.astype(str).value_counts().to_dict())
+
+    def merge(self, other):
+        self._grow(8 * len(other.bits))
+        n = len(other.bits)
+        np.bitwise_or(self.bits[:n], other.bits, out=self.bits[:n])
+        self.rows += other.rows
+        self.other.update(other.other)
+        return self
+
+    def distinct(self):
+        return int(_POPCOUNT[self.bits].sum(dtype=np.int64)) + len(self.other)
+
+    def total(self):
+        return self.rows + sum(self.other.values())
+
+    def duplicates(self):
+        """Rows beyond the first for every key seen more than once."""
+        return self.total() - self.distinct()
+
+    def contains(self, values):
+        """Boolean array: each non-null value of `values` is a key in this set."""
+        values = values.dropna()
+        if pd.api.types.is_integer_dtype(values.dtype):
+            keys = values.to_numpy(dtype=np.int64)
+            inside = (keys >= 0) & (keys < 8 * len(self.bits))
+            if not len(self.bits):
+                return np.isin(keys, [k for k in self.other if isinstance(k, int)])
+            safe = np.where(inside, keys, 0)
+            found = inside & ((self.bits[safe >> 3] >> (safe & 7).astype(np.uint8)) & 1).astype(bool)
+            if self.other:
+                found |= np.isin(keys, [k for k in self.other if isinstance(k, int)])
+            return found
+        return values.astype(str).isin({str(k) for k in self.other}).to_numpy()
+
+
+def _column_stats():
+    return {"nulls": 0, "count": 0, "min": None, "max": None, "sum": 0.0, "non_positive": 0}
+
+
+def _update_column(stats, series, positive):
+    nulls = int(series.isna().sum())
+    stats["nulls"] += nulls
+    stats["count"] += len(series) - nulls
+    values = series.dropna()
+    if values.empty:
+        return
+
+    if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+        arr = values.to_numpy(dtype=np.float64)
+        stats["sum"] += float(arr.sum())
+        low, high = float(arr.min()), float(arr.max())
+        if positive:
+            stats["non_positive"] += int((arr <= 0).sum())
+    elif pd.api.types.is_datetime64_any_dtype(values.dtype):
+        low, high = values.min(), values.max()
+    else:
+        return
+    stats["min"] = low if stats["min"] is None else min(stats["min"], low)
+    stats["max"] = high if stats["max"] is None else max(stats["max"], high)
+
+
+def _merge_column(stats, other):
+    for key in ["nulls", "count", "sum", "non_positive"]:
+        stats[key] += other[key]
+    for key, pick in [("min", min), ("max", max)]:
+        if other[key] is not None:
+            stats[key] = other[key] if stats[key] is None else pick(stats[key], other[key])
+
+
+def _set_link(link, keys, values):
+    # int32 like the schema's customer_id / card_id: 4 bytes per card, not 8
+    size = max(len(link), int(keys.max(initial=-1)) + 1)
+    if size > len(link):
+        link = np.concatenate([link, np.full(size - len(link), -1, dtype=np.int32)])
+    link[keys] = values
+    return link
+
+
+class TableProfile:
+    """Mergeable statistics of one table, or of one part of it."""
+
+    def __init__(self, table, columns, parents=None):
+        self.table = table
+        self.rows = 0
+        self.primary_key = next((c["name"] for c in columns if c["primary_key"]), None)
+        self.references = {c["name"]: c["references"] for c in columns if c["references"]}
+        self.not_null = [c["name"] for c in columns if c["not_null"]]
+        self.columns = {c["name"]: _column_stats() for c in columns}
+        self.key = KeySet() if self.primary_key else None
+        # Parent key set per foreign key column, and its [non-null rows, rows found in the parent]
+        self.parents = parents or {}
+        self.foreign = {col: [0, 0] for col in self.parents}
+        self.values = {}
+        self.card_spend = None
+        self.monthly = {}
+        self.link = np.zeros(0, dtype=np.int32)
+        self.link_labels = None
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        for col, stats in self.columns.items():
+            if col in chunk.columns:
+                positive = col in POSITIVE_COLUMNS or col == self.primary_key
+                _update_column(stats, chunk[col], positive)
+                if isinstance(chunk[col].dtype, pd.CategoricalDtype):
+                    counts = chunk[col].value_counts(dropna=True)
+                    self.values.setdefault(col, Counter()).update(
+                        {str(k): int(v) for k, v in counts.items() if v}
+                    )
+        if self.key is not None and self.primary_key in chunk.columns:
+            self.key.update(chunk[self.primary_key])
+        for col, parent in self.parents.items():
+            if col in chunk.columns:
+                found = parent.contains(chunk[col])
+                self.foreign[col][0] += len(found)
+                self.foreign[col][1] += int(found.sum())
+
+        if self.table == SPEND["table"]:
+            self._update_spend(chunk)
+        if self.table in LINKS:
+            self._update_link(chunk)
+
+    def _update_link(self, chunk):
+        # Dense key -> value array (-1 = unknown); categorical values are stored as codes
+        key, value = LINKS[self.table]
+        part = chunk[[key, value]].dropna()
+        values = part[value]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            self.link_labels = [str(c) for c in values.cat.categories]
+            values = values.cat.codes
+        self.link = _set_link(self.link, part[key].to_numpy(dtype=np.int64), values.to_numpy(dtype=np.int64))
+
+    def _update_spend(self, chunk):
+        card = chunk[SPEND["card"]]
+        valid = card.notna().to_numpy()
+        card_ids = card.to_numpy(dtype=np.float64, na_value=-1)[valid].astype(np.int64)
+        amount = chunk[SPEND["amount"]].to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+        has_amount = ~np.isnan(amount)
+        has_id = chunk[SPEND["id"]].notna().to_numpy()[valid]
+
+        size = max(int(card_ids.max(initial=-1)) + 1, 0 if self.card_spend is None else self.card_spend.shape[1])
+        spend = np.zeros((3, size))
+        spend[0] = np.bincount(card_ids, weights=np.where(has_amount, amount, 0.0), minlength=size)
+        spend[1] = np.bincount(card_ids, weights=has_amount, minlength=size)
+        spend[2] = np.bincount(card_ids, weights=has_id, minlength=size)
+        if self.card_spend is not None:
+            spend[:, :self.card_spend.shape[1]] += self.card_spend
+        self.card_spend = spend
+
+        months = chunk[SPEND["date"]].to_numpy(dtype="datetime64[ns]").astype("datetime64[M]")
+        amounts = chunk[SPEND["amount"]].to_numpy(dtype=np.float64, na_value=np.nan)
+        dated = ~np.isnat(months)
+        uniq, inverse = np.unique(months[dated], return_inverse=True)
+        has_amount = ~np.isnan(amounts[dated])
+        totals = np.bincount(inverse, weights=np.where(has_amount, amounts[dated], 0.0), minlength=len(uniq))
+        counts = np.bincount(inverse, weights=has_amount, minlength=len(uniq))
+        for month, total, count in zip(uniq.astype(str).tolist(), totals, counts):
+            t, c = self.monthly.get(month, (0.0, 0))
+            self.monthly[month] = (t + float(total), c + int(count))
+
+    def merge(self, other):
+        self.rows += other.rows
+        for col, stats in self.columns.items():
+            _merge_column(stats, other.columns[col])
+        if self.key is not None:
+            self.key.merge(other.key)
+        for col, (rows, found) in other.foreign.items():
+            self.foreign[col][0] += rows
+            self.foreign[col][1] += found
+        for col, counts in other.values.items():
+            self.values.setdefault(col, Counter()).update(counts)
+        if other.card_spend is not None:
+            if self.card_spend is None:
+                self.card_spend = other.card_spend
+            else:
+                size = max(self.card_spend.shape[1], other.card_spend.shape[1])
+                spend = np.zeros((3, size))
+                spend[:, :self.card_spend.shape[1]] += self.card_spend
+                spend[:, :other.card_spend.shape[1]] += other.card_spend
+                self.card_spend = spend
+        for month, (total, count) in other.monthly.items():
+            t, c = self.monthly.get(month, (0.0, 0))
+            self.monthly[month] = (t + total, c + count)
+        if len(other.link):
+            known = np.flatnonzero(other.link >= 0)
+            self.link = _set_link(self.link, known, other.link[known])
+            self.link_labels = self.link_labels or other.link_labels
+        return self
+
+
+def _parts(directory, table, fmt, workers):
+    """How many readers share the table's file (row groups / record batches)."""
+    if fmt == "csv" or workers <= 1:
+        return 1
+    import pyarrow as pa
+    path = table_path(directory, TABLE_FILES.get(table, table), fmt)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        groups = pq.ParquetFile(path).num_row_groups
+    else:
+        with pa.memory_map(path) as mapped:
+            groups = pa.ipc.open_file(mapped).num_record_batches
+    return max(1, min(workers, groups // 4))
+
+
+def profile_part(directory, table, columns, fmt="csv", chunk_rows=READ_CHUNK_ROWS, part=(0, 1), parents=None):
+    """
+    TableProfile of one table (or one part of it) from its generated file.
+    `parents` maps foreign key columns to the parent's finished KeySet.
+    """
+    profile = TableProfile(table, columns, parents)
+    for chunk in iter_table(directory, TABLE_FILES.get(table, table), fmt, chunk_rows, part=part):
+        profile.update(chunk)
+    # The parent sets are only needed while reading; do not send them back
+    profile.parents = {}
+    return profile
+
+
+def _profile_task(task):
+    return profile_part(*task)
+
+
+def _number(value):
+    if value is None:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return round(float(value), 4)
+
+
+def _lookup(link, keys):
+    """link[keys], with -1 for keys outside the link array or already -1."""
+    inside = (keys >= 0) & (keys < len(link))
+    return np.where(inside, link[np.where(inside, keys, 0)], -1)
+
+
+def _segment_spend(spend, cards, customers):
+    """Spend, transaction count and average ticket per customer segment (inner joins, as in the audit)."""
+    if spend.card_spend is None or customers.link_labels is None:
+        return {}
+    card_ids = np.arange(spend.card_spend.shape[1])
+    segment = _lookup(customers.link, _lookup(cards.link, card_ids))
+    known = segment >= 0
+    n = len(customers.link_labels)
+    total, counted, txns = (
+        np.bincount(segment[known], weights=spend.card_spend[i, known], minlength=n) for i in range(3)
+    )
+    return {
+        label: {
+            "total_spend": round(float(total[i]), 2),
+            "txn_count": int(txns[i]),
+            "avg_spend_per_txn": round(float(total[i] / counted[i]), 2) if counted[i] else None
+        }
+        for i, label in enumerate(customers.link_labels) if txns[i]
+    }
+
+
+def build_report(profiles):
+    """JSON-ready report: per-table stats plus the sanity-check and audit results."""
+    tables = {}
+    checks = {"row_counts": {}, "duplicate_ids": {}, "non_positive": {}, "not_null_violations": {},
+              "orphan_rows": {}}
+
+    for table, profile in profiles.items():
+        orphans = {col: rows - found for col, (rows, found) in profile.foreign.items()}
+        duplicates = profile.key.duplicates() if profile.key is not None else 0
+        tables[table] = {
+            "rows": profile.rows,
+            "primary_key": profile.primary_key,
+            "duplicate_ids": duplicates,
+            "orphan_rows": orphans,
+            "columns": {
+                col: {
+                    "nulls": stats["nulls"],
+                    "min": _number(stats["min"]),
+                    "max": _number(stats["max"]),
+                    "mean": round(stats["sum"] / stats["count"], 4)
+                    if stats["count"] and stats["min"] is not None and not isinstance(stats["min"], pd.Timestamp)
+                    else None,
+                    "non_positive": stats["non_positive"]
+                }
+                for col, stats in profile.columns.items()
+            },
+            "value_counts": {col: dict(sorted(counts.items())) for col, counts in profile.values.items()}
+        }
+
+        checks["row_counts"][table] = profile.rows
+        checks["duplicate_ids"][table] = duplicates
+        checks["non_positive"][table] = {
+            col: stats["non_positive"] for col, stats in profile.columns.items() if stats["non_positive"]
+        }
+        checks["not_null_violations"][table] = {
+            col: profile.columns[col]["nulls"] for col in profile.not_null if profile.columns[col]["nulls"]
+        }
+        checks["orphan_rows"][table] = {col: n for col, n in orphans.items() if n}
+
+    if "transactions" in profiles and "fraud_flags" in profiles:
+        flagged = profiles["fraud_flags"].foreign["transaction_id"][1]
+        checks["fraud_rate_percent"] = round(flagged * 100.0 / max(profiles["transactions"].rows, 1), 4)
+    if "payments" in profiles:
+        stats = tables["payments"]["columns"]["payment_amount"]
+        checks["payment_amount"] = {"min": stats["min"], "avg": stats["mean"], "max": stats["max"]}
+    if "customers" in profiles:
+        checks["segment_counts"] = tables["customers"]["value_counts"].get("customer_segment", {})
+
+    spend = profiles.get(SPEND["table"])
+    if spend is not None:
+        amount = spend.columns[SPEND["amount"]]
+        monthly = {month: round(total, 2) for month, (total, _) in sorted(spend.monthly.items())}
+        decembers = [m for m in monthly if m.endswith("-12") and f"{int(m[:4])}-11" in monthly]
+        audit = {
+            "total_spend": round(amount["sum"], 2),
+            "avg_txn": round(amount["sum"] / amount["count"], 4) if amount["count"] else None,
+            "null_amounts": amount["nulls"],
+            "duplicate_txns": tables[SPEND["table"]]["duplicate_ids"],
+            "monthly_spend": monthly,
+            "spike_ratio": None
+        }
+        if decembers:
+            dec = decembers[-1]
+            nov = f"{dec[:4]}-11"
+            audit.update(nov_month=nov, dec_month=dec, nov_spend=monthly[nov], dec_spend=monthly[dec],
+                         spike_ratio=round(monthly[dec] / monthly[nov], 4) if monthly[nov] else None)
+        if "cards" in profiles and "customers" in profiles:
+            audit["segment_spend"] = _segment_spend(spend, profiles["cards"], profiles["customers"])
+        checks["audit"] = audit
+
+    # Hard failures: any duplicate key, non-positive amount, NOT NULL violation or orphan
+    checks["failed"] = sorted(
+        f"{check}:{table}"
+        for check in ("duplicate_ids", "non_positive", "not_null_violations", "orphan_rows")
+        for table, found in checks[check].items() if found
+    )
+    return {"tables": tables, "checks": checks}
+
+
+def _references(columns):
+    return {c["name"]: c["references"] for c in columns if c["references"]}
+
+
+def dependency_layers(schema, names):
+    """
+    `names` in groups that can be profiled together: every table comes after
+    the tables its foreign keys reference (those outside `names` are ignored).
+    """
+    remaining = list(names)
+    layers = []
+    while remaining:
+        layer = [
+            t for t in remaining
+            if all(parent == t or parent not in remaining for parent, _ in _references(schema[t]).values())
+        ]
+        # A reference cycle: profile the rest together, without those FK checks
+        layer = layer or remaining
+        layers.append(layer)
+        remaining = [t for t in remaining if t not in layer]
+    return layers
+
+
+def profile_tables(directory, fmt="csv", schema_path=SCHEMA_SQL, tables=None, workers=DEFAULT_WORKERS,
+                   chunk_rows=READ_CHUNK_ROWS, log=print):
+    """
+    Profile every schema table (or `tables`) in `directory` in one pass each,
+    up to `workers` parts at a time. Returns the report from build_report.
+    """
+    with open(schema_path) as f:
+        schema = parse_schema(f.read())
+    names = [t for t in schema if tables is None or t in tables]
+    start = time.time()
+
+    def collect(results, profiles):
+        for profile in results:
+            profiles[profile.table] = profiles[profile.table].merge(profile) if profile.table in profiles else profile
+
+    profiles = {}
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for layer in dependency_layers(schema, names):
+            tasks = []
+            for table in layer:
+                parents = {
+                    col: profiles[parent].key for col, (parent, _) in _references(schema[table]).items()
+                    if parent in profiles and profiles[parent].key is not None
+                }
+                parts = _parts(directory, table, fmt, workers)
+                tasks += [(directory, table, schema[table], fmt, chunk_rows, (i, parts), parents)
+                          for i in range(parts)]
+            collect(pool.map(_profile_task, tasks) if pool else map(_profile_task, tasks), profiles)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    for table in names:
+        log(f"{table}: {profiles[table].rows:,} rows profiled")
+
+    report = build_report(profiles)
+    report["seconds"] = round(time.time() - start, 2)
+    return report
+
+
+def write_report(report, path):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    return path
+
+
+def audit_summary(report):
+    """The audit's headline numbers (see sanitization.run_audit) from a report."""
+    audit = report["checks"]["audit"]
+    segments = pd.DataFrame.from_dict(audit.get("segment_spend", {}), orient="index")
+    segments = segments.rename(columns={
+        "total_spend": "Total_Spend", "txn_count": "Txn_Count", "avg_spend_per_txn": "Avg_Spend_Per_Txn"
+    })
+    segments.index.name = "customer_segment"
+    return dict(audit, segment_summary=segments)
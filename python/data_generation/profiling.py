@@ -0,0 +1,38 @@
+"""
+Per-phase wall-clock timing for the generation scripts.
+"""
+
+import time
+from contextlib import contextmanager
+
+
+class PhaseTimer:
+    """Accumulates wall time per named phase, in first-seen order."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.timings = {}
+
+    @contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - t0
+
+    def add(self, timings):
+        """Fold in timings collected elsewhere (e.g. by a worker process)."""
+        for name, seconds in timings.items():
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def report(self):
+        if not self.enabled or not self.timings:
+            return
+        total = sum(self.timings.values())
+        width = max(len(name) for name in self.timings)
+        print("--- PHASE PROFILE ---")
+        for name, seconds in self.timings.items():
+            share = seconds / total * 100 if total else 0.0
+            print(f"{name:<{width}}  {seconds:8.2f}s  {share:5.1f}%")
+        print(f"{'total':<{width}}  {total:8.2f}s")
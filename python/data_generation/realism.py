@@ -0,0 +1,546 @@
+"""
+Realism adjustments applied on top of the base tables: extra cards,
+dormancy, seasonality/trend/spikes, weekend and online uplifts, category mix,
+fraud recalibration, delinquency state machine, missingness and redemption mix.
+
+Each adjustment is a step in REALISM_STEPS that declares the tables it reads
+and writes and takes its parameters from REALISM_PARAMS, so the steps can be
+cached one by one (see stage_cache).
+"""
+
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from . import amount_rules, currency, delinquency, merchants, reference_data, schema
+from .amount_rules import apply_multipliers
+from .currency import add_usd_columns
+from .delinquency import (
+    BAND_ROLL_MULTIPLIERS, ROLL_MATRICES, SEGMENT_ROLL_MULTIPLIERS, UTILIZATION_BANDS, payment_grid,
+    roll_rates, run_statuses, transition_matrices, utilization_bands
+)
+from .merchants import merchants_per_country, recategorize_merchants
+from .profiling import PhaseTimer
+from .schema import DELINQUENCY_STATUSES, apply_schema, categorical, categories
+from .stage_cache import CachedTable, code_fingerprint, fingerprint, frame_fingerprint, resolve
+
+DEFAULT_SEED = 42
+
+REALISM_INPUTS = ["customers", "cards", "transactions", "payments", "fraud_flags", "reward_redemptions"]
+# Tables the realism stage rewrites (customers pass through unchanged)
+REALISM_OUTPUTS = ["cards", "transactions", "payments", "fraud_flags", "reward_redemptions"]
+
+# Seasonality, growth trend, spikes, weekend and online uplifts (steps 3-4).
+# Columns: month, months_since_start, weekday, spike, or any categorical /
+# boolean transactions column (e.g. merchant_country for a holiday calendar).
+AMOUNT_RULES = [
+    {"column": "month", "in": [11, 12], "factor": 1.35},
+    {"column": "month", "in": [2, 6], "factor": 0.75},
+    {"column": "months_since_start", "per_unit": 0.01},
+    {"column": "spike", "in": [True], "factor": "spike_factor"},
+    {"column": "weekday", "in": [5, 6], "factor": 1.2},
+    {"column": "merchant_type", "in": ["Online"], "factor": 1.25}
+]
+
+
+def card_month_keys(card_ids, dates):
+    """Pack card_id and the month of each date into one int64 key per row."""
+    months = dates.to_numpy(dtype="datetime64[M]").view(np.int64)
+    return (card_ids.to_numpy(dtype=np.int64) << 32) | (months & 0xFFFFFFFF)
+
+
+def _dense_lookup(keys, values, size, fill=-1):
+    table = np.full(size, fill, dtype=np.int64)
+    table[keys] = values
+    return table
+
+
+def card_segment_codes(cards, customers, card_ids):
+    """
+    customer_segment code for every entry of card_ids (-1 if the card or its
+    customer is unknown), via arrays indexed by card_id and customer_id.
+    """
+    customer_ids = customers["customer_id"].to_numpy()
+    card_keys = cards["card_id"].to_numpy()
+    card_customers = cards["customer_id"].to_numpy()
+    card_ids = card_ids.to_numpy()
+
+    seg_by_customer = _dense_lookup(
+        customer_ids,
+        categorical(customers["customer_segment"], "customer_segment").codes,
+        max(customer_ids.max(initial=0), card_customers.max(initial=0)) + 1
+    )
+    seg_by_card = _dense_lookup(
+        card_keys,
+        seg_by_customer[card_customers],
+        max(card_keys.max(initial=0), card_ids.max(initial=0)) + 1
+    )
+    return seg_by_card[card_ids]
+
+
+def amount_rule_dims(transactions, rules, flags):
+    """
+    (codes, columns) dims for the columns `rules` use; see amount_rules.factor_table.
+
+    `flags` holds extra per-row boolean arrays (e.g. the spike mask).
+    """
+    needed = list(dict.fromkeys(rule["column"] for rule in rules))
+    dims = []
+
+    calendar = [c for c in ["month", "months_since_start"] if c in needed]
+    if calendar or "weekday" in needed:
+        dates = transactions["transaction_date"].to_numpy(dtype="datetime64[D]")
+        missing = np.isnat(dates)
+
+    if calendar:
+        # Month ordinals counted from January of the first year
+        months = dates.astype("datetime64[M]").view(np.int64)
+        valid = months[~missing]
+        first_january = valid.min() // 12 * 12 if len(valid) else 0
+        codes = np.where(missing, -1, months - first_january)
+        span = np.arange(codes.max(initial=0) + 1)
+        dims.append((codes, {"month": span % 12 + 1, "months_since_start": span + 1}))
+
+    if "weekday" in needed:
+        # 1970-01-01 was a Thursday (weekday 3)
+        codes = np.where(missing, -1, (dates.view(np.int64) + 3) % 7)
+        dims.append((codes, {"weekday": np.arange(7)}))
+
+    for col in needed:
+        if col in ["month", "months_since_start", "weekday"]:
+            continue
+        values = flags[col] if col in flags else transactions[col]
+        if isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+            dims.append((values.cat.codes.to_numpy(), {col: np.asarray(values.cat.categories)}))
+        elif np.asarray(values).dtype == bool:
+            dims.append((np.asarray(values, dtype=np.int8), {col: np.array([False, True])}))
+        else:
+            raise ValueError(f"Amount rule column '{col}' must be categorical or boolean")
+
+    return dims
+
+
+def _extra_cards(tables, params, ctx):
+    # =====================================================
+    # 1. MULTIPLE CARDS PER CUSTOMER
+    # =====================================================
+    log = ctx["log"]
+    cards = tables["cards"]
+    log(f"Step 1: Creating additional cards ({params['frac']:.0%})")
+
+    extra_cards = cards.sample(frac=params["frac"], random_state=ctx["rs"]).copy()
+    extra_cards["card_id"] = range(cards["card_id"].max() + 1,
+                                   cards["card_id"].max() + 1 + len(extra_cards))
+    cards = pd.concat([cards, extra_cards], ignore_index=True)
+
+    log(f"Cards after expansion: {len(cards)}")
+    return {"cards": cards}
+
+
+def _dormancy(tables, params, ctx):
+    # =====================================================
+    # 2 & 10. REAL DORMANCY
+    # =====================================================
+    log = ctx["log"]
+    transactions = tables["transactions"].copy()
+    transactions["transaction_date"] = pd.to_datetime(transactions["transaction_date"], errors="coerce")
+    log(f"Step 2: Creating realistic dormant card-months (~{params['frac']:.0%})")
+
+    # Anti-join on a packed (card_id, month) key: a boolean mask, no merged copy.
+    # Keys keep first-seen order so the sample matches drop_duplicates().sample().
+    card_month = card_month_keys(transactions["card_id"], transactions["transaction_date"])
+    card_months = pd.Series(pd.unique(card_month))
+    dormant_keys = card_months.sample(frac=params["frac"], random_state=ctx["seed"]).to_numpy()
+
+    before_txn = len(transactions)
+
+    transactions = transactions[~np.isin(card_month, dormant_keys)].reset_index(drop=True)
+    del card_month
+
+    log(f"Transactions removed (dormancy): {before_txn - len(transactions)}")
+    log(f"Transactions remaining: {len(transactions)}")
+    return {"transactions": transactions}
+
+
+def _amounts(tables, params, ctx):
+    # =====================================================
+    # 3–4. SEASONALITY, TREND, SPIKES, WEEKEND, ONLINE
+    # =====================================================
+    log, rs = ctx["log"], ctx["rs"]
+    transactions = tables["transactions"]
+    log("Step 3: Applying seasonality, growth trend, and spikes")
+
+    spike_mask = rs.rand(len(transactions)) < params["spike_rate"]
+    spike_factor = rs.uniform(*params["spike_factor"])
+
+    log("Step 4: Weekend and online adjustments")
+
+    # Steps 3 and 4 run as one fused pass over AMOUNT_RULES, in float64
+    amount = transactions["amount"].to_numpy(dtype=np.float64)
+    apply_multipliers(
+        amount,
+        params["rules"],
+        amount_rule_dims(transactions, params["rules"], {"spike": spike_mask}),
+        params={"spike_factor": spike_factor},
+        backend=ctx["amount_backend"]
+    )
+    transactions["amount"] = amount.astype(np.float32)
+    return {"transactions": transactions}
+
+
+def _categories(tables, params, ctx):
+    transactions = tables["transactions"]
+    ctx["log"]("Step 5: Category distribution")
+
+    # Drawing codes consumes the generator exactly like drawing the labels
+    weights = params["weights"]
+    transactions["merchant_category"] = categorical(pd.Categorical.from_codes(
+        ctx["rs"].choice(len(weights), size=len(transactions), p=list(weights.values())),
+        categories=list(weights)
+    ), "merchant_category")
+
+    # Keep each merchant_id in its (now reassigned) category, at the same popularity rank;
+    # the merchant layout follows the size of the portfolio it was generated for
+    if "merchant_id" in transactions:
+        transactions["merchant_id"] = recategorize_merchants(
+            transactions["merchant_id"].to_numpy(), transactions["merchant_city"].cat.codes,
+            transactions["merchant_category"].cat.codes, merchants_per_country(len(tables["customers"]))
+        ).astype(np.int32)
+    return {"transactions": transactions}
+
+
+def _fraud(tables, params, ctx):
+    # =====================================================
+    # FRAUD
+    # =====================================================
+    log = ctx["log"]
+    transactions = tables["transactions"]
+    log("Step 6: Fraud calibration")
+
+    is_online = (transactions["merchant_type"] == "Online").to_numpy()
+    prob = np.full(len(transactions), params["base_prob"])
+
+    prob += np.where(is_online & transactions["is_international"].to_numpy(), params["online_international"], 0)
+
+    segment = card_segment_codes(tables["cards"], tables["customers"], transactions["card_id"])
+    low_value = categories()["customer_segment"].index("Low Value")
+    prob += np.where(segment == low_value, params["low_value"], 0)
+    del segment
+
+    is_fraud = ctx["rs"].rand(len(transactions)) < prob
+
+    fraud = pd.DataFrame({
+        "transaction_id": transactions["transaction_id"].to_numpy()[is_fraud],
+        "fraud_id": np.arange(1, is_fraud.sum() + 1),
+        "fraud_flag": 1,
+        "fraud_type": categorical(
+            np.where(is_online[is_fraud], "Card Not Present", "Skimming"), "fraud_type"
+        )
+    })
+
+    log(f"Fraud records: {len(fraud)}")
+    return {"fraud_flags": fraud}
+
+
+def _delinquency(tables, params, ctx):
+    # =====================================================
+    # 8. DELINQUENCY
+    # =====================================================
+    payments = tables["payments"].copy()
+    payments["payment_date"] = pd.to_datetime(payments["payment_date"], errors="coerce")
+    log = ctx["log"]
+    log("Step 7: Delinquency status")
+
+    # Payments as a (cards x months) grid; rows without a card or date are not part of it
+    card_pos, month_pos, observed, card_ids = payment_grid(payments["card_id"], payments["payment_date"])
+    rows = (card_pos[observed], month_pos[observed])
+    shape = (len(card_ids), month_pos.max(initial=-1) + 1)
+
+    in_grid = np.zeros(shape, dtype=bool)
+    in_grid[rows] = True
+    missed = np.zeros(shape, dtype=bool)
+    missed[rows] = payments["missed_streak"].to_numpy(np.int64, na_value=0)[observed] > 0
+    bands = np.zeros(shape, dtype=np.int64)
+    bands[rows] = utilization_bands(
+        payments["utilization"].to_numpy(np.float32, na_value=np.nan)[observed], params["utilization_bands"]
+    )
+
+    segments = categories()["customer_segment"]
+    segment = card_segment_codes(tables["cards"], tables["customers"], card_ids)
+    matrices = transition_matrices(params["roll_matrices"], segments, params["segment_multipliers"],
+                                   params["band_multipliers"])
+
+    # Its own generator, so the shared RandomState stream of the other steps is unaffected
+    statuses = run_statuses(np.where(segment < 0, len(segments), segment), bands, missed, in_grid,
+                            matrices, np.random.default_rng(ctx["seed"]))
+
+    codes = np.full(len(payments), -1, dtype=np.int8)
+    codes[observed] = statuses[rows]
+    payments["delinquency_status"] = pd.Categorical.from_codes(codes, categories=DELINQUENCY_STATUSES)
+
+    rates = roll_rates(statuses, in_grid)
+    log("Roll rates (% of card-months, from -> to):\n" + rates.pivot(
+        index="from_status", columns="to_status", values="roll_rate_percent"
+    ).fillna(0).to_string())
+    return {"payments": payments}
+
+
+def _missingness(tables, params, ctx):
+    # =====================================================
+    # 9. MISSINGNESS
+    # =====================================================
+    transactions = tables["transactions"]
+    ctx["log"](f"Step 8: Injecting missing values (~{params['rate']:.1%})")
+
+    for col in params["columns"]:
+        mask = ctx["rs"].rand(len(transactions)) < params["rate"]
+        transactions.loc[mask, col] = np.nan
+    return {"transactions": transactions}
+
+
+def _redemptions(tables, params, ctx):
+    # =====================================================
+    # 13. REDEMPTIONS
+    # =====================================================
+    redemptions = tables["reward_redemptions"].copy()
+    ctx["log"]("Step 9: Redemption behavior")
+
+    weights = params["weights"]
+    redemptions["redemption_type"] = categorical(pd.Categorical.from_codes(
+        ctx["rs"].choice(len(weights), size=len(redemptions), p=list(weights.values())),
+        categories=list(weights)
+    ), "redemption_type")
+
+    for redemption_type, factor in params["value_factors"].items():
+        redemptions.loc[redemptions["redemption_type"] == redemption_type, "redemption_value"] *= factor
+    return {"reward_redemptions": redemptions}
+
+
+def _finalize_cards(tables, params, ctx):
+    # =====================================================
+    # FIX INTEGER COLUMNS
+    # =====================================================
+    # The finalize steps are split per output table, so each final table is
+    # versioned only by the tables it is built from
+    ctx["log"]("Fixing integer columns for PostgreSQL")
+
+    cards = tables["cards"].dropna(subset=["card_id", "customer_id"])
+    # USD columns follow the extra cards
+    add_usd_columns({"customers": tables["customers"], "cards": cards})
+    apply_schema(cards)
+    return {"cards": cards}
+
+
+def _finalize_transactions(tables, params, ctx):
+    log = ctx["log"]
+    transactions = tables["transactions"]
+
+    log(f"Missing transaction_id: {transactions['transaction_id'].isna().sum()}")
+    log(f"Missing card_id: {transactions['card_id'].isna().sum()}")
+
+    transactions = transactions.dropna(subset=["transaction_id", "card_id"])
+    # USD columns follow the adjusted amounts and missing values
+    add_usd_columns({"transactions": transactions})
+    apply_schema(transactions)
+
+    log(f"Transactions after ID cleanup: {len(transactions)}")
+
+    # =====================================================
+    # Force exacting CSV schema for Postgres COPY
+    # (prevents 'extra data after last expected column')
+    # =====================================================
+    log("Forcing Postgres COPY schema for transactions")
+
+    # Keep ONLY these columns and in this order
+    return {"transactions": transactions[params["columns"]].copy()}
+
+
+def _finalize_payments(tables, params, ctx):
+    payments = tables["payments"].dropna(subset=["card_id"])
+    apply_schema(payments)
+    return {"payments": payments}
+
+
+def _finalize_fraud(tables, params, ctx):
+    ctx["log"]("FK-safe fraud export")
+
+    # FK-safe fraud (only transaction_ids that exist in final transactions)
+    fraud = tables["fraud_flags"].dropna(subset=["transaction_id"])
+    apply_schema(fraud)
+    fraud = fraud[fraud["transaction_id"].isin(tables["transactions"]["transaction_id"])].copy()
+    fraud = fraud.reset_index(drop=True)
+    fraud["fraud_id"] = np.arange(1, len(fraud) + 1)
+    return {"fraud_flags": fraud[["fraud_id", "transaction_id", "fraud_flag", "fraud_type"]]}
+
+
+def _finalize_redemptions(tables, params, ctx):
+    redemptions = tables["reward_redemptions"].dropna(subset=["card_id"])
+    # Redemptions take their card's home currency; the copy keeps the final
+    # cards (another step's output) untouched
+    add_usd_columns({
+        "customers": tables["customers"],
+        "cards": tables["cards"].copy(),
+        "reward_redemptions": redemptions
+    })
+    apply_schema(redemptions)
+    return {"reward_redemptions": redemptions}
+
+
+# Parameters of each step. They are part of the step's cache key, so changing
+# one re-runs that step and whatever depends on it.
+REALISM_PARAMS = {
+    "extra_cards": {"frac": 0.20},
+    "dormancy": {"frac": 0.08},
+    "amounts": {"rules": AMOUNT_RULES, "spike_rate": 0.02, "spike_factor": [2, 4]},
+    "categories": {
+        "weights": {
+            "Groceries": 0.25,
+            "Fuel": 0.15,
+            "Shopping": 0.20,
+            "Dining": 0.15,
+            "Travel": 0.10,
+            "Electronics": 0.15
+        }
+    },
+    "fraud": {"base_prob": 0.002, "online_international": 0.005, "low_value": 0.003},
+    "delinquency": {
+        "roll_matrices": ROLL_MATRICES,
+        "segment_multipliers": SEGMENT_ROLL_MULTIPLIERS,
+        "utilization_bands": UTILIZATION_BANDS,
+        "band_multipliers": BAND_ROLL_MULTIPLIERS
+    },
+    "missingness": {"rate": 0.005, "columns": ["amount", "transaction_date"]},
+    "redemptions": {
+        "weights": {
+            "Cashback": 0.55,
+            "Gift Cards": 0.30,
+            "Flights": 0.15
+        },
+        "value_factors": {"Flights": 1.8, "Cashback": 0.8}
+    },
+    "finalize_cards": {},
+    "finalize_transactions": {
+        "columns": [
+            "transaction_id", "card_id", "merchant_id", "transaction_date", "merchant_category",
+            "merchant_type", "currency", "amount", "amount_usd", "transaction_type",
+            "merchant_city", "merchant_country", "location", "is_international"
+        ]
+    },
+    "finalize_payments": {},
+    "finalize_fraud": {},
+    "finalize_redemptions": {}
+}
+
+# Steps in order: the tables each reads and writes, whether it draws from
+# the shared RandomState (whose state then threads through the steps that
+# do), and code besides its own function that its output depends on.
+REALISM_STEPS = [
+    {"name": "extra_cards", "func": _extra_cards, "reads": ["cards"], "writes": ["cards"], "rng": True},
+    {"name": "dormancy", "func": _dormancy, "reads": ["transactions"], "writes": ["transactions"],
+     "rng": False, "uses": [card_month_keys]},
+    {"name": "amounts", "func": _amounts, "reads": ["transactions"], "writes": ["transactions"],
+     "rng": True, "uses": [amount_rule_dims, amount_rules]},
+    {"name": "categories", "func": _categories, "reads": ["customers", "transactions"],
+     "writes": ["transactions"], "rng": True, "uses": [merchants]},
+    {"name": "fraud", "func": _fraud, "reads": ["customers", "cards", "transactions"], "writes": ["fraud_flags"],
+     "rng": True, "uses": [card_segment_codes, _dense_lookup]},
+    {"name": "delinquency", "func": _delinquency, "reads": ["customers", "cards", "payments"],
+     "writes": ["payments"], "rng": False, "uses": [delinquency, card_segment_codes, _dense_lookup]},
+    {"name": "missingness", "func": _missingness, "reads": ["transactions"], "writes": ["transactions"],
+     "rng": True},
+    {"name": "redemptions", "func": _redemptions, "reads": ["reward_redemptions"],
+     "writes": ["reward_redemptions"], "rng": True},
+    {"name": "finalize_cards", "func": _finalize_cards, "reads": ["customers", "cards"], "writes": ["cards"],
+     "rng": False, "uses": [currency]},
+    {"name": "finalize_transactions", "func": _finalize_transactions, "reads": ["transactions"],
+     "writes": ["transactions"], "rng": False, "uses": [currency]},
+    {"name": "finalize_payments", "func": _finalize_payments, "reads": ["payments"], "writes": ["payments"],
+     "rng": False},
+    {"name": "finalize_fraud", "func": _finalize_fraud, "reads": ["fraud_flags", "transactions"],
+     "writes": ["fraud_flags"], "rng": False},
+    {"name": "finalize_redemptions", "func": _finalize_redemptions,
+     "reads": ["customers", "cards", "reward_redemptions"], "writes": ["reward_redemptions"],
+     "rng": False, "uses": [currency]}
+]
+
+
+def merge_params(overrides=None):
+    """REALISM_PARAMS with each step's overrides merged over that step's defaults."""
+    overrides = overrides or {}
+    unknown = sorted(set(overrides) - set(REALISM_PARAMS))
+    if unknown:
+        raise ValueError(f"Unknown realism step(s) in params: {', '.join(unknown)}")
+    return {name: {**defaults, **overrides.get(name, {})} for name, defaults in REALISM_PARAMS.items()}
+
+
+def step_key(step, params, seed, versions, rng_version):
+    """Cache key of one realism step from its code, parameters and input versions."""
+    code = code_fingerprint(step["func"], schema, reference_data, *step.get("uses", []))
+    return fingerprint(step["name"], code, params, seed, [versions[t] for t in step["reads"]],
+                       rng_version if step["rng"] else None)
+
+
+def adjust_realism(tables, seed=DEFAULT_SEED, log=print, amount_backend="auto", params=None,
+                   cache=None, input_keys=None, versions=None, timer=None, lazy=False):
+    """
+    Apply every realism step to the base tables and return the adjusted set.
+
+    `tables` holds customers, cards, transactions, payments, fraud_flags and
+    reward_redemptions; customers (and any other table passed in) are
+    returned unchanged. `amount_backend` picks how AMOUNT_RULES are applied
+    (see amount_rules.BACKENDS). `params` overrides REALISM_PARAMS per step:
+    {"redemptions": {"weights": {...}}} replaces the redemption weights and
+    keeps that step's other defaults.
+
+    With a StageCache, each step whose key is already cached is skipped and
+    its outputs are read from disk only if needed. `input_keys` names the
+    version of each input table (e.g. derived from the generate stage key or
+    the input files); without it the inputs are hashed. Tables may be
+    CachedTable placeholders, which are loaded only by steps that run. Pass a
+    dict as `versions` to receive the version key of every returned table.
+    With lazy=True, cached tables come back as CachedTable placeholders, so a
+    caller that only writes changed versions never reads the others.
+    A PhaseTimer passed as `timer` gets one phase per step that runs.
+    """
+    params = merge_params(params)
+    rs = np.random.RandomState(seed)
+    ctx = {"rs": rs, "seed": seed, "log": log, "amount_backend": amount_backend}
+    tables = dict(tables)
+    timer = timer or PhaseTimer(enabled=False)
+
+    if cache is None:
+        for step in REALISM_STEPS:
+            with timer.phase(step["name"]):
+                tables.update(step["func"](tables, params[step["name"]], ctx))
+        return tables
+
+    input_keys = input_keys or {}
+    versions = versions if versions is not None else {}
+    versions.update({name: input_keys.get(name) for name in tables})
+    versions.update({
+        name: input_keys.get(name) or frame_fingerprint(resolve(tables, [name])[name])
+        for name in REALISM_INPUTS
+    })
+    rng_version = fingerprint("rng", seed)
+
+    for step in REALISM_STEPS:
+        key = step_key(step, params[step["name"]], seed, versions, rng_version)
+        extras = cache.lookup(key)
+        if extras is None:
+            resolve(tables, step["reads"])
+            with timer.phase(step["name"]):
+                written = step["func"](tables, params[step["name"]], ctx)
+            cache.store(key, written, {"rng": rs.get_state()} if step["rng"] else None)
+        else:
+            log(f"Step '{step['name']}' cached")
+            written = {name: CachedTable(partial(cache.load, key, name)) for name in step["writes"]}
+            if step["rng"]:
+                rs.set_state(extras["rng"])
+
+        tables.update(written)
+        versions.update({name: fingerprint(key, name) for name in step["writes"]})
+        if step["rng"]:
+            rng_version = fingerprint(key, "rng")
+
+    return tables if lazy else resolve(tables, list(tables))
@@ -0,0 +1,61 @@
+"""
+Fixed value lists shared by the generator and the table schema.
+
+Geography, currencies and the customer / card categories live here, apart
+from the generation logic in base_data, so that schema, currency and
+merchants can import them at module level: base_data imports those modules,
+so they cannot import it back.
+"""
+
+# =============================
+# GEOGRAPHY
+# =============================
+
+cities = {
+    "UAE": ["Dubai", "Abu Dhabi"],
+    "Qatar": ["Doha"],
+    "UK": ["London"],
+    "Germany": ["Berlin"],
+    "France": ["Paris"],
+    "India": ["Mumbai"]
+}
+
+country_currency = {
+    "UAE": "AED",
+    "Qatar": "QAR",
+    "UK": "GBP",
+    "Germany": "EUR",
+    "France": "EUR",
+    "India": "INR"
+}
+
+currency_conversion = {
+    "USD": 1.0,
+    "AED": 0.27,
+    "QAR": 0.27,
+    "GBP": 1.25,
+    "EUR": 1.10,
+    "INR": 0.012
+}
+
+# =============================
+# CUSTOMER AND CARD CATEGORIES
+# =============================
+
+segments = ["Low Value", "Mass Market", "Emerging Affluent"]
+
+income_bands = {
+    "Low Value": ["Low"],
+    "Mass Market": ["Medium"],
+    "Emerging Affluent": ["High"]
+}
+
+occupations = ["Salaried", "Self-employed", "Business", "Student"]
+
+card_types = {
+    "Low Value": ["Basic"],
+    "Mass Market": ["Basic", "Gold"],
+    "Emerging Affluent": ["Gold", "Platinum"]
+}
+
+reward_programs = ["Cashback", "Travel", "Points"]
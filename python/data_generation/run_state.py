@@ -0,0 +1,78 @@
+"""
+End-of-run generator state, so a later run can extend the horizon.
+
+A run leaves <out>/_state/ behind:
+
+state.json  run config (customers, seed, shards, dates), the ID high-water
+            mark of every table and each shard's RNG state
+state.npz   each shard's closing balance and missed_streak per card
+
+Customers and cards are not stored: they are rebuilt from (seed, shards),
+which is cheap next to simulating even one month of transactions.
+"""
+
+import json
+import os
+
+import numpy as np
+
+STATE_DIR = "_state"
+STATE_JSON = "state.json"
+STATE_ARRAYS = "state.npz"
+
+
+def state_path(out_dir):
+    return os.path.join(out_dir, STATE_DIR)
+
+
+def make_state(num_customers, seed, shards, start_date, end_date, next_ids, shard_states):
+    """
+    State of a finished run. next_ids is {table: rows so far} (IDs continue
+    after it); shard_states are the per-shard dicts from generate_shard.
+    """
+    return {
+        "customers": int(num_customers),
+        "seed": int(seed),
+        "shards": int(shards),
+        "start_date": str(start_date)[:10],
+        "end_date": str(end_date)[:10],
+        "next_ids": {table: int(n) for table, n in next_ids.items()},
+        "shard_states": list(shard_states)
+    }
+
+
+def save_state(out_dir, state):
+    path = state_path(out_dir)
+    os.makedirs(path, exist_ok=True)
+    if os.path.exists(os.path.join(path, STATE_JSON)):
+        os.remove(os.path.join(path, STATE_JSON))
+
+    arrays = {}
+    shard_meta = []
+    for i, shard in enumerate(state["shard_states"]):
+        arrays[f"balance_{i}"] = shard["balance"]
+        arrays[f"streak_{i}"] = shard["streak"].astype(np.int32)
+        shard_meta.append({"last_month": shard["last_month"], "rng": shard["rng"]})
+    np.savez_compressed(os.path.join(path, STATE_ARRAYS), **arrays)
+
+    # JSON goes last: it is what marks the state as complete
+    meta = {k: v for k, v in state.items() if k != "shard_states"}
+    meta["shard_states"] = shard_meta
+    with open(os.path.join(path, STATE_JSON), "w") as f:
+        json.dump(meta, f, indent=2)
+    return path
+
+
+def load_state(out_dir):
+    path = state_path(out_dir)
+    json_path = os.path.join(path, STATE_JSON)
+    if not os.path.exists(json_path):
+        raise FileNotFoundError(f"No generator state in {path}; run a full generation into {out_dir} first")
+
+    with open(json_path) as f:
+        state = json.load(f)
+    with np.load(os.path.join(path, STATE_ARRAYS)) as arrays:
+        for i, shard in enumerate(state["shard_states"]):
+            shard["balance"] = arrays[f"balance_{i}"]
+            shard["streak"] = arrays[f"streak_{i}"].astype(np.int64)
+    return state
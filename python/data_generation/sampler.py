@@ -0,0 +1,113 @@
+"""
+Alias-method samplers for weighted categorical draws.
+
+Walker's alias method turns k weights into two length-k tables (Vose's
+construction, built once per weight vector). A draw then costs one uniform
+and two table lookups, however large k is: the uniform's integer part picks
+a column and its fractional part decides between the column's own outcome
+and its alias. Bulk draws are a few whole-array operations and can be
+written into a preallocated array.
+
+GroupedAliasSampler packs the tables of many weight vectors into shared
+arrays, so one call draws for a block of rows that each name their own
+group (e.g. a merchant within every transaction's city and category).
+"""
+
+import numpy as np
+
+
+def alias_tables(weights):
+    """(prob, alias) arrays of Vose's alias construction for non-negative weights."""
+    weights = np.asarray(weights, dtype=np.float64)
+    total = weights.sum()
+    if weights.ndim != 1 or len(weights) == 0 or (weights < 0).any() or not total > 0:
+        raise ValueError("weights must be a non-empty 1-D array of non-negative values with a positive sum")
+
+    k = len(weights)
+    scaled = weights * (k / total)
+    prob = np.ones(k)
+    alias = np.arange(k, dtype=np.int64)
+
+    small = np.flatnonzero(scaled < 1.0).tolist()
+    large = np.flatnonzero(scaled >= 1.0).tolist()
+    # Plain lists: the pairing loop is sequential, and list access is far
+    # cheaper than numpy scalar indexing
+    remaining = scaled.tolist()
+    prob_list = prob.tolist()
+    alias_list = alias.tolist()
+    while small and large:
+        s = small.pop()
+        l = large[-1]
+        prob_list[s] = remaining[s]
+        alias_list[s] = l
+        remaining[l] -= 1.0 - remaining[s]
+        if remaining[l] < 1.0:
+            small.append(large.pop())
+    # Whatever is left is 1 up to rounding and keeps prob 1 / its own index
+
+    return np.array(prob_list), np.array(alias_list, dtype=np.int64)
+
+
+class AliasSampler:
+    """O(1)-per-draw sampler of indices 0..k-1 with probability proportional to `weights`."""
+
+    def __init__(self, weights):
+        self.prob, self.alias = alias_tables(weights)
+
+    def __len__(self):
+        return len(self.prob)
+
+    def sample(self, rng, size=None, out=None):
+        """
+        Draw `size` indices (or fill the integer array `out`) using `rng`.
+
+        `rng` is a numpy Generator or RandomState; one uniform is consumed
+        per draw.
+        """
+        if out is None:
+            out = np.empty(size if size is not None else (), dtype=np.int64)
+        k = len(self.prob)
+        u = rng.random(out.shape)
+        u *= k
+        np.copyto(out, u, casting="unsafe")
+        # u * k can round up to k itself
+        np.minimum(out, k - 1, out=out)
+        u -= out
+        np.copyto(out, self.alias[out], where=u >= self.prob[out])
+        return out
+
+
+class GroupedAliasSampler:
+    """
+    One alias table per group in shared arrays; each draw names its group.
+
+    Groups given the same AliasSampler object share one copy of its tables.
+    Draws are indices within the drawing group.
+    """
+
+    def __init__(self, samplers):
+        tables = {}
+        for sampler in samplers:
+            tables.setdefault(id(sampler), sampler)
+        starts = np.cumsum([0] + [len(s) for s in tables.values()])
+        start_of = dict(zip(tables, starts[:-1].tolist()))
+
+        self.prob = np.concatenate([s.prob for s in tables.values()])
+        self.alias = np.concatenate([s.alias for s in tables.values()])
+        self.offsets = np.array([start_of[id(s)] for s in samplers], dtype=np.int64)
+        self.sizes = np.array([len(s) for s in samplers], dtype=np.int64)
+
+    def sample(self, groups, rng, out=None):
+        """Draw one index within groups[i] for every i (one uniform each)."""
+        groups = np.asarray(groups)
+        if out is None:
+            out = np.empty(groups.shape, dtype=np.int64)
+        sizes = self.sizes[groups]
+        u = rng.random(groups.shape)
+        u *= sizes
+        np.copyto(out, u, casting="unsafe")
+        np.minimum(out, sizes - 1, out=out)
+        u -= out
+        column = self.offsets[groups] + out
+        np.copyto(out, self.alias[column], where=u >= self.prob[column])
+        return out
@@ -0,0 +1,131 @@
+"""
+Central dtype schema for every generated table.
+
+Columns are typed by name (a name means the same thing in every table):
+
+- enum-like text columns are categoricals with fixed category lists
+- customer_id / card_id / merchant_id are int32, the other IDs int64; an ID column that
+  holds missing values becomes nullable Int32 / Int64 instead of float
+- money columns (and ratios such as utilization) are float32, small counters narrow ints
+- dates are datetime64
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from .payment_engine import payment_methods, redemption_types
+from .reference_data import (
+    card_types, cities, country_currency, income_bands, occupations, reward_programs, segments
+)
+from .transaction_engine import merchant_categories
+
+ID_DTYPES = {
+    "customer_id": "int32",
+    "card_id": "int32",
+    "merchant_id": "int32",
+    "transaction_id": "int64",
+    "payment_id": "int64",
+    "fraud_id": "int64",
+    "redemption_id": "int64"
+}
+
+NUMERIC_DTYPES = {
+    "age": "int16",
+    "credit_score": "int16",
+    "credit_limit": "int32",
+    "annual_fee": "int16",
+    "amount": "float32",
+    "amount_usd": "float32",
+    "credit_limit_usd": "float32",
+    "annual_fee_usd": "float32",
+    "payment_amount": "float32",
+    "redemption_value": "float32",
+    "redemption_value_usd": "float32",
+    "points_used": "int32",
+    "popularity_rank": "int32",
+    "missed_streak": "int16",
+    "utilization": "float32",
+    "fraud_flag": "int8",
+    "is_international": "bool"
+}
+
+DATE_COLUMNS = ["join_date", "card_issue_date", "transaction_date", "payment_date", "redemption_date"]
+
+DELINQUENCY_STATUSES = ["Current", "30DPD", "60DPD", "90DPD", "Charge-off"]
+
+
+@lru_cache(maxsize=None)
+def categories():
+    """Fixed category list per enum column, built from the generator's own constants."""
+    city_names = [city for country in cities for city in cities[country]]
+
+    return {
+        "customer_segment": segments,
+        "income_band": sorted({band for bands in income_bands.values() for band in bands}),
+        "occupation": occupations,
+        "city": city_names,
+        "country": list(cities),
+        "card_type": sorted({t for types in card_types.values() for t in types}),
+        "reward_program_type": reward_programs,
+        "merchant_category": merchant_categories,
+        "merchant_type": ["Online", "Offline"],
+        "currency": sorted(set(country_currency.values()) | {"USD"}),
+        "transaction_type": ["Purchase", "Cash Advance"],
+        "merchant_city": city_names,
+        "merchant_country": list(cities),
+        "location": city_names,
+        "payment_method": payment_methods,
+        "delinquency_status": DELINQUENCY_STATUSES,
+        "redemption_type": redemption_types,
+        "fraud_type": ["Card Not Present", "Skimming"]
+    }
+
+
+def categorical(values, col):
+    """Build the schema categorical for `col` from raw values or another categorical."""
+    cats = categories()[col]
+    if isinstance(values, pd.Series):
+        values = values.array
+    if isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+        if list(values.categories) == cats:
+            return values
+        result = values.set_categories(cats)
+        unknown = (values.codes != -1) & (result.codes == -1)
+    else:
+        result = pd.Categorical(values, categories=cats)
+        unknown = (result.codes == -1) & pd.notna(values)
+
+    if unknown.any():
+        bad = sorted(set(np.asarray(values, dtype=object)[unknown]))[:5]
+        raise ValueError(f"Column {col} has values outside its categories: {bad}")
+    return result
+
+
+def apply_schema(df):
+    """Cast every known column of df to its schema dtype (in place) and return df."""
+    cats = categories()
+
+    for col in df.columns:
+        series = df[col]
+
+        if col in cats:
+            df[col] = categorical(series, col)
+
+        elif col in ID_DTYPES:
+            dtype = ID_DTYPES[col]
+            if series.isna().any():
+                dtype = dtype.capitalize()
+            if series.dtype != dtype:
+                df[col] = series.astype(dtype)
+
+        elif col in NUMERIC_DTYPES:
+            dtype = NUMERIC_DTYPES[col]
+            if series.dtype != dtype and not (dtype != "float32" and series.isna().any()):
+                df[col] = series.astype(dtype)
+
+        elif col in DATE_COLUMNS and not pd.api.types.is_datetime64_any_dtype(series):
+            df[col] = pd.to_datetime(series, errors="coerce")
+
+    return df
@@ -0,0 +1,145 @@
+"""
+Content-addressed on-disk cache for pipeline stages and realism steps.
+
+A step's key is a hash of what determines its output: its name, the source
+of its function and of the modules it declares, its parameters, and the
+keys of the table versions (and RNG state) it reads. Each output table
+version gets a key derived from the step key, so a change anywhere only
+misses the steps downstream of it. Unchanged steps before it are served
+from disk, and intermediate versions that nothing recomputed reads are
+never loaded.
+
+Entries live under <cache>/<key>/ as one pickle per table plus extras
+(e.g. the RNG state after the step), sealed by a manifest written last.
+Reading an entry refreshes its mtime; after each write the least recently
+used entries are evicted until the cache fits in max_bytes. Entries used
+by the current run are never evicted under it.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import shutil
+
+import pandas as pd
+
+DEFAULT_CACHE_MB = 4096
+MANIFEST = "manifest.json"
+EXTRAS = "extras.pkl"
+
+
+def fingerprint(*parts):
+    """sha256 of JSON-serialisable parts (dict keys sorted, other objects by str)."""
+    text = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def code_fingerprint(*objects):
+    """Hash of the source of functions / modules, so editing them invalidates their entries."""
+    return fingerprint([inspect.getsource(obj) for obj in objects])
+
+
+def frame_fingerprint(df):
+    """Content hash of a DataFrame: row values, column names and dtypes."""
+    digest = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    digest.update(str(list(df.dtypes.items())).encode())
+    return digest.hexdigest()
+
+
+def file_fingerprint(path, block_bytes=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_bytes):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StageCache:
+    """Tables and extras per key under `path`, bounded to max_bytes by LRU eviction."""
+
+    def __init__(self, path, max_bytes=DEFAULT_CACHE_MB * 1024 ** 2):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Keys read or written in this run; their tables may still be loaded lazily
+        self.pinned = set()
+        os.makedirs(path, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.path, key)
+
+    def lookup(self, key):
+        """Extras of a sealed entry (marking it used), or None on a miss."""
+        manifest = os.path.join(self._entry(key), MANIFEST)
+        if not os.path.exists(manifest):
+            self.misses += 1
+            return None
+        os.utime(manifest)
+        self.hits += 1
+        self.pinned.add(key)
+        with open(os.path.join(self._entry(key), EXTRAS), "rb") as f:
+            return pickle.load(f)
+
+    def load(self, key, name):
+        return pd.read_pickle(os.path.join(self._entry(key), f"{name}.pkl"))
+
+    def store(self, key, tables, extras=None):
+        entry = self._entry(key)
+        if os.path.exists(entry):
+            shutil.rmtree(entry)
+        os.makedirs(entry)
+
+        for name, df in tables.items():
+            df.to_pickle(os.path.join(entry, f"{name}.pkl"), protocol=pickle.HIGHEST_PROTOCOL)
+        with open(os.path.join(entry, EXTRAS), "wb") as f:
+            pickle.dump(extras or {}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        # Manifest goes last: an entry without one is incomplete and never read
+        size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+        with open(os.path.join(entry, MANIFEST), "w") as f:
+            json.dump({"tables": list(tables), "bytes": size}, f)
+        self.pinned.add(key)
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits; returns bytes freed."""
+        entries = []
+        for key in os.listdir(self.path):
+            manifest = os.path.join(self._entry(key), MANIFEST)
+            if os.path.exists(manifest):
+                with open(manifest) as f:
+                    size = json.load(f)["bytes"]
+                entries.append((os.path.getmtime(manifest), size, key))
+
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key in self.pinned:
+                continue
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            total -= size
+            freed += size
+        return freed
+
+
+class CachedTable:
+    """Placeholder for a table version held in the cache (or produced by `loader`), read on first use."""
+
+    def __init__(self, loader):
+        self.loader = loader
+
+    def get(self):
+        return self.loader()
+
+
+def resolve(tables, names):
+    """Replace CachedTable placeholders for `names` with the loaded DataFrames, in place."""
+    for name in names:
+        if isinstance(tables[name], CachedTable):
+            tables[name] = tables[name].get()
+    return tables
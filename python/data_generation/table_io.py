@@ -0,0 +1,201 @@
+"""
+Table storage formats shared by all three pipeline scripts.
+
+Frames are cast to the dtype schema in schema.py on the way in and out.
+
+csv      plain text, the format Postgres COPY loads
+parquet  dictionary-encoded categoricals, typed timestamps, compression and
+         one row group per calendar month for dated tables
+feather  Arrow IPC file with the same encoding, one record batch per month
+
+pyarrow is only needed for parquet/feather and is imported on first use.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from .schema import apply_schema
+
+FORMATS = ["csv", "parquet", "feather"]
+EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+DEFAULT_COMPRESSION = "zstd"
+READ_CHUNK_ROWS = 500_000
+
+# Date column each table's row groups are partitioned on
+MONTH_PARTITION_COLUMN = {
+    "transactions": "transaction_date",
+    "payments": "payment_date",
+    "reward_redemptions": "redemption_date"
+}
+
+# Generation order is ID order; month-partitioned files are re-sorted on read
+# so a parquet/feather round trip hands back rows in the order they were made
+ROW_ORDER_COLUMN = {
+    "transactions": "transaction_id",
+    "payments": "payment_id",
+    "reward_redemptions": "redemption_id"
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ImportError("parquet/feather output needs pyarrow: pip install pyarrow") from exc
+    return pyarrow
+
+
+def table_path(directory, name, fmt):
+    return os.path.join(directory, name + EXTENSIONS[fmt])
+
+
+def month_groups(df, name):
+    """Split a dated table into per-month frames (undated rows first)."""
+    date_col = MONTH_PARTITION_COLUMN.get(name)
+    if date_col is None or date_col not in df.columns or df.empty:
+        return [df]
+    # int64 month ordinals: NaT maps to int64 min, so undated rows form one group
+    months = pd.to_datetime(df[date_col]).to_numpy().astype("datetime64[M]").view(np.int64)
+    order = np.argsort(months, kind="stable")
+    sorted_months = months[order]
+    boundaries = np.flatnonzero(sorted_months[1:] != sorted_months[:-1]) + 1
+    return [df.iloc[idx] for idx in np.split(order, boundaries)]
+
+
+def _arrow_table(df, schema=None):
+    pa = _require_pyarrow()
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def csv_frame(df):
+    """
+    float32 money columns widened to float64 and rounded to cents, so CSV
+    holds 35.29 rather than the float32 artefact 35.288002.
+    """
+    money = [col for col in df.columns if df[col].dtype == np.float32]
+    if not money:
+        return df
+    df = df.copy(deep=False)
+    for col in money:
+        df[col] = df[col].astype(np.float64).round(2)
+    return df
+
+
+def write_table(df, directory, name, fmt="csv", compression=DEFAULT_COMPRESSION):
+    path = table_path(directory, name, fmt)
+
+    if fmt == "csv":
+        csv_frame(df).to_csv(path, index=False)
+        return path
+
+    writer = ArrowTableWriter(path, fmt, compression)
+    try:
+        writer.write(name, df)
+    finally:
+        writer.close()
+    return path
+
+
+class ArrowTableWriter:
+    """
+    Appends frames to one parquet or feather file.
+
+    The schema is fixed by the first frame written; each frame is split by
+    month and written as its own row group (parquet) or record batch (feather).
+    """
+
+    def __init__(self, path, fmt, compression=DEFAULT_COMPRESSION):
+        if fmt not in ("parquet", "feather"):
+            raise ValueError(f"Unsupported format: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.compression = compression
+        self._writer = None
+        self._schema = None
+
+    def _open(self, df):
+        pa = _require_pyarrow()
+        self._schema = _arrow_table(df.head(1000)).schema
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(self.path, self._schema, compression=self.compression)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=self.compression)
+            self._writer = pa.ipc.new_file(self.path, self._schema, options=options)
+
+    def write(self, name, df):
+        df = apply_schema(df.copy(deep=False))
+        if self._writer is None:
+            self._open(df)
+        for part in month_groups(df, name):
+            if part.empty:
+                continue
+            table = _arrow_table(part, self._schema)
+            if self.fmt == "parquet":
+                self._writer.write_table(table, row_group_size=len(part))
+            else:
+                self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def iter_table(directory, name, fmt="csv", chunk_rows=READ_CHUNK_ROWS, columns=None, part=(0, 1)):
+    """
+    Yield a table as schema-typed frames of at most about chunk_rows rows,
+    never holding the whole table in memory. Rows come in file order.
+
+    part=(i, n) yields only the i-th of n interleaved slices of the row
+    groups (parquet) or record batches (feather), so n readers can share one
+    file; a csv file is a single slice.
+    """
+    path = table_path(directory, name, fmt)
+    index, parts = part
+
+    if fmt == "csv":
+        if index == 0:
+            for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_rows):
+                yield apply_schema(chunk)
+        return
+
+    pa = _require_pyarrow()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        source = pq.ParquetFile(path)
+        groups = list(range(source.num_row_groups))[index::parts]
+        if groups:
+            for batch in source.iter_batches(batch_size=chunk_rows, row_groups=groups, columns=columns):
+                yield apply_schema(batch.to_pandas())
+    elif fmt == "feather":
+        with pa.memory_map(path) as mapped:
+            reader = pa.ipc.open_file(mapped)
+            for i in range(index, reader.num_record_batches, parts):
+                batch = reader.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                yield apply_schema(batch.to_pandas())
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def read_table(directory, name, fmt="csv", columns=None):
+    path = table_path(directory, name, fmt)
+
+    if fmt == "csv":
+        return apply_schema(pd.read_csv(path, usecols=columns))
+    if fmt == "parquet":
+        _require_pyarrow()
+        df = pd.read_parquet(path, columns=columns)
+    elif fmt == "feather":
+        _require_pyarrow()
+        df = pd.read_feather(path, columns=columns)
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    order_col = ROW_ORDER_COLUMN.get(name)
+    if order_col in df.columns:
+        df = df.sort_values(order_col, kind="stable", ignore_index=True)
+    return apply_schema(df)
@@ -0,0 +1,213 @@
+"""
+Streaming table output.
+
+Generated frames are handed to a writer as they are produced instead of
+being collected into one DataFrame per table. Each table is buffered until
+the buffer reaches `chunk_rows` rows (or the shared memory budget is hit),
+then appended to its file, so peak memory is bounded by the budget rather
+than by the size of the final table.
+
+stream_base_data runs the whole generator that way, shard by shard;
+append_run extends a saved run (see run_state) by whole months.
+"""
+
+import os
+
+import pandas as pd
+
+from .base_data import (
+    DEFAULT_SEED, END_DATE, ID_COLUMNS, START_DATE, append_base_data, append_months, currency_table, iter_shards
+)
+from .merchants import merchant_table, merchants_per_country
+from .profiling import PhaseTimer
+from .run_state import load_state, make_state, save_state
+from .table_io import DEFAULT_COMPRESSION, ArrowTableWriter, csv_frame, table_path, write_table
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+# Rough generation peak per customer-month (arrays + frames), measured
+# on the 24-month default horizon; used to size shards under a memory ceiling.
+BYTES_PER_CUSTOMER_MONTH = 8_500
+
+
+def shards_for_memory(num_customers, num_months, max_memory_bytes, workers=1):
+    """Smallest shard count that keeps every in-flight shard under the memory ceiling."""
+    in_flight = max(workers, 1) + 1
+    per_shard_budget = max_memory_bytes / in_flight
+    total = num_customers * num_months * BYTES_PER_CUSTOMER_MONTH
+    return max(1, -(-int(total) // int(per_shard_budget)))
+
+
+class TableChunkWriter:
+    """Appends frames for one table to its file, flushing every `chunk_rows` rows."""
+
+    def __init__(self, path, name, fmt="csv", chunk_rows=DEFAULT_CHUNK_ROWS,
+                 compression=DEFAULT_COMPRESSION):
+        self.path = path
+        self.name = name
+        self.fmt = fmt
+        self.chunk_rows = chunk_rows
+        self._arrow = None if fmt == "csv" else ArrowTableWriter(path, fmt, compression)
+        self.rows_written = 0
+        self.buffered_bytes = 0
+        self._buffer = []
+        self._buffered_rows = 0
+        self._bytes_per_row = None
+        self._header_written = False
+
+    def write(self, df):
+        if df.empty and self._header_written:
+            return
+        if self._bytes_per_row is None and len(df):
+            sample = df.head(1000)
+            self._bytes_per_row = sample.memory_usage(index=False, deep=True).sum() / len(sample)
+        self._buffer.append(df)
+        self._buffered_rows += len(df)
+        self.buffered_bytes = int(self._buffered_rows * (self._bytes_per_row or 0))
+        if self._buffered_rows >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        chunk = pd.concat(self._buffer, ignore_index=True) if len(self._buffer) > 1 else self._buffer[0]
+        if self._arrow is not None:
+            self._arrow.write(self.name, chunk)
+        else:
+            csv_frame(chunk).to_csv(
+                self.path,
+                mode="a" if self._header_written else "w",
+                header=not self._header_written,
+                index=False
+            )
+        self._header_written = True
+        self.rows_written += len(chunk)
+        self._buffer = []
+        self._buffered_rows = 0
+        self.buffered_bytes = 0
+
+    def close(self):
+        self.flush()
+        if self._arrow is not None:
+            self._arrow.close()
+
+
+class StreamingTableWriter:
+    """
+    One TableChunkWriter per table under a shared buffer budget.
+
+    When the combined buffers exceed `max_buffer_bytes`, the largest buffer is
+    flushed early, so a table with wide rows cannot push the process past the
+    ceiling while it waits to reach a full chunk.
+    """
+
+    def __init__(self, output_dir, chunk_rows=DEFAULT_CHUNK_ROWS, max_buffer_bytes=None,
+                 fmt="csv", compression=DEFAULT_COMPRESSION):
+        self.output_dir = output_dir
+        self.chunk_rows = chunk_rows
+        self.max_buffer_bytes = max_buffer_bytes
+        self.fmt = fmt
+        self.compression = compression
+        self.writers = {}
+
+    def _writer(self, name):
+        if name not in self.writers:
+            path = table_path(self.output_dir, name, self.fmt)
+            self.writers[name] = TableChunkWriter(path, name, self.fmt, self.chunk_rows, self.compression)
+        return self.writers[name]
+
+    def write(self, name, df):
+        self._writer(name).write(df)
+        if self.max_buffer_bytes is None:
+            return
+        while sum(w.buffered_bytes for w in self.writers.values()) > self.max_buffer_bytes:
+            max(self.writers.values(), key=lambda w: w.buffered_bytes).flush()
+
+    def write_tables(self, tables):
+        for name, df in tables.items():
+            self.write(name, df)
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+
+    def rows_written(self):
+        return {name: w.rows_written for name, w in self.writers.items()}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def stream_base_data(num_customers, out_dir, seed=DEFAULT_SEED, shards=1, workers=1, fmt="csv",
+                     compression=DEFAULT_COMPRESSION, chunk_rows=DEFAULT_CHUNK_ROWS, max_memory_mb=None,
+                     timer=None, log=print):
+    """
+    Generate the base tables into out_dir, writing each shard as it finishes.
+
+    With max_memory_mb, half the ceiling goes to shards being generated
+    (raising `shards` as needed) and half to write buffers. Returns
+    (rows written per table, end-of-run state, shards used).
+    """
+    timer = timer or PhaseTimer(enabled=False)
+    max_buffer_bytes = None
+    if max_memory_mb:
+        memory_bytes = max_memory_mb * 1024 ** 2
+        num_months = len(pd.date_range(START_DATE, END_DATE, freq="MS"))
+        needed = shards_for_memory(num_customers, num_months, memory_bytes // 2, workers)
+        if needed > shards:
+            log(f"Raising shards {shards} -> {needed} to fit {max_memory_mb} MB "
+                f"(pass --shards {needed} to reproduce this output)")
+            shards = needed
+        max_buffer_bytes = memory_bytes // 2
+
+    log(f"Streaming {num_customers} customers in {shards} shard(s) on {workers} worker(s)...")
+
+    offsets = {table: 0 for table in ID_COLUMNS}
+    shard_states = []
+
+    with StreamingTableWriter(out_dir, chunk_rows, max_buffer_bytes, fmt, compression) as writer:
+        for i, (tables, timings, shard_state) in enumerate(
+            iter_shards(num_customers, seed, shards, workers, offsets=offsets), 1
+        ):
+            timer.add(timings)
+            shard_states.append(shard_state)
+            with timer.phase("save"):
+                writer.write_tables(tables)
+            log(f"Shard {i}/{shards} written")
+
+        with timer.phase("save"):
+            writer.write("currency_conversions", currency_table())
+            writer.write("merchants", merchant_table(merchants_per_country(num_customers)))
+
+    state = make_state(num_customers, seed, shards, START_DATE, END_DATE, offsets, shard_states)
+    return writer.rows_written(), state, shards
+
+
+def append_run(out_dir, months, workers=1, fmt="csv", compression=DEFAULT_COMPRESSION, timer=None, log=print):
+    """
+    Extend the run saved in out_dir by `months` calendar months.
+
+    The new rows go to <out_dir>/append_<first>_<last>/ and the saved state
+    is advanced, so repeated calls give a rolling monthly feed. Returns
+    (append directory, rows written per table, new state).
+    """
+    timer = timer or PhaseTimer(enabled=False)
+    state = load_state(out_dir)
+    first_month, last_month = append_months(state, months)
+    append_path = os.path.join(out_dir, f"append_{first_month:%Y-%m}_{last_month:%Y-%m}")
+    os.makedirs(append_path, exist_ok=True)
+
+    log(f"Appending {first_month:%Y-%m} .. {last_month:%Y-%m} for {state['customers']} customers "
+        f"({state['shards']} shard(s)) from the saved state")
+
+    tables, state = append_base_data(state, months, workers=workers, timer=timer)
+
+    with timer.phase("save"):
+        for name, df in tables.items():
+            write_table(df, append_path, name, fmt, compression)
+
+    save_state(out_dir, state)
+    return append_path, {name: len(df) for name, df in tables.items()}, state
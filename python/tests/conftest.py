@@ -0,0 +1,16 @@
+"""
+Shared test setup.
+
+Tests import the packages under python/ and the reference loops kept in the
+benchmark scripts, so both directories go on sys.path whatever directory
+pytest is started from.
+"""
+
+import os
+import sys
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for path in [PYTHON_DIR, os.path.join(PYTHON_DIR, "benchmarks")]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
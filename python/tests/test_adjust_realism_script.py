@@ -0,0 +1,61 @@
+"""02_adjust_realism.py with a step cache: reruns hit every step and rewrite nothing."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from data_generation.base_data import generate_base_data
+from data_generation.pipeline import OUTPUT_TABLES
+from data_generation.realism import REALISM_STEPS
+from data_generation.table_io import table_path, write_table
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      "data_generation", "02_adjust_realism.py")
+
+
+def run_script(*args):
+    result = subprocess.run([sys.executable, SCRIPT, *args], capture_output=True, text=True)
+    return result.returncode, result.stdout + result.stderr
+
+
+def snapshot(directory):
+    """(bytes, mtime) of every table file."""
+    snap = {}
+    for name in OUTPUT_TABLES:
+        path = table_path(directory, name, "csv")
+        with open(path, "rb") as f:
+            snap[name] = (f.read(), os.stat(path).st_mtime_ns)
+    return snap
+
+
+@pytest.fixture
+def base(tmp_path):
+    path = str(tmp_path / "base")
+    os.makedirs(path)
+    for name, df in generate_base_data(150, seed=9).items():
+        write_table(df, path, name)
+    return path
+
+
+def test_rerun_is_all_hits_and_identical(base, tmp_path):
+    out, cache = str(tmp_path / "adjusted"), str(tmp_path / "cache")
+    inputs = snapshot(base)
+
+    code, first_log = run_script("--dir", base, "--out", out, "--cache", cache)
+    assert code == 0, first_log
+    first = snapshot(out)
+
+    code, second_log = run_script("--dir", base, "--out", out, "--cache", cache)
+    assert code == 0, second_log
+    assert f"Step cache: {len(REALISM_STEPS)} hit(s), 0 miss(es)" in second_log
+    assert second_log.count("unchanged, not rewritten") == len(OUTPUT_TABLES)
+    assert snapshot(out) == first
+    assert snapshot(base) == inputs
+
+
+def test_cache_in_place_is_refused(base, tmp_path):
+    code, log = run_script("--dir", base, "--cache", str(tmp_path / "cache"))
+    assert code != 0
+    assert "--cache needs an --out" in log
@@ -0,0 +1,73 @@
+"""Fused amount multipliers vs the masked passes of the original realism script."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_generation.amount_rules import apply_multipliers
+from data_generation.realism import AMOUNT_RULES, amount_rule_dims
+
+SPIKE_FACTOR = 3.1
+
+
+def masked_passes(transactions, spike_mask):
+    """Steps 3-4 as the original 02_adjust_realism.py applied them, one pass per rule."""
+    transactions = transactions.copy()
+    transactions["amount"] = transactions["amount"].astype(np.float64)
+    transactions["month_num"] = transactions["transaction_date"].dt.month
+    transactions["year"] = transactions["transaction_date"].dt.year
+
+    transactions.loc[transactions["month_num"].isin([11, 12]), "amount"] *= 1.35
+    transactions.loc[transactions["month_num"].isin([2, 6]), "amount"] *= 0.75
+
+    transactions["months_since_start"] = (
+        (transactions["year"] - transactions["year"].min()) * 12
+        + transactions["month_num"]
+    )
+    transactions["amount"] *= (1 + transactions["months_since_start"] * 0.01)
+
+    transactions.loc[spike_mask, "amount"] *= SPIKE_FACTOR
+
+    transactions["weekday"] = transactions["transaction_date"].dt.weekday
+    transactions.loc[transactions["weekday"] >= 5, "amount"] *= 1.2
+    transactions.loc[transactions["merchant_type"] == "Online", "amount"] *= 1.25
+    return transactions["amount"].to_numpy()
+
+
+@pytest.fixture
+def transactions():
+    rng = np.random.default_rng(3)
+    n = 5000
+    dates = pd.Series(pd.to_datetime("2024-01-01") + pd.to_timedelta(rng.integers(0, 730, n), unit="D"))
+    dates[rng.random(n) < 0.02] = pd.NaT
+    channel = pd.Series(pd.Categorical.from_codes(rng.integers(0, 2, n), categories=["Online", "Offline"]))
+    channel[rng.random(n) < 0.05] = np.nan
+    amount = pd.Series(rng.uniform(10, 300, n))
+    amount[rng.random(n) < 0.02] = np.nan
+    return pd.DataFrame({"transaction_date": dates, "merchant_type": channel, "amount": amount})
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numba"])
+def test_matches_masked_passes(transactions, backend):
+    if backend == "numba":
+        pytest.importorskip("numba")
+    spike_mask = np.random.default_rng(4).random(len(transactions)) < 0.02
+
+    expected = masked_passes(transactions, spike_mask)
+    amount = transactions["amount"].to_numpy(dtype=np.float64).copy()
+    apply_multipliers(amount, AMOUNT_RULES, amount_rule_dims(transactions, AMOUNT_RULES, {"spike": spike_mask}),
+                      params={"spike_factor": SPIKE_FACTOR}, backend=backend)
+
+    np.testing.assert_allclose(amount, expected, rtol=1e-12, equal_nan=True)
+
+
+def test_missing_category_keeps_amount(transactions):
+    """A null merchant_type skips the Online rule instead of erasing the amount."""
+    rules = [{"column": "merchant_type", "in": ["Online"], "factor": 1.25}]
+    amount = transactions["amount"].to_numpy(dtype=np.float64).copy()
+    apply_multipliers(amount, rules, amount_rule_dims(transactions, rules, {}), backend="numpy")
+
+    null_channel = transactions["merchant_type"].isna().to_numpy()
+    original = transactions["amount"].to_numpy()
+    np.testing.assert_array_equal(amount[null_channel], original[null_channel])
+    assert np.isnan(amount).sum() == np.isnan(original).sum()
@@ -0,0 +1,59 @@
+"""Saved run state and appending months to a pipeline run."""
+
+import os
+
+import pytest
+
+from data_generation.base_data import APPEND_TABLES, ID_COLUMNS, append_months
+from data_generation.pipeline import run_pipeline
+from data_generation.run_state import load_state, state_path
+from data_generation.table_io import read_table
+from data_generation.writers import append_run
+
+CUSTOMERS = 150
+
+
+def _quiet(msg):
+    pass
+
+
+@pytest.fixture(scope="module")
+def run(tmp_path_factory):
+    out = str(tmp_path_factory.mktemp("output"))
+    tables, _ = run_pipeline(CUSTOMERS, out, log=_quiet)
+    return out, tables
+
+
+def test_pipeline_saves_state(run):
+    out, tables = run
+    state = load_state(out)
+    assert state["customers"] == CUSTOMERS
+    for table, (id_col, _) in ID_COLUMNS.items():
+        assert state["next_ids"][table] >= tables[table][id_col].max()
+
+
+def test_months_must_be_positive(run):
+    out, _ = run
+    with pytest.raises(ValueError):
+        append_months(load_state(out), 0)
+
+
+def test_append_continues_the_run(run):
+    out, tables = run
+    before = load_state(out)
+    append_path, rows, state = append_run(out, 1, log=_quiet)
+
+    assert os.path.basename(append_path) == f"append_{state['end_date'][:7]}_{state['end_date'][:7]}"
+    assert state["end_date"] > before["end_date"]
+    assert load_state(out)["end_date"] == state["end_date"]
+    assert os.path.isdir(state_path(out))
+
+    new = {name: read_table(append_path, name) for name in APPEND_TABLES}
+    assert rows["transactions"] > 0
+    for table, (id_col, _) in ID_COLUMNS.items():
+        assert len(new[table]) == rows[table]
+        assert not new[table][id_col].isin(tables[table][id_col]).any()
+        assert new[table][id_col].min() > before["next_ids"][table]
+    assert new["fraud_flags"]["transaction_id"].isin(new["transactions"]["transaction_id"]).all()
+    assert new["transactions"]["card_id"].isin(tables["cards"]["card_id"]).all()
+    assert (new["transactions"]["transaction_date"].dt.strftime("%Y-%m") == state["end_date"][:7]).all()
@@ -0,0 +1,18 @@
+"""Sharded base data: the worker count never changes the tables."""
+
+import pandas as pd
+
+from data_generation.base_data import TABLES, generate_base_data
+
+CUSTOMERS = 200
+SHARDS = 4
+
+
+def test_workers_do_not_change_tables():
+    serial = generate_base_data(CUSTOMERS, seed=13, shards=SHARDS, workers=1)
+    parallel = generate_base_data(CUSTOMERS, seed=13, shards=SHARDS, workers=2)
+
+    assert set(serial) == set(parallel)
+    assert set(TABLES) <= set(serial)
+    for name, df in serial.items():
+        pd.testing.assert_frame_equal(df, parallel[name], check_exact=True, obj=name)
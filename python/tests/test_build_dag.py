@@ -0,0 +1,58 @@
+"""Dependency graph of sql/03_analysis_queries.sql and the rebuild set for a changed input."""
+
+import pytest
+
+from analytics.build_dag import build_graph, downstream, run_dag
+from analytics.sql_script import load_script
+
+# Summary-table edges of sql/03: node -> the summary tables it reads
+EDGES = {
+    "customer_spend_summary": [],
+    "segment_spend_summary": ["customer_spend_summary"],
+    "monthly_spend_summary": [],
+    "category_spend_summary": [],
+    "channel_spend_summary": [],
+    "weekend_spend_summary": [],
+    "fraud_summary": [],
+    "fraud_by_segment": [],
+    "pareto_spend_analysis": ["customer_spend_summary"],
+    "customer_monthly_spend_to_limit": [],
+    "rewards_cost_per_card": [],
+    "rewards_effectiveness": ["customer_spend_summary", "rewards_cost_per_card"],
+    "rewards_summary": [],
+    "customer_profitability_v2": ["customer_spend_summary", "rewards_effectiveness"],
+    "customer_profitability": ["customer_profitability_v2"],
+    "profitability_summary": ["customer_profitability"],
+    "customer_segments": ["customer_profitability", "customer_spend_summary"],
+    "delinquency_roll_rates": []
+}
+
+# Everything built from reward_redemptions, directly or through the rewards cost
+REDEMPTION_SUMMARIES = {
+    "rewards_cost_per_card", "rewards_summary", "rewards_effectiveness", "customer_profitability_v2",
+    "customer_profitability", "profitability_summary", "customer_segments"
+}
+
+
+@pytest.fixture(scope="module")
+def graph():
+    return build_graph(load_script())
+
+
+def test_edges(graph):
+    assert {name: sorted(node["deps"]) for name, node in graph.items()} == EDGES
+    assert graph["rewards_summary"]["reads"] == ["reward_redemptions"]
+    assert graph["rewards_cost_per_card"]["reads"] == ["reward_redemptions"]
+
+
+def test_redemptions_rebuild_only_their_summaries(graph):
+    assert downstream(graph, ["reward_redemptions"]) == REDEMPTION_SUMMARIES
+    assert downstream(graph, ["payments"]) == {"delinquency_roll_rates"}
+
+
+def test_run_dag_follows_the_edges(graph):
+    order = []
+    run_dag(graph, lambda name, query: order.append(name), workers=3, log=lambda msg: None)
+    assert sorted(order) == sorted(EDGES)
+    for name, deps in EDGES.items():
+        assert all(order.index(dep) < order.index(name) for dep in deps), name
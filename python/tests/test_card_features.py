@@ -0,0 +1,36 @@
+"""Rolling card features vs a groupby over the same window."""
+
+import numpy as np
+import pytest
+
+from analytics.card_features import CardFeatures
+from data_generation.base_data import generate_base_data
+
+WINDOW = 3
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return generate_base_data(100, seed=11)
+
+
+def window_rows(df, date_column, last_month):
+    months = df[date_column].dt.to_period("M")
+    return df[(months > last_month - WINDOW) & (months <= last_month)]
+
+
+def test_window_matches_groupby(tables):
+    engine = CardFeatures().set_credit_limits(tables["cards"])
+    engine.update(tables["transactions"], tables["payments"])
+    features = engine.features().set_index("card_id")
+    last_month = features["as_of_month"].iloc[0]
+
+    payments = window_rows(tables["payments"], "payment_date", last_month)
+    utilization = payments.groupby("card_id")["utilization"].mean()
+    np.testing.assert_allclose(features.loc[utilization.index, f"utilization_{WINDOW}m"], utilization, rtol=1e-5)
+
+    transactions = window_rows(tables["transactions"], "transaction_date", last_month)
+    spend = transactions.groupby("card_id")["amount"].sum()
+    limit = tables["cards"].set_index("card_id")["credit_limit"]
+    np.testing.assert_allclose(features.loc[spend.index, f"spend_to_limit_{WINDOW}m"],
+                               spend / (WINDOW * limit[spend.index]), rtol=1e-5)
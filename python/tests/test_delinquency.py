@@ -0,0 +1,83 @@
+"""Delinquency state machine: valid matrices, absorbing charge-off, roll rates as sql/03 computes them."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.duckdb_runner import translate
+from analytics.sql_script import load_script
+from data_generation.base_data import generate_base_data
+from data_generation.delinquency import (
+    BAND_ROLL_MULTIPLIERS, ROLL_MATRICES, SEGMENT_ROLL_MULTIPLIERS, payment_grid, roll_rates, run_statuses,
+    transition_matrices
+)
+from data_generation.realism import adjust_realism
+from data_generation.schema import DELINQUENCY_STATUSES
+
+duckdb = pytest.importorskip("duckdb")
+
+CHARGE_OFF = len(DELINQUENCY_STATUSES) - 1
+SEGMENTS = list(SEGMENT_ROLL_MULTIPLIERS)
+
+
+def _quiet(msg):
+    pass
+
+
+@pytest.fixture(scope="module")
+def matrices():
+    return transition_matrices(ROLL_MATRICES, SEGMENTS, SEGMENT_ROLL_MULTIPLIERS, BAND_ROLL_MULTIPLIERS)
+
+
+def test_rows_are_distributions(matrices):
+    assert matrices.shape[1:3] == (len(SEGMENTS) + 1, len(BAND_ROLL_MULTIPLIERS))
+    assert (matrices >= 0).all()
+    np.testing.assert_allclose(matrices.sum(axis=-1), 1.0)
+
+    # Even extreme multipliers keep every row a distribution
+    extreme = transition_matrices(ROLL_MATRICES, SEGMENTS, {s: 1e6 for s in SEGMENTS}, [1e-6, 1.0, 1e6])
+    assert (extreme >= 0).all()
+    np.testing.assert_allclose(extreme.sum(axis=-1), 1.0)
+
+
+def test_charge_off_is_absorbing(matrices):
+    absorbing = np.eye(len(DELINQUENCY_STATUSES))[CHARGE_OFF]
+    assert (matrices[..., CHARGE_OFF, :] == absorbing).all()
+
+    rng = np.random.default_rng(0)
+    cards, months = 2_000, 36
+    missed = rng.random((cards, months)) < 0.5
+    bands = rng.integers(0, len(BAND_ROLL_MULTIPLIERS), (cards, months))
+    groups = rng.integers(0, len(SEGMENTS) + 1, cards)
+    observed = rng.random((cards, months)) < 0.9
+    statuses = run_statuses(groups, bands, missed, observed, matrices, rng)
+
+    charged_off = np.maximum.accumulate(statuses == CHARGE_OFF, axis=1)
+    assert charged_off.any()
+    assert (statuses[charged_off] == CHARGE_OFF).all()
+
+
+def test_roll_rates_match_sql():
+    payments = adjust_realism(generate_base_data(300, seed=17), log=_quiet)["payments"]
+
+    # Roll rates of the simulated states, rebuilt on the payments grid
+    dates = pd.to_datetime(payments["payment_date"])
+    card_pos, month_pos, observed, card_ids = payment_grid(payments["card_id"], dates)
+    shape = (len(card_ids), month_pos.max() + 1)
+    statuses = np.zeros(shape, dtype=np.int8)
+    in_grid = np.zeros(shape, dtype=bool)
+    statuses[card_pos[observed], month_pos[observed]] = payments["delinquency_status"].cat.codes.to_numpy()[observed]
+    in_grid[card_pos[observed], month_pos[observed]] = True
+    expected = roll_rates(statuses, in_grid)
+
+    queries = {stmt["table"]: stmt["query"] for stmt in load_script() if stmt["kind"] == "create"}
+    con = duckdb.connect()
+    con.register("payments", payments.assign(delinquency_status=payments["delinquency_status"].astype(object)))
+    actual = con.execute(translate(queries["delinquency_roll_rates"])).df()
+    con.close()
+
+    def canonical(df):
+        df = df.astype({"from_status": str, "to_status": str, "card_months": np.int64})
+        return df.sort_values(["from_status", "to_status"], ignore_index=True)
+
+    pd.testing.assert_frame_equal(canonical(actual), canonical(expected), check_dtype=False)
@@ -0,0 +1,65 @@
+"""Event stream order, both encodings decoded back, and the CLI's --limit."""
+
+import asyncio
+import json
+import struct
+
+import pandas as pd
+import pytest
+
+from data_generation.__main__ import main
+from data_generation.base_data import generate_base_data
+from data_generation.event_stream import ENCODINGS, event_frame, stream_events
+
+CUSTOMERS = 60
+
+
+@pytest.fixture(scope="module")
+def events():
+    tables = generate_base_data(CUSTOMERS, seed=21)
+    return event_frame(tables["transactions"], tables["fraud_flags"])
+
+
+def decode(data, encoding):
+    """Records written by stream_events, back as dicts."""
+    if encoding == "jsonl":
+        return [json.loads(line) for line in data.decode().splitlines()]
+    records, pos = [], 0
+    while pos < len(data):
+        (size,) = struct.unpack_from(">I", data, pos)
+        records.append(json.loads(data[pos + 4:pos + 4 + size]))
+        pos += 4 + size
+    return records
+
+
+def test_events_in_date_order(events):
+    dates = events["transaction_date"]
+    assert dates.notna().all()
+    assert dates.is_monotonic_increasing
+    same_day = dates.eq(dates.shift())
+    assert (events["transaction_id"].diff()[same_day] > 0).all()
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_encoding_round_trips(events, encoding, tmp_path):
+    sink = str(tmp_path / f"events.{encoding}")
+    stats = asyncio.run(stream_events(events, sink, rate=0, burst=97, encoding=encoding))
+    assert stats["events"] == len(events)
+
+    with open(sink, "rb") as f:
+        decoded = pd.DataFrame(decode(f.read(), encoding))
+    assert list(decoded.columns) == list(events.columns)
+    assert decoded["transaction_id"].tolist() == events["transaction_id"].tolist()
+    assert (pd.to_datetime(decoded["transaction_date"]) == events["transaction_date"]).all()
+    pd.testing.assert_series_equal(decoded["amount"], events["amount"].astype(float), check_names=False)
+    assert decoded["is_fraud"].tolist() == events["is_fraud"].tolist()
+    assert decoded["fraud_type"].fillna("").tolist() == events["fraud_type"].astype(object).fillna("").tolist()
+
+
+def test_cli_limit(events, tmp_path, capsys):
+    sink = str(tmp_path / "events.jsonl")
+    main(["events", "--customers", str(CUSTOMERS), "--seed", "21", "--sink", sink, "--rate", "0", "--limit", "37"])
+    with open(sink, "rb") as f:
+        records = decode(f.read(), "jsonl")
+    assert [r["transaction_id"] for r in records] == events["transaction_id"].iloc[:37].tolist()
+    assert "Sent 37 events" in capsys.readouterr().err
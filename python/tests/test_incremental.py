@@ -0,0 +1,61 @@
+"""Incremental month-partitioned refresh vs a full rebuild from sql/03_analysis_queries.sql."""
+
+import pandas as pd
+import pytest
+
+from analytics.duckdb_runner import register_sources, translate
+from analytics.incremental import INCREMENTAL_TABLES, refresh
+from analytics.sql_script import load_script
+from data_generation.pipeline import run_pipeline
+
+duckdb = pytest.importorskip("duckdb")
+
+CUSTOMERS = 200
+HELD_BACK = 0.25
+
+
+def _quiet(msg):
+    pass
+
+
+def frame(con, query):
+    """Rows of `query` in a canonical order, so row order never matters."""
+    df = con.execute(query).df()
+    return df.sort_values(list(df.columns), ignore_index=True, na_position="first")
+
+
+@pytest.fixture(scope="module")
+def con(tmp_path_factory):
+    out = str(tmp_path_factory.mktemp("output"))
+    run_pipeline(CUSTOMERS, out, log=_quiet)
+    con = duckdb.connect()
+    register_sources(con, out)
+    yield con
+    con.close()
+
+
+def test_refresh_matches_full_rebuild(con):
+    # Build on the older transactions, then "load" the newest ids and refresh
+    cutoff = con.execute(
+        f"SELECT quantile_disc(transaction_id, {1 - HELD_BACK}) FROM transactions"
+    ).fetchone()[0]
+    con.execute(f"CREATE TABLE held_back AS SELECT * FROM transactions WHERE transaction_id > {cutoff}")
+    con.execute(f"DELETE FROM transactions WHERE transaction_id > {cutoff}")
+    assert refresh(con, log=_quiet) == list(INCREMENTAL_TABLES)
+
+    con.execute("INSERT INTO transactions SELECT * FROM held_back")
+    assert refresh(con, log=_quiet) == list(INCREMENTAL_TABLES)
+    marks = dict(con.execute("SELECT table_name, months_refreshed FROM summary_watermark").fetchall())
+    assert all(marks[table] is not None for table in INCREMENTAL_TABLES)
+
+    queries = {stmt["table"]: stmt["query"] for stmt in load_script() if stmt["kind"] == "create"}
+    for table in INCREMENTAL_TABLES:
+        expected = frame(con, translate(queries[table]))
+        actual = frame(con, f"SELECT * FROM {table}")
+        assert list(actual.columns) == list(expected.columns), table
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False, rtol=1e-9, obj=table)
+
+
+def test_up_to_date_refresh_is_a_no_op(con):
+    refresh(con, log=_quiet)
+    assert refresh(con, log=_quiet) == []
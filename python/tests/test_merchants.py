@@ -0,0 +1,44 @@
+"""Merchant dimension sized by the portfolio, and transactions that agree with it."""
+
+import pytest
+
+from data_generation.base_data import generate_base_data
+from data_generation.merchants import MERCHANTS_PER_COUNTRY, MIN_MERCHANTS_PER_COUNTRY, merchants_per_country
+from data_generation.realism import adjust_realism
+
+CUSTOMERS = 300
+
+
+def _quiet(msg):
+    pass
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return generate_base_data(CUSTOMERS, seed=3, shards=2)
+
+
+def assert_merchants_agree(transactions, merchants):
+    """Every transaction's merchant exists and is in the transaction's city and category."""
+    joined = transactions.merge(merchants, on="merchant_id", how="left", suffixes=("", "_merchant"))
+    assert joined["merchant_category_merchant"].notna().all()
+    assert (joined["merchant_category"].astype(str) == joined["merchant_category_merchant"].astype(str)).all()
+    assert (joined["merchant_city"].astype(str) == joined["merchant_city_merchant"].astype(str)).all()
+
+
+def test_count_scales_with_customers():
+    assert merchants_per_country(10) == MIN_MERCHANTS_PER_COUNTRY
+    assert merchants_per_country(CUSTOMERS) == CUSTOMERS * 12
+    assert merchants_per_country(10_000_000) == MERCHANTS_PER_COUNTRY
+
+
+def test_small_run_has_small_dimension(tables):
+    merchants = tables["merchants"]
+    assert len(merchants) <= 6 * merchants_per_country(CUSTOMERS)
+    assert merchants["merchant_id"].is_unique
+    assert_merchants_agree(tables["transactions"], merchants)
+
+
+def test_realism_keeps_merchants_consistent(tables):
+    adjusted = adjust_realism(tables, log=_quiet)
+    assert_merchants_agree(adjusted["transactions"], tables["merchants"])
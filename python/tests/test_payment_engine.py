@@ -0,0 +1,69 @@
+"""Vectorized balance simulator vs the per-card revolving-balance loop."""
+
+import numpy as np
+import pytest
+
+from bench_transaction_engine import date_range, make_cards
+from data_generation.base_data import cities, country_currency
+from data_generation.payment_engine import simulate_balances
+from data_generation.transaction_engine import simulate_transactions
+
+SEED = 11
+N_CARDS = 2000
+
+
+def reference_balances(credit_limit, monthly_spend, rs):
+    """The old script's balance logic, one card-month at a time."""
+    n_cards, n_months = monthly_spend.shape
+    payment_amount = np.empty((n_cards, n_months))
+    missed_streak = np.empty((n_cards, n_months), dtype=np.int64)
+
+    for c in range(n_cards):
+        balance = 0
+        streak = 0
+        for m in range(n_months):
+            balance += monthly_spend[c, m]
+            utilization = balance / credit_limit[c]
+
+            if utilization > 0.8 and rs.rand() < 0.25:
+                payment = balance * rs.uniform(0.05, 0.2)
+                streak += 1
+            else:
+                payment = balance * rs.uniform(0.3, 0.8)
+                streak = 0
+
+            balance = max(balance - payment, 0)
+            payment_amount[c, m] = payment
+            missed_streak[c, m] = streak
+
+    return payment_amount, missed_streak
+
+
+@pytest.fixture(scope="module")
+def runs():
+    rng = np.random.default_rng(SEED)
+    cards = make_cards(N_CARDS, rng)
+    _, _, monthly_spend = simulate_transactions(
+        cards["card_id"].to_numpy(), cards["customer_segment"].to_numpy(), cards["age"].to_numpy(),
+        cards["country"].to_numpy(), cards["city"].to_numpy(), date_range, cities, country_currency, rng
+    )
+    limits = cards["credit_limit"].to_numpy()
+    reference = reference_balances(limits, monthly_spend, np.random.RandomState(SEED))
+    vector = simulate_balances(limits, monthly_spend, np.random.default_rng(SEED + 1))[:2]
+    return reference, vector
+
+
+def test_payment_amounts(runs):
+    (reference, _), (vector, _) = runs
+    assert vector.mean() == pytest.approx(reference.mean(), rel=0.03)
+    for q in [0.1, 0.5, 0.9]:
+        assert np.quantile(vector, q) == pytest.approx(np.quantile(reference, q), rel=0.05)
+
+
+def test_missed_streaks(runs):
+    (_, reference), (_, vector) = runs
+    assert (vector > 0).mean() == pytest.approx((reference > 0).mean(), abs=0.01)
+    for streak in [1, 2, 3, 5]:
+        assert (vector >= streak).mean() == pytest.approx((reference >= streak).mean(), abs=0.01)
+    # A streak only ever grows by one month at a time
+    assert (np.diff(vector, axis=1) <= 1).all()
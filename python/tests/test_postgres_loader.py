@@ -0,0 +1,97 @@
+"""Bulk loader against a throwaway Postgres cluster (initdb + pg_ctl)."""
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from data_generation.pipeline import run_pipeline
+from data_generation.postgres_loader import SCHEMA_SQL, TABLE_FILES, load_tables, parse_schema
+from data_generation.table_io import read_table
+
+psycopg = pytest.importorskip("psycopg")
+
+CUSTOMERS = 300
+
+
+def pg_binary(name):
+    """`name` from $PG_BIN, else from PATH; None if neither has it."""
+    if os.environ.get("PG_BIN"):
+        path = os.path.join(os.environ["PG_BIN"], name)
+        return path if os.access(path, os.X_OK) else None
+    return shutil.which(name)
+
+
+def _quiet(msg):
+    pass
+
+
+@pytest.fixture(scope="module")
+def dsn(tmp_path_factory):
+    initdb, pg_ctl = pg_binary("initdb"), pg_binary("pg_ctl")
+    if not initdb or not pg_ctl:
+        pytest.skip("initdb/pg_ctl not found (set PG_BIN to the Postgres bin directory)")
+    if hasattr(os, "geteuid") and os.geteuid() == 0:
+        pytest.skip("initdb refuses to run as root")
+
+    root = tmp_path_factory.mktemp("pg")
+    data, sockets = root / "data", root / "sock"
+    sockets.mkdir()
+    subprocess.run([initdb, "-D", str(data), "-U", "postgres", "-A", "trust", "--no-sync"],
+                   check=True, capture_output=True)
+    # Unix socket only, so parallel runs never fight over a TCP port
+    subprocess.run([pg_ctl, "-D", str(data), "-l", str(root / "log"), "-w",
+                    "-o", f"-k {sockets} -h ''", "start"], check=True, capture_output=True)
+    try:
+        yield f"postgresql://postgres@/postgres?host={sockets}"
+    finally:
+        subprocess.run([pg_ctl, "-D", str(data), "-m", "immediate", "stop"], capture_output=True)
+
+
+@pytest.fixture(scope="module")
+def generated(tmp_path_factory):
+    out = str(tmp_path_factory.mktemp("output"))
+    run_pipeline(CUSTOMERS, out, log=_quiet)
+    return out
+
+
+@pytest.fixture(scope="module")
+def loaded(dsn, generated):
+    stats = load_tables(dsn, generated, workers=2, replace=True, log=_quiet)
+    with psycopg.connect(dsn) as conn:
+        yield stats, conn
+
+
+def test_row_counts(loaded, generated):
+    stats, conn = loaded
+    for table in parse_schema(open(SCHEMA_SQL).read()):
+        expected = len(read_table(generated, TABLE_FILES.get(table, table)))
+        assert stats[table]["rows"] == expected
+        assert conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0] == expected
+
+
+def test_foreign_keys(loaded):
+    _, conn = loaded
+    schema = parse_schema(open(SCHEMA_SQL).read())
+    expected = {
+        (table, c["name"], *c["references"])
+        for table, columns in schema.items() for c in columns if c["references"]
+    }
+    found = set(conn.execute("""
+        SELECT tc.table_name, kcu.column_name, ccu.table_name, ccu.column_name
+        FROM information_schema.table_constraints tc
+        JOIN information_schema.key_column_usage kcu USING (constraint_name, constraint_schema)
+        JOIN information_schema.constraint_column_usage ccu USING (constraint_name, constraint_schema)
+        WHERE tc.constraint_type = 'FOREIGN KEY'
+    """).fetchall())
+    assert found == expected
+
+    with pytest.raises(psycopg.errors.ForeignKeyViolation):
+        conn.execute("INSERT INTO payments (payment_id, card_id) VALUES (-1, -1)")
+    conn.rollback()
+
+
+def test_existing_tables_need_replace(loaded, dsn, generated):
+    with pytest.raises(ValueError, match="already exist"):
+        load_tables(dsn, generated, log=_quiet)
@@ -0,0 +1,106 @@
+"""Chunked profile vs sql/02_sanity_checks.sql, with a planted duplicate ID and orphan card."""
+
+import pandas as pd
+import pytest
+
+from analytics.duckdb_runner import register_sources
+from data_generation.pipeline import run_pipeline
+from data_generation.profiler import profile_tables
+from data_generation.table_io import read_table, write_table
+
+duckdb = pytest.importorskip("duckdb")
+pytest.importorskip("pyarrow")
+
+CUSTOMERS = 200
+FMT = "parquet"
+TABLES = {
+    "customers": "customer_id", "cards": "card_id", "transactions": "transaction_id",
+    "payments": "payment_id", "fraud_flags": "fraud_id", "reward_redemptions": "redemption_id"
+}
+
+
+def _quiet(msg):
+    pass
+
+
+@pytest.fixture(scope="module")
+def data_dir(tmp_path_factory):
+    out = str(tmp_path_factory.mktemp("output"))
+    run_pipeline(CUSTOMERS, out, fmt=FMT, log=_quiet)
+
+    # A second copy of an unflagged transaction, and a payment on a card that does not exist
+    transactions = read_table(out, "transactions", FMT)
+    flagged = set(read_table(out, "fraud_flags", FMT)["transaction_id"])
+    copy = transactions[~transactions["transaction_id"].isin(flagged)].iloc[[0]]
+    write_table(pd.concat([transactions, copy], ignore_index=True), out, "transactions", FMT)
+
+    payments = read_table(out, "payments", FMT)
+    orphan = payments.iloc[[0]].copy()
+    orphan["payment_id"] = payments["payment_id"].max() + 1
+    orphan["card_id"] = read_table(out, "cards", FMT)["card_id"].max() + 1000
+    write_table(pd.concat([payments, orphan], ignore_index=True), out, "payments", FMT)
+    return out
+
+
+@pytest.fixture(scope="module")
+def con(data_dir):
+    con = duckdb.connect()
+    register_sources(con, data_dir, FMT)
+    yield con
+    con.close()
+
+
+@pytest.fixture(scope="module")
+def report(data_dir):
+    return profile_tables(data_dir, FMT, workers=1, log=_quiet)
+
+
+def scalar(con, query):
+    return con.execute(query).fetchone()[0]
+
+
+def test_counts_and_duplicates_match_sql(con, report):
+    checks = report["checks"]
+    for table, key in TABLES.items():
+        assert checks["row_counts"][table] == scalar(con, f"SELECT COUNT(*) FROM {table}")
+        assert checks["duplicate_ids"][table] == scalar(
+            con, f"SELECT COUNT(*) - COUNT(DISTINCT {key}) FROM {table}")
+    assert checks["duplicate_ids"]["transactions"] == 1
+
+
+def test_orphans_match_sql(con, report):
+    orphans = scalar(con, """
+        SELECT COUNT(*) FROM payments p LEFT JOIN cards c ON p.card_id = c.card_id
+        WHERE p.card_id IS NOT NULL AND c.card_id IS NULL
+    """)
+    assert orphans == 1
+    assert report["checks"]["orphan_rows"]["payments"] == {"card_id": orphans}
+    assert report["checks"]["orphan_rows"]["transactions"].get("currency", 0) == scalar(con, """
+        SELECT COUNT(*) FROM transactions t LEFT JOIN currency_conversion cc ON t.currency = cc.currency_code
+        WHERE t.currency IS NOT NULL AND cc.currency_code IS NULL
+    """)
+    assert set(report["checks"]["failed"]) == {"duplicate_ids:transactions", "orphan_rows:payments"}
+
+
+def test_fraud_payments_and_segments_match_sql(con, report):
+    checks = report["checks"]
+    fraud_rate = scalar(con, """
+        SELECT COUNT(f.transaction_id) * 100.0 / COUNT(*)
+        FROM transactions t LEFT JOIN fraud_flags f ON t.transaction_id = f.transaction_id
+    """)
+    assert checks["fraud_rate_percent"] == pytest.approx(fraud_rate, abs=1e-4)
+
+    low, avg, high = con.execute(
+        "SELECT MIN(payment_amount), AVG(payment_amount), MAX(payment_amount) FROM payments").fetchone()
+    assert checks["payment_amount"]["min"] == pytest.approx(float(low))
+    assert checks["payment_amount"]["avg"] == pytest.approx(float(avg), abs=1e-4)
+    assert checks["payment_amount"]["max"] == pytest.approx(float(high))
+
+    segments = dict(con.execute("SELECT customer_segment, COUNT(*) FROM customers GROUP BY 1").fetchall())
+    assert checks["segment_counts"] == segments
+
+
+def test_parts_merge_to_single_pass(data_dir, report):
+    parallel = profile_tables(data_dir, FMT, workers=3, chunk_rows=500, log=_quiet)
+    single = dict(report, seconds=None)
+    assert dict(parallel, seconds=None) == single
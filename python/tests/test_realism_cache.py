@@ -0,0 +1,57 @@
+"""Realism step cache: a parameter change only rewrites the final tables it feeds."""
+
+import pytest
+
+from data_generation import pipeline
+from data_generation.base_data import generate_base_data
+from data_generation.pipeline import OUTPUT_TABLES, save_final_tables
+from data_generation.realism import adjust_realism, merge_params
+from data_generation.stage_cache import StageCache, fingerprint
+
+CUSTOMERS = 150
+CASHBACK_ONLY = {"redemptions": {"weights": {"Cashback": 1.0, "Gift Cards": 0.0, "Flights": 0.0}}}
+
+
+def _quiet(msg):
+    pass
+
+
+@pytest.fixture(scope="module")
+def base():
+    return generate_base_data(CUSTOMERS, seed=5)
+
+
+def realism_run(base, cache, params=None):
+    """(tables, version per table) as the pipeline's realism stage produces them."""
+    keys = {name: fingerprint("base", name) for name in OUTPUT_TABLES}
+    versions = {}
+    tables = adjust_realism(base, log=_quiet, params=params, cache=cache, input_keys=keys, versions=versions)
+    return tables, versions
+
+
+def test_weights_change_rewrites_only_redemptions(base, tmp_path, monkeypatch):
+    cache = StageCache(str(tmp_path / "cache"))
+    out = str(tmp_path)
+    tables, versions = realism_run(base, cache)
+    save_final_tables(out, tables, versions, "csv", None, _quiet)
+
+    written = []
+    monkeypatch.setattr(pipeline, "write_table", lambda df, path, name, *args: written.append(name))
+    tables, changed = realism_run(base, cache, CASHBACK_ONLY)
+    save_final_tables(out, tables, changed, "csv", None, _quiet)
+
+    assert written == ["reward_redemptions"]
+    assert {name for name in OUTPUT_TABLES if versions[name] != changed[name]} == {"reward_redemptions"}
+
+
+def test_partial_override_keeps_step_defaults(base):
+    params = merge_params(CASHBACK_ONLY)
+    assert params["redemptions"]["value_factors"] == merge_params()["redemptions"]["value_factors"]
+
+    tables = adjust_realism(base, log=_quiet, params=CASHBACK_ONLY)
+    assert (tables["reward_redemptions"]["redemption_type"] == "Cashback").all()
+
+
+def test_unknown_step_is_rejected():
+    with pytest.raises(ValueError, match="redemption"):
+        merge_params({"redemption": {"weights": {}}})
@@ -0,0 +1,24 @@
+"""Chunked per-customer spend behind the quantile sketches."""
+
+import numpy as np
+import pandas as pd
+
+from analytics.sketches import customer_spend
+from data_generation.table_io import write_table
+
+
+def test_unknown_cards_are_dropped(tmp_path):
+    # Card 3 is a gap in the ids, card 9 lies past the highest known card
+    cards = pd.DataFrame({"card_id": [1, 2, 4], "customer_id": [10, 11, 10]})
+    transactions = pd.DataFrame({
+        "transaction_id": np.arange(1, 8),
+        "card_id": [1, 2, 3, 4, 9, 1, 2],
+        "amount_usd": [5.0, 7.0, 100.0, 2.5, 200.0, np.nan, 1.0]
+    })
+    write_table(cards, str(tmp_path), "cards")
+    write_table(transactions, str(tmp_path), "transactions")
+
+    ids, spend = customer_spend(str(tmp_path), chunk_rows=3)
+
+    np.testing.assert_array_equal(ids, [10, 11])
+    np.testing.assert_allclose(spend, [7.5, 8.0])
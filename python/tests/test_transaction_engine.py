@@ -0,0 +1,51 @@
+"""Vectorized transaction engine vs the legacy per-transaction loop."""
+
+import random
+
+import numpy as np
+import pytest
+
+from bench_transaction_engine import legacy_loop, make_cards, vectorized
+
+SEED = 7
+N_CARDS = 60
+
+
+@pytest.fixture(scope="module")
+def runs():
+    np.random.seed(SEED)
+    random.seed(SEED)
+    cards = make_cards(N_CARDS, np.random.default_rng(SEED))
+    legacy, _, legacy_fraud, _ = legacy_loop(cards)
+    vector, _, vector_fraud, _ = vectorized(cards, np.random.default_rng(SEED + 1))
+    return {"legacy": (legacy, legacy_fraud), "vector": (vector, vector_fraud)}
+
+
+def per_card_month(transactions):
+    return transactions.groupby(["card_id", transactions["transaction_date"].dt.to_period("M")]).size()
+
+
+def test_ticket_size(runs):
+    legacy, vector = runs["legacy"][0]["amount"], runs["vector"][0]["amount"]
+    assert vector.mean() == pytest.approx(legacy.mean(), rel=0.03)
+    for q in [0.1, 0.5, 0.9, 0.99]:
+        assert vector.quantile(q) == pytest.approx(legacy.quantile(q), rel=0.05)
+
+
+def test_transactions_per_card_month(runs):
+    legacy, vector = per_card_month(runs["legacy"][0]), per_card_month(runs["vector"][0])
+    assert vector.mean() == pytest.approx(legacy.mean(), abs=0.75)
+    assert vector.min() >= 8 and vector.max() <= 44
+    assert legacy.min() >= 8 and legacy.max() <= 44
+
+
+def test_international_and_cash_share(runs):
+    legacy, vector = runs["legacy"][0], runs["vector"][0]
+    assert vector["is_international"].mean() == pytest.approx(legacy["is_international"].mean(), abs=0.01)
+    cash = [(df["transaction_type"] == "Cash Advance").mean() for df in (legacy, vector)]
+    assert cash[1] == pytest.approx(cash[0], abs=0.01)
+
+
+def test_fraud_rate(runs):
+    rates = [len(fraud) / len(txns) for txns, fraud in (runs["legacy"], runs["vector"])]
+    assert rates[1] == pytest.approx(rates[0], abs=0.0015)
@@ -30,28 +30,42 @@ CREATE TABLE cards (
     customer_id         INT NOT NULL REFERENCES customers(customer_id),
     card_type           VARCHAR(50),
     credit_limit        NUMERIC(12,2),
+    credit_limit_usd    NUMERIC(12,2),
     card_issue_date     DATE,
     annual_fee          NUMERIC(10,2),
+    annual_fee_usd      NUMERIC(10,2),
     reward_program_type VARCHAR(50)
 );
 
--- 4) Transactions
+-- 4) Merchants
+
+CREATE TABLE merchants (
+    merchant_id       INT PRIMARY KEY,
+    merchant_category VARCHAR(100),
+    merchant_city     VARCHAR(100),
+    merchant_country  VARCHAR(100),
+    popularity_rank   INT
+);
+
+-- 5) Transactions
  
 CREATE TABLE transactions (
     transaction_id    BIGINT PRIMARY KEY,
     card_id           INT NOT NULL REFERENCES cards(card_id),
+    merchant_id       INT REFERENCES merchants(merchant_id),
     transaction_date  TIMESTAMP NULL,
     merchant_category VARCHAR(100),
     merchant_type     VARCHAR(50),
     currency          VARCHAR(10) REFERENCES currency_conversion(currency_code),
     amount            NUMERIC(12,2) NULL,
+    amount_usd        NUMERIC(12,2) NULL,
     transaction_type  VARCHAR(50),
     merchant_city     VARCHAR(100),
     merchant_country  VARCHAR(100),
     location          VARCHAR(100),
     is_international  BOOLEAN
 );
--- 5) Payments
+-- 6) Payments
 
 CREATE TABLE payments (
     payment_id          BIGINT PRIMARY KEY,
@@ -59,21 +73,24 @@ CREATE TABLE payments (
     payment_date        DATE,
     payment_amount      NUMERIC(12,2),
     payment_method      VARCHAR(50),
+    missed_streak       INT,
+    utilization         NUMERIC(10,2),
     delinquency_status  VARCHAR(20)
 );
 
--- 6) Reward redemptions
+-- 7) Reward redemptions
 
 CREATE TABLE reward_redemptions (
-    redemption_id     BIGINT PRIMARY KEY,
-    card_id           INT NOT NULL REFERENCES cards(card_id),
-    redemption_date   DATE,
-    redemption_type   VARCHAR(100),
-    points_used       INT,
-    redemption_value  NUMERIC(10,2)
+    redemption_id        BIGINT PRIMARY KEY,
+    card_id              INT NOT NULL REFERENCES cards(card_id),
+    redemption_date      DATE,
+    redemption_type      VARCHAR(100),
+    points_used          INT,
+    redemption_value     NUMERIC(10,2),
+    redemption_value_usd NUMERIC(10,2)
 );
 
--- 7) Fraud flags
+-- 8) Fraud flags
 
 CREATE TABLE fraud_flags (
     fraud_id         BIGINT PRIMARY KEY,
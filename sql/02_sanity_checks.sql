@@ -1,5 +1,8 @@
 DATA SANITY CHECKS
 
+-- The same checks run in one chunked pass over the generated files, without a database:
+--   python -m data_generation profile --dir ./output --out profile_report.json
+
 -- 1.	CHECK FOR ANY ODD VALUES
 SELECT
 (SELECT COUNT(*) FROM customers) AS customers,
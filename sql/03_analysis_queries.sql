@@ -229,22 +229,7 @@ LIMIT 1;
 -- 7) UTILIZATION / SPEND-TO-LIMIT (CUSTOMER-MONTH)
 -- ============================================================
 
-ALTER TABLE cards ADD COLUMN IF NOT EXISTS credit_limit_usd NUMERIC;
-
-UPDATE cards c
-SET credit_limit_usd = c.credit_limit * conv.conversion_to_usd
-FROM customers cust
-JOIN (
-    SELECT 'UAE' as country, 'AED' as cur UNION ALL
-    SELECT 'India', 'INR' UNION ALL
-    SELECT 'Qatar', 'QAR' UNION ALL
-    SELECT 'UK', 'GBP' UNION ALL
-    SELECT 'Germany', 'EUR' UNION ALL
-    SELECT 'France', 'EUR'
-) country_map ON cust.country = country_map.country
-JOIN currency_conversion conv ON country_map.cur = conv.currency_code
-WHERE c.customer_id = cust.customer_id;
-
+-- credit_limit_usd / amount_usd are loaded with the tables (converted in Python)
 
 DROP TABLE IF EXISTS customer_monthly_spend_to_limit;
 
@@ -334,7 +319,7 @@ FROM customer_spend_summary cs
 LEFT JOIN (
     SELECT
         customer_id,
-        SUM(annual_fee * 0.27) AS annual_fee_usd
+        SUM(annual_fee_usd) AS annual_fee_usd
     FROM cards
     GROUP BY customer_id
 ) cd ON cs.customer_id = cd.customer_id
@@ -412,4 +397,32 @@ LEFT JOIN customer_profitability p
   ON p.customer_id = s.customer_id
 CROSS JOIN thresholds t;
 
+
+-- ============================================================
+-- 11) DELINQUENCY ROLL RATES (STATUS MONTH -> NEXT MONTH)
+-- ============================================================
+
+DROP TABLE IF EXISTS delinquency_roll_rates;
+
+CREATE TABLE delinquency_roll_rates AS
+WITH status_moves AS (
+    SELECT
+        LAG(delinquency_status) OVER (PARTITION BY card_id ORDER BY payment_date, payment_id) AS from_status,
+        delinquency_status AS to_status
+    FROM payments
+)
+SELECT
+    from_status,
+    to_status,
+    COUNT(*) AS card_months,
+    ROUND(
+        COUNT(*) * 100.0 / SUM(COUNT(*)) OVER (PARTITION BY from_status),
+        2
+    ) AS roll_rate_percent
+FROM status_moves
+WHERE from_status IS NOT NULL
+  AND to_status IS NOT NULL
+GROUP BY from_status, to_status
+ORDER BY from_status, to_status;
+
 COMMIT;